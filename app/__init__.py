@@ -9,16 +9,28 @@ from app.blueprints.chapters import chapter_bp
 from app.blueprints.quizzes import quiz_bp
 from app.blueprints.admin import admin_bp
 from app.blueprints.user import user_bp
+from app.blueprints.search import search_bp
 from app.tasks.scheduler import start_scheduler
+from app.utils.db import READ_BIND, apply_sqlite_profile, configure_pools
 from flask_caching import Cache
 
 
-def create_app():
+def create_app(config_overrides=None):
     app = Flask(__name__)
     app.config.from_object("app.config.Config")
+    if config_overrides:
+        app.config.update(config_overrides)
     CORS(app)
+    if app.config['AUTOSAVE_BACKEND'] == 'local' and not (app.debug or app.testing):
+        app.logger.warning("AUTOSAVE_BACKEND=local buffers autosaved answers per process; "
+                           "use redis when running more than one worker.")
     
+    configure_pools(app.config)
     db.init_app(app)
+    with app.app_context():
+        apply_sqlite_profile(db.engine, app.config)
+        if READ_BIND in db.engines:
+            apply_sqlite_profile(db.engines[READ_BIND], app.config, read_only=True)
     migrate.init_app(app,db)
     jwt.init_app(app)
     mail.init_app(app)
@@ -30,6 +42,7 @@ def create_app():
     app.register_blueprint(quiz_bp, url_prefix='/quiz')
     app.register_blueprint(admin_bp, url_prefix='/admin')
     app.register_blueprint(user_bp, url_prefix="/user")
+    app.register_blueprint(search_bp, url_prefix="/search")
 
     #with app.app_context():
     #    if not hasattr(app, 'scheduler_started'):
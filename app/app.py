@@ -2,13 +2,18 @@ from app import create_app
 from app.extensions import db
 from app.utils.auth import hash_password
 from flask_migrate import upgrade
+import click
+import os
 
 app = create_app()
 
 @app.cli.command("create_db")
 def create_db():
     """Command to create the database tables."""
+    from app.services.stats_service import reconcile
     db.create_all()
+    # Seed the dashboard counters, as the migration creating their table does
+    reconcile()
 
 @app.cli.command("seed_db")
 def seed_db():
@@ -25,3 +30,110 @@ def upgrade_db():
     """Command to apply migrations to the database."""
     upgrade()
 
+
+@app.cli.command("recompute_quiz_aggregates")
+def recompute_quiz_aggregates():
+    """Command to recompute the stored total_marks and question_count of every quiz."""
+    from app.models import Quiz
+    updated = Quiz.recompute_aggregates()
+    db.session.commit()
+    print(f"Recomputed aggregates for {updated} quizzes.")
+
+@app.cli.command("rebuild_leaderboards")
+def rebuild_leaderboards():
+    """Command to rebuild every quiz leaderboard from the stored attempts."""
+    from app.models import Quiz
+    from app.services import leaderboard_service
+    for (quiz_id,) in db.session.query(Quiz.id).all():
+        leaderboard_service.rebuild(quiz_id)
+    print("Leaderboards rebuilt!")
+
+@app.cli.command("flush_autosaves")
+def flush_autosaves():
+    """Command to write the buffered autosaved answers to the database now, e.g. when an exam closes."""
+    from app.services import autosave_service
+    print(f"Flushed {autosave_service.flush()} autosaved answers.")
+
+@app.cli.command("send_test_mail")
+@click.option("--count", default=10, help="Number of messages to send.")
+@click.option("--to", "recipient", default="test@quiz.local", help="Recipient address.")
+def send_test_mail(count, recipient):
+    """Command to push test messages through the delivery pipeline to MAIL_SERVER (MailHog locally)."""
+    import time
+    from flask_mail import Message
+    from app.services.mail_service import deliver
+    messages = (
+        Message(subject=f"Delivery test {i + 1}/{count}", recipients=[recipient], body="Delivery pipeline test.")
+        for i in range(count)
+    )
+    started = time.perf_counter()
+    report = deliver(messages)
+    elapsed = time.perf_counter() - started
+    print(f"Sent {report.sent}/{count} to {app.config['MAIL_SERVER']}:{app.config['MAIL_PORT']} "
+          f"in {elapsed:.2f}s ({report.sent / elapsed:.1f} msg/s), "
+          f"{report.retried} retries, {len(report.failed)} failed.")
+
+@app.cli.command("rebuild_analytics")
+def rebuild_analytics():
+    """Command to rebuild the per-user and admin analytics rollups from the stored attempts."""
+    from app.services.analytics_service import rebuild_user_rollups, rebuild_daily_rollups
+    subjects, months = rebuild_user_rollups()
+    quiz_days, subject_days = rebuild_daily_rollups()
+    db.session.commit()
+    print(f"Rebuilt {subjects} user/subject and {months} user/month rollups.")
+    print(f"Rebuilt {quiz_days} quiz/day and {subject_days} subject/day rollups.")
+
+@app.cli.command("reconcile_counters")
+def reconcile_counters():
+    """Command to reset the admin dashboard counters to the real row counts."""
+    from app.services.stats_service import reconcile
+    for name, value in reconcile().items():
+        print(f"{name}: {value}")
+
+@app.cli.command("rebuild_search_index")
+def rebuild_search_index():
+    """Command to repopulate the full-text search index from the database."""
+    from app.services.search_service import rebuild_index
+    counts = rebuild_index()
+    if counts is None:
+        print("Full-text search needs SQLite with FTS5; searches use LIKE matching instead.")
+        return
+    print(", ".join(f"{count} {kind} rows" for kind, count in counts.items()) + " indexed.")
+
+@app.cli.command("check_query_plans")
+def check_query_plans():
+    """Command to fail when a route's queries need a full table or index scan."""
+    from app.query_plans import check_query_plans as find_scans
+    findings = find_scans()
+    for route, table, detail, statement in findings:
+        print(f"{route}: {detail}\n    {' '.join(statement.split())[:300]}")
+    if findings:
+        raise SystemExit(f"{len(findings)} unexpected scans.")
+    print("No unexpected scans.")
+
+@app.cli.command("bench_concurrent_writes")
+@click.option("--workers", default=4, show_default=True, help="Writer processes.")
+@click.option("--seconds", default=5.0, show_default=True, help="Run time of each configuration.")
+def bench_concurrent_writes(workers, seconds):
+    """Command to compare SQLite's defaults with the connection profile under concurrent writers."""
+    from app.benchmarks import concurrent_writes
+    results = concurrent_writes(app.config, workers, seconds)
+    for name, result in results.items():
+        p50 = f"{result['p50_ms']:.1f}" if result['p50_ms'] is not None else "-"
+        p95 = f"{result['p95_ms']:.1f}" if result['p95_ms'] is not None else "-"
+        print(f"{name:>8}: {result['commits_per_second']:8.1f} commits/s, "
+              f"{result['locked']} locked errors, p50 {p50} ms, p95 {p95} ms")
+
+@app.cli.command("bench_login")
+@click.option("--clients", default=16, show_default=True, help="Concurrent sign-ins.")
+@click.option("--seconds", default=5.0, show_default=True, help="Run time of each mode.")
+def bench_login(clients, seconds):
+    """Command to measure password checks per second, in the request thread and in the hashing pool."""
+    from app.benchmarks import logins
+    print(f"{app.config['PASSWORD_HASH_METHOD']}, {app.config['HASH_POOL_WORKERS']} pool workers, "
+          f"{os.cpu_count()} cores")
+    for name, result in logins(app, clients, seconds).items():
+        p95 = f"{result['p95_ms']:.1f}" if result['p95_ms'] is not None else "-"
+        print(f"{name:>6}: {result['logins_per_second']:7.1f} logins/s "
+              f"({result['logins_per_second_per_core']:.1f} per core), "
+              f"{result['busy']} rejected as busy, p95 {p95} ms")
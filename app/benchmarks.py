@@ -0,0 +1,186 @@
+"""
+Benchmarks for the SQLite connection profile and for password hashing.
+
+Concurrent writers: starts several processes, like gunicorn workers, that run the write pattern of
+/quiz/start_attempt against one database file: read the user, look for an
+existing attempt, insert the attempt and bump a shared counter row. The same
+load is run with SQLite's defaults (rollback journal, deferred transactions)
+and with the profile from app.utils.db (WAL, BEGIN IMMEDIATE, busy timeout).
+
+Run with `flask bench_concurrent_writes`.
+
+Logins: several threads, like the requests of an exam start, verify a
+password against a hash made with PASSWORD_HASH_METHOD, once hashing in the
+request thread and once in the HASH_POOL_WORKERS process pool. Run with
+`flask bench_login`.
+"""
+import multiprocessing
+import os
+import shutil
+import tempfile
+import threading
+import time
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+
+_SCHEMA = (
+    "CREATE TABLE user (id INTEGER PRIMARY KEY, email TEXT NOT NULL)",
+    "CREATE TABLE counter (name TEXT PRIMARY KEY, value INTEGER NOT NULL)",
+    "CREATE TABLE attempt (id INTEGER PRIMARY KEY, user_id INTEGER NOT NULL, "
+    "quiz_id INTEGER NOT NULL, score INTEGER NOT NULL)",
+    "CREATE INDEX ix_attempt_user_quiz ON attempt (user_id, quiz_id)",
+)
+
+_USERS = 1000
+
+
+def _engine(path, config):
+    from app.utils.db import apply_sqlite_profile
+    engine = create_engine(f"sqlite:///{path}")
+    if config is not None:
+        apply_sqlite_profile(engine, config)
+    return engine
+
+
+def _writer(path, config, seconds, worker, results):
+    from app.utils.db import _begin_immediate
+
+    engine = _engine(path, config)
+    if config is not None:
+        _begin_immediate.set(True)
+    commits, locked, latencies = 0, 0, []
+    deadline = time.monotonic() + seconds
+    i = 0
+    while time.monotonic() < deadline:
+        i += 1
+        user_id = (worker * 7919 + i) % _USERS + 1
+        started = time.perf_counter()
+        try:
+            with engine.begin() as connection:
+                connection.execute(text("SELECT email FROM user WHERE id = :id"), {"id": user_id})
+                connection.execute(text(
+                    "SELECT id FROM attempt WHERE user_id = :user AND quiz_id = :quiz LIMIT 1"
+                ), {"user": user_id, "quiz": i}).first()
+                connection.execute(text(
+                    "INSERT INTO attempt (user_id, quiz_id, score) VALUES (:user, :quiz, 0)"
+                ), {"user": user_id, "quiz": i})
+                connection.execute(text("UPDATE counter SET value = value + 1 WHERE name = 'attempt'"))
+        except OperationalError:
+            locked += 1
+            continue
+        commits += 1
+        latencies.append(time.perf_counter() - started)
+    engine.dispose()
+    results.put((commits, locked, latencies))
+
+
+def _run(path, config, workers, seconds):
+    engine = _engine(path, config)
+    with engine.begin() as connection:
+        for statement in _SCHEMA:
+            connection.execute(text(statement))
+        connection.execute(text("INSERT INTO counter (name, value) VALUES ('attempt', 0)"))
+        connection.execute(text("INSERT INTO user (id, email) VALUES (:id, :email)"),
+                           [{"id": n, "email": f"user{n}@bench.local"} for n in range(1, _USERS + 1)])
+    engine.dispose()
+
+    context = multiprocessing.get_context('spawn')
+    results = context.Queue()
+    processes = [context.Process(target=_writer, args=(path, config, seconds, worker, results))
+                 for worker in range(workers)]
+    for process in processes:
+        process.start()
+    outcomes = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+
+    latencies = sorted(latency for _, _, worker_latencies in outcomes for latency in worker_latencies)
+    commits = sum(commits for commits, _, _ in outcomes)
+    return {
+        "commits": commits,
+        "commits_per_second": commits / seconds,
+        "locked": sum(locked for _, locked, _ in outcomes),
+        "p50_ms": latencies[len(latencies) // 2] * 1000 if latencies else None,
+        "p95_ms": latencies[int(len(latencies) * 0.95)] * 1000 if latencies else None,
+    }
+
+
+def concurrent_writes(config, workers=4, seconds=5.0):
+    """
+    Run the writer load with SQLite's defaults and with the profile in config.
+    Returns:
+        dict: 'default' and 'profile' -> commits, commits_per_second, locked, p50_ms, p95_ms.
+    """
+    workdir = tempfile.mkdtemp(prefix='bench-writes-')
+    try:
+        return {
+            "default": _run(os.path.join(workdir, 'default.db'), None, workers, seconds),
+            "profile": _run(os.path.join(workdir, 'profile.db'), config, workers, seconds),
+        }
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def _verify_load(app, clients, seconds, hashed):
+    from app.utils.auth import verify_password
+    from app.utils.exceptions import ServiceBusyError
+
+    counts = {"ok": 0, "busy": 0}
+    latencies = []
+    lock = threading.Lock()
+    deadline = time.monotonic() + seconds
+
+    def client():
+        with app.app_context():
+            while time.monotonic() < deadline:
+                started = time.perf_counter()
+                try:
+                    verify_password(hashed, 'benchmark-password')
+                except ServiceBusyError:
+                    with lock:
+                        counts["busy"] += 1
+                    continue
+                with lock:
+                    counts["ok"] += 1
+                    latencies.append(time.perf_counter() - started)
+
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    started = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - started
+
+    latencies.sort()
+    cores = os.cpu_count() or 1
+    return {
+        "logins_per_second": counts["ok"] / elapsed,
+        "logins_per_second_per_core": counts["ok"] / elapsed / cores,
+        "busy": counts["busy"],
+        "p95_ms": latencies[int(len(latencies) * 0.95)] * 1000 if latencies else None,
+    }
+
+
+def logins(app, clients=16, seconds=5.0):
+    """
+    Run the password check load inline and through the hashing pool.
+    Returns:
+        dict: 'inline' and 'pool' -> logins_per_second, logins_per_second_per_core, busy, p95_ms.
+    """
+    from app.utils.auth import hash_password, verify_password
+
+    with app.app_context():
+        hashed = hash_password('benchmark-password')
+    workers = app.config['HASH_POOL_WORKERS']
+    results = {}
+    try:
+        app.config['HASH_POOL_WORKERS'] = 0
+        results["inline"] = _verify_load(app, clients, seconds, hashed)
+        app.config['HASH_POOL_WORKERS'] = workers or 2
+        with app.app_context():
+            verify_password(hashed, 'warm-up')  # Start the pool outside the timed run
+        results["pool"] = _verify_load(app, clients, seconds, hashed)
+    finally:
+        app.config['HASH_POOL_WORKERS'] = workers
+    return results
@@ -1,29 +1,30 @@
-from flask import request, jsonify
-from flask_jwt_extended import jwt_required, get_jwt_identity
+import uuid
+from flask import current_app, request, jsonify, url_for
+from flask_jwt_extended import jwt_required
 from app.extensions import db
 from app.models import Chapter, Subject, User, Quiz, Question
-from app.utils.exceptions import ValidationError, handle_exception
+from app.utils.exceptions import ServiceBusyError, ValidationError, handle_exception
+from app.utils.permissions import admin_required
+from app.services.mail_service import deliver
+from app.services import stats_service, search_service, import_service
+from app.tasks.imports import import_user_rows
 from . import admin_bp
 from flask_mail import Message
-from sqlalchemy import func, or_
 
 
 @admin_bp.route('/stats', methods=['GET'])
 @jwt_required()
 @handle_exception
+@admin_required("Only admins can access site Stats.")
 def get_admin_stats():
-    current_user_id = get_jwt_identity()
-    user = User.query.get(int(current_user_id))
-
-    # Check if admin
-    if not user or user.role != 'admin':
-        raise ValidationError("Only admins can access site Stats.")
+    # Maintained counters instead of five COUNT(*) scans per dashboard load
+    counts = stats_service.snapshot()
     stats = {
-        "totalQuizzes": Quiz.query.count(),
-        "totalQuestions": Question.query.count(),
-        "totalChapters": Chapter.query.count(),
-        "totalSubjects": Subject.query.count(),
-        "totalUsers": User.query.count()
+        "totalQuizzes": counts["quiz"],
+        "totalQuestions": counts["question"],
+        "totalChapters": counts["chapter"],
+        "totalSubjects": counts["subject"],
+        "totalUsers": counts["user"]
     }
     return jsonify(stats)
 
@@ -31,32 +32,96 @@ def get_admin_stats():
 @admin_bp.route('/mail', methods=['GET'])
 @jwt_required()
 @handle_exception
+@admin_required("Only admins can access site Stats.")
 def send_mail():
-    current_user_id = get_jwt_identity()
-    user = User.query.get(int(current_user_id))
-
-    # Check if admin
-    if not user or user.role != 'admin':
-        raise ValidationError("Only admins can access site Stats.")
-    from app import mail
     msg = Message(
         subject="Test Email",
         recipients=["admin@example.com"],
         body="This is a test email sent via MailHog"
     )
-    mail.send(msg)
+    report = deliver([msg], max_retries=0)
+    return jsonify(report.serialize()), 200 if not report.failed else 502
+
+
+@admin_bp.route('/users/import', methods=['POST'])
+@jwt_required()
+@handle_exception
+@admin_required("Only admins can import users.")
+def import_users():
+    """
+    Create student accounts from an uploaded .csv or .json file (form field
+    'file'), or from a JSON body {"users": [...]}. Rows that cannot be imported
+    are listed in the response, the others are created. Uploads of more than
+    USER_IMPORT_SYNC_ROWS rows are imported by a worker and reported on by
+    /users/import/<job_id>, so hashing their passwords never outlasts the request.
+    """
+    upload = request.files.get('file')
+    if upload:
+        rows = import_service.parse_rows(upload.filename or '', upload.read())
+    else:
+        data = request.get_json(silent=True) or {}
+        rows = data.get('users')
+        if not isinstance(rows, list):
+            raise ValidationError("Upload a file or send a 'users' list.")
+
+    import_service.check_size(rows)
+    if len(rows) > current_app.config['USER_IMPORT_SYNC_ROWS']:
+        job_id = uuid.uuid4().hex
+        if not import_service.stage_rows(job_id, rows):
+            raise ServiceBusyError("The import could not be queued, please retry.")
+        import_service.save_job(job_id, "pending")
+        import_user_rows.delay(job_id)
+        return jsonify({
+            "job_id": job_id,
+            "status": "pending",
+            "status_url": url_for('admin.import_status', job_id=job_id)
+        }), 202
+
+    report = import_service.import_users(rows)
+    return jsonify(report), 201 if report["created"] else 200
+
+
+@admin_bp.route('/users/import/<job_id>', methods=['GET'])
+@jwt_required()
+@handle_exception
+@admin_required("Only admins can import users.")
+def import_status(job_id):
+    job = import_service.load_job(job_id)
+    if job is None:
+        return jsonify({"error": "Import not found or expired."}), 404
+    return jsonify({"job_id": job_id, **job}), 200
+
+
+# Result cap of the /search/* endpoints, overridable with ?limit= up to the maximum
+SEARCH_LIMIT = 50
+SEARCH_MAX_LIMIT = 200
+
+def _search_limit():
+    return max(1, min(request.args.get('limit', SEARCH_LIMIT, type=int), SEARCH_MAX_LIMIT))
+
+def _list_page(model):
+    """
+    Every row in id order, as an empty query always listed. Callers that send
+    ?page= or ?limit= get ?limit= rows of that page instead.
+    """
+    query = model.query.order_by(model.id)
+    if 'page' not in request.args and 'limit' not in request.args:
+        return query.all()
+    page = request.args.get('page', 1, type=int)
+    if page < 1:
+        raise ValidationError("page must be a positive integer.")
+    limit = _search_limit()
+    return query.offset((page - 1) * limit).limit(limit).all()
 
 
 @admin_bp.route('/search/users')
 @jwt_required()
 @handle_exception
 def search_users():
-    q = request.args.get('q', '').lower()
-    users = User.query.filter(
-        or_(
-            User.full_name.ilike(f"%{q}%"),
-            User.email.ilike(f"%{q}%")
-        )).all()
+    q = request.args.get('q', '').strip()
+    if not q:
+        return jsonify([u.serialize() for u in _list_page(User)])
+    users = search_service.search("user", q, limit=_search_limit())
     return jsonify([u.serialize() for u in users])
 
 
@@ -64,18 +129,28 @@ def search_users():
 @jwt_required()
 @handle_exception
 def search_subjects():
-    q = request.args.get('q', '').lower()
-    subjects = Subject.query.filter(func.lower(Subject.name).like(f"%{q}%")).all()
+    q = request.args.get('q', '').strip()
+    if not q:
+        return jsonify([s.serialize() for s in _list_page(Subject)])
+    subjects = search_service.search("subject", q, limit=_search_limit())
     return jsonify([s.serialize() for s in subjects])
 
 @admin_bp.route('/search/quizzes')
 @jwt_required()
 @handle_exception
 def search_quizzes():
-    q = request.args.get('q', '').lower()
-    quizzes = Quiz.query.join(Subject).filter(
-        (func.lower(Quiz.title).like(f"%{q}%")) | (func.lower(Subject.name).like(f"%{q}%"))
-    ).all()
+    q = request.args.get('q', '').strip()
+    if not q:
+        return jsonify([qz.serialize() for qz in _list_page(Quiz)])
+    limit = _search_limit()
+    # Quizzes matching by title first, then quizzes of matching subjects
+    quizzes = search_service.search("quiz", q, limit=limit)
+    subject_ids = search_service.search_ids("subject", q, limit=limit)
+    if subject_ids and len(quizzes) < limit:
+        seen = [qz.id for qz in quizzes]
+        quizzes += Quiz.query.filter(
+            Quiz.subject_id.in_(subject_ids), Quiz.id.notin_(seen)
+        ).order_by(Quiz.id).limit(limit - len(quizzes)).all()
     return jsonify([qz.serialize() for qz in quizzes])
 
 
@@ -83,35 +158,24 @@ def search_quizzes():
 @admin_bp.route('/search', methods=['GET'])
 @jwt_required()
 @handle_exception
+@admin_required("Only admins can access site Stats.")
 def admin_search():
-    current_user_id = get_jwt_identity()
-    user = User.query.get(int(current_user_id))
-    # Check if admin
-    if not user or user.role != 'admin':
-        raise ValidationError("Only admins can access site Stats.")
-    
     query = request.args.get('q', '').strip().lower()
     if not query:
-        return jsonify({"users": [], "subjects": [], "quizzes": []})
-
-    # --- Search Users (match by name or email) ---
-    user_results = User.query.filter(
-        (User.full_name.ilike(f"%{query}%")) |
-        (User.email.ilike(f"%{query}%"))
-    ).limit(10).all()
-
-    # --- Search Subjects (match by title/name) ---
-    subject_results = Subject.query.filter(
-        Subject.name.ilike(f"%{query}%")
-    ).limit(10).all()
+        return jsonify({"users": [], "subjects": [], "quizzes": [], "questions": []})
 
-    # --- Search Quizzes (match by title) ---
-    quiz_results = Quiz.query.filter(
-        Quiz.title.ilike(f"%{query}%")
-    ).limit(10).all()
+    # Ranked lookups in the full-text index
+    user_results = search_service.search("user", query, limit=10)
+    subject_results = search_service.search("subject", query, limit=10)
+    quiz_results = search_service.search("quiz", query, limit=10)
+    question_results = search_service.search("question", query, limit=10)
 
     return jsonify({
         "users": [user.serialize() for user in user_results],
         "subjects": [subject.serialize() for subject in subject_results],
-        "quizzes": [quiz.serialize() for quiz in quiz_results]
+        "quizzes": [quiz.serialize() for quiz in quiz_results],
+        "questions": [
+            {"id": question.id, "quiz_id": question.quiz_id, "text": question.text}
+            for question in question_results
+        ]
     })
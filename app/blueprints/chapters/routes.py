@@ -1,21 +1,17 @@
 from flask import request, jsonify
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from flask_jwt_extended import jwt_required
 from app.models import Chapter, Subject, User
 from app.extensions import db
 from app.utils.exceptions import ValidationError, handle_exception
+from app.utils.permissions import admin_required
 from . import chapter_bp
 
 
 @chapter_bp.route('/create', methods=['POST'])
 @jwt_required()
 @handle_exception
+@admin_required("Only admins can create chapters.")
 def create_chapter():
-    # Get the current user
-    current_user_id = get_jwt_identity()
-    user = User.query.get(int(current_user_id))
-    if not user or user.role != 'admin':
-        raise ValidationError("Only admins can create chapters.")
-
     # Parse data from the request
     data = request.json
     name = data.get('name')
@@ -78,13 +74,8 @@ def get_chapter(chapter_id):
 @chapter_bp.route('/<int:chapter_id>', methods=['PUT'])
 @jwt_required()
 @handle_exception
+@admin_required("Only admins can update chapters.")
 def update_chapter(chapter_id):
-    # Get the current user
-    current_user_id = get_jwt_identity()
-    user = User.query.get(int(current_user_id))
-    if not user or user.role != 'admin':
-        raise ValidationError("Only admins can update chapters.")
-
     # Parse data from the request
     data = request.json
     name = data.get('name')
@@ -127,13 +118,8 @@ def update_chapter(chapter_id):
 @chapter_bp.route('/<int:chapter_id>', methods=['DELETE'])
 @jwt_required()
 @handle_exception
+@admin_required("Only admins can delete chapters.")
 def delete_chapter(chapter_id):
-    # Get the current user
-    current_user_id = get_jwt_identity()
-    user = User.query.get(int(current_user_id))
-    if not user or user.role != 'admin':
-        raise ValidationError("Only admins can delete chapters.")
-
     chapter = Chapter.query.get(chapter_id)
     if not chapter:
         raise ValidationError(f"Chapter with ID {chapter_id} does not exist.")
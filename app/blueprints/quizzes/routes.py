@@ -1,27 +1,27 @@
-from flask import request, jsonify, send_file
+from flask import request, jsonify, Response, stream_with_context
 from datetime import datetime, timezone
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from sqlalchemy import func
+from sqlalchemy.orm import selectinload
 from app.extensions import db, cache   
 from app.models import Chapter, Subject, User, Quiz, Question, Option, QuizAttempt
 from app.utils.exceptions import ValidationError, handle_exception
+from app.utils.db import retry_on_locked
+from app.utils.permissions import admin_required, current_role, current_user_id, user_required
+from app.utils.pagination import keyset_paginate
+from app.utils.validators import parse_marks
+from app.services.scoring_service import get_answer_key, forget_answer_key
+from app.services.export_service import iter_attempt_rows, iter_csv, iter_gzip
+from app.services import leaderboard_service, analytics_service, autosave_service, paper_service
 from . import quiz_bp
-import io
-import csv
 from app.tasks.csv_export import export_all_users_quiz_csv
 
 
 @quiz_bp.route('/create_quiz', methods=['POST'])
 @jwt_required()
 @handle_exception
+@admin_required("Only admins can create quizzes.")
 def create_quiz():
-    current_user_id = get_jwt_identity()
-    user = User.query.get(int(current_user_id))
-
-    # Check if admin
-    if not user or user.role != 'admin':
-        raise ValidationError("Only admins can create quizzes.")
-
     # Parse data
     data = request.json
     title = data.get('title')
@@ -87,14 +87,8 @@ def create_quiz():
 @quiz_bp.route('/edit_quiz/<int:quiz_id>', methods=['PUT'])
 @jwt_required()
 @handle_exception
+@admin_required("Only admins can edit quizzes.")
 def edit_quiz(quiz_id):
-    current_user_id = get_jwt_identity()
-    user = User.query.get(int(current_user_id))
-
-    # Check if admin
-    if not user or user.role != 'admin':
-        raise ValidationError("Only admins can edit quizzes.")
-    
     quiz = Quiz.query.get(quiz_id)
     if not quiz:
         raise ValidationError(f"Quiz with ID {quiz_id} does not exist.")
@@ -144,23 +138,30 @@ def edit_quiz(quiz_id):
 @quiz_bp.route('/delete_quiz/<int:quiz_id>', methods=['DELETE'])
 @jwt_required()
 @handle_exception
+@admin_required("Only admins can delete quizzes.")
 def delete_quiz(quiz_id):
-    current_user_id = get_jwt_identity()
-    user = User.query.get(int(current_user_id))
-
-    # Check if admin
-    if not user or user.role != 'admin':
-        raise ValidationError("Only admins can delete quizzes.")
-    
     quiz = Quiz.query.get(quiz_id)
     if not quiz:
         raise ValidationError(f"Quiz with ID {quiz_id} does not exist.")
 
+    analytics_service.forget_quiz_attempts(quiz)
+    questions_version = quiz.questions_version
     db.session.delete(quiz)
     db.session.commit()
+    forget_answer_key(quiz_id)
+    leaderboard_service.drop(quiz_id)
+    paper_service.forget(quiz_id, questions_version)
 
     return jsonify({"message": "Quiz deleted successfully!"}), 200
     
+# Sort keys accepted by the cursor mode of /list, tie-broken by Quiz.id
+QUIZ_SORT_KEYS = {
+    "created_at": Quiz.created_at,
+    "start_time": Quiz.start_time,
+    "end_time": Quiz.end_time,
+    "id": Quiz.id
+}
+
 @quiz_bp.route('/list', methods=['GET'])
 @jwt_required()
 @handle_exception
@@ -180,16 +181,39 @@ def list_quizzes():
     if chapter_id:
         query = query.filter(Quiz.chapters.any(id=chapter_id))
 
+    def serialize_quiz(quiz):
+        return {
+            "id": quiz.id,
+            "title": quiz.title,
+            "subject_id": quiz.subject_id,
+            "total_marks": quiz.total_marks,
+            "chapters": [chapter.id for chapter in quiz.chapters] if quiz.chapters else []
+        }
+
+    # Opt-in keyset pagination: ?cursor=<next_cursor> (empty for the first page)
+    cursor = request.args.get('cursor')
+    if cursor is not None:
+        sort = request.args.get('sort', 'created_at')
+        if sort not in QUIZ_SORT_KEYS:
+            raise ValidationError(f"Invalid sort key. Use one of: {', '.join(QUIZ_SORT_KEYS)}.")
+        page_data = keyset_paginate(
+            query, sort, QUIZ_SORT_KEYS[sort], Quiz.id, cursor, size,
+            with_count=request.args.get('count', 'false').lower() == 'true'
+        )
+        response = {
+            "quizzes": [serialize_quiz(quiz) for quiz in page_data["items"]],
+            "next_cursor": page_data["next_cursor"],
+            "has_next": page_data["has_next"],
+            "size": size
+        }
+        if page_data["total"] is not None:
+            response["total_items"] = page_data["total"]
+        return jsonify(response), 200
+
     # Apply pagination
     paginated_quizzes = query.paginate(page=page, per_page=size, error_out=False)
     
-    quiz_list = [{
-        "id": quiz.id,
-        "title": quiz.title,
-        "subject_id": quiz.subject_id,
-        "total_marks": quiz.total_marks,
-        "chapters": [chapter.id for chapter in quiz.chapters] if quiz.chapters else []
-    } for quiz in paginated_quizzes.items]
+    quiz_list = [serialize_quiz(quiz) for quiz in paginated_quizzes.items]
 
     return jsonify({
         "quizzes": quiz_list,
@@ -203,13 +227,8 @@ def list_quizzes():
 @quiz_bp.route('/allquizzes', methods=['GET'])
 @jwt_required()
 @handle_exception
+@admin_required("Only admins can view all quizzes.")
 def all_quizzes():
-    current_user_id = get_jwt_identity()
-    user = User.query.get(int(current_user_id))
-    # Check if admin
-    if not user or user.role != 'admin':
-        raise ValidationError("Only admins can view all quizzes.")
-
     query = Quiz.query.all()
        
     quiz_list = [{
@@ -240,7 +259,7 @@ def get_quiz_details(quiz_id):
             "subject": Subject.query.filter_by(id=quiz.subject_id).all()[0].name,
             "chapters": [chapter.id for chapter in quiz.chapters],
             "time_limit": quiz.time_limit,
-            "total_marks": quiz.total_marks,  # Calculated dynamically
+            "total_marks": quiz.total_marks,
             "questions": [{
                 "id": question.id,
                 "text": question.text,
@@ -265,8 +284,8 @@ def get_quiz_microdetails(quiz_id):
             "subject": Subject.query.filter_by(id=quiz.subject_id).all()[0].name,
             "chapters": [Chapter.query.filter_by(id=chapter.id).all()[0].name for chapter in quiz.chapters],
             "duration": "Unlimited" if not quiz.time_limit else f"{quiz.time_limit // 60:02}:{quiz.time_limit % 60:02}",
-            "total_marks": quiz.total_marks,  # Calculated dynamically
-            "num_questions": quiz.questions.count()
+            "total_marks": quiz.total_marks,
+            "num_questions": quiz.question_count
         }
     }), 200
 
@@ -282,7 +301,7 @@ def get_upcoming_quizzes():
     try:
         # Get all quizzes that have at least one question and are within the valid time range
         quizzes = Quiz.query.filter(
-            Quiz.questions.any(),
+            Quiz.question_count > 0,
             Quiz.end_time >= current_time
         ).all()
         
@@ -306,7 +325,7 @@ def get_upcoming_quizzes():
                         "title": quiz.title,
                         "subject": Subject.query.filter_by(id=quiz.subject_id).all()[0].name,
                         "description": quiz.description,
-                        "num_questions": quiz.questions.count(),
+                        "num_questions": quiz.question_count,
                         "total_marks": quiz.total_marks,
                         "start_time": start_time.strftime("%Y-%m-%d %H:%M"),
                         "duration": "Unlimited" if not quiz.time_limit else f"{quiz.time_limit // 60:02}:{quiz.time_limit % 60:02}",
@@ -329,13 +348,8 @@ def get_upcoming_quizzes():
 @quiz_bp.route('/add_question', methods=['POST'])
 @jwt_required()
 @handle_exception
+@admin_required("Only admins can add questions.")
 def add_question():
-    current_user_id = get_jwt_identity()
-    user = User.query.get(int(current_user_id))
-
-    if not user or user.role != 'admin':
-        raise ValidationError("Only admins can add questions.")
-
     data = request.json
     #print(f"Received data: {data}")  # Debugging
 
@@ -351,7 +365,9 @@ def add_question():
     missing_fields = [field for field in required_fields if field not in data or data[field] in (None, "")]
     if missing_fields:
         raise ValidationError(f"Missing required fields: {', '.join(missing_fields)}")
-
+    marks = parse_marks(marks)
+    if marks is None:
+        raise ValidationError("marks must be a non-negative whole number.")
 
     quiz = Quiz.query.get(quiz_id)
     if not quiz:
@@ -395,6 +411,7 @@ def add_question():
 
     #correct_option_ids = [option_objs[i].id for i in correct_option_indices]
     question.correct_options = correct_option_ids
+    quiz.adjust_aggregates(marks_delta=question.marks, count_delta=1)
 
     #print(f"Final correct_options: {question.correct_options}")  # Debugging
 
@@ -424,19 +441,19 @@ def add_question():
 @quiz_bp.route('/edit_question/<int:question_id>', methods=['PUT'])
 @jwt_required()
 @handle_exception
+@admin_required("Only admins can edit questions.")
 def edit_question(question_id):
-    current_user_id = get_jwt_identity()
-    user = User.query.get(int(current_user_id))
-    
-    if not user or user.role != 'admin':
-        raise ValidationError("Only admins can edit questions.")
-
     question = Question.query.get_or_404(question_id)
+    old_marks = question.marks
 
     # Parse request data
     data = request.json
     question.text = data.get('text', question.text)
-    question.marks = data.get('marks', question.marks)
+    if 'marks' in data:
+        marks = parse_marks(data['marks'])
+        if marks is None:
+            raise ValidationError("marks must be a non-negative whole number.")
+        question.marks = marks
     question.negative_marks = data.get('negative_marks', question.negative_marks)
     question.question_type = data.get('question_type', question.question_type)
     question.correct_options = data.get('correct_options', question.correct_options)
@@ -448,7 +465,8 @@ def edit_question(question_id):
         question.options.clear()
         for option_text in options:
             question.options.append(Option(text=option_text, question=question))
-    
+
+    question.quiz.adjust_aggregates(marks_delta=question.marks - old_marks)
     db.session.commit()
     return jsonify({"message": "Question updated successfully!"}), 200
 
@@ -456,14 +474,10 @@ def edit_question(question_id):
 @quiz_bp.route('/delete_question/<int:question_id>', methods=['DELETE'])
 @jwt_required()
 @handle_exception
+@admin_required("Only admins can delete questions.")
 def delete_question(question_id):
-    current_user_id = get_jwt_identity()
-    user = User.query.get(int(current_user_id))
-    
-    if not user or user.role != 'admin':
-        raise ValidationError("Only admins can delete questions.")
-
     question = Question.query.get_or_404(question_id)
+    question.quiz.adjust_aggregates(marks_delta=-question.marks, count_delta=-1)
     db.session.delete(question)
     db.session.commit()
 
@@ -471,28 +485,59 @@ def delete_question(question_id):
 
 @quiz_bp.route('/get_questions/<int:quiz_id>', methods=['GET'])
 @jwt_required()
+@handle_exception
 def get_questions(quiz_id):
     # Get pagination parameters
     page = request.args.get('page', 1, type=int)
     size = request.args.get('size', 10, type=int)
+    if page < 1 or size < 1:
+        raise ValidationError("Page and size must be positive integers.")
+
+    # Answers are only shown to admins
+    is_admin = current_role() == 'admin'
+
+    def serialize_question(question):
+        serialized = {
+            "id": question.id,
+            "text": question.text,
+            "marks": question.marks,
+            "negative_marks": question.negative_marks,
+            "question_type": question.question_type,
+            "options": [{"id": opt.id, "text": opt.text} for opt in question.options]
+        }
+        if is_admin:
+            serialized["correct_options"] = question.correct_options
+        return serialized
+
+    # Options of the whole page in one query rather than one per question
+    query = Question.query.options(selectinload(Question.options)).filter_by(quiz_id=quiz_id)
+
+    # Opt-in keyset pagination ordered by question id
+    cursor = request.args.get('cursor')
+    if cursor is not None:
+        page_data = keyset_paginate(
+            query, "id", Question.id, Question.id, cursor, size,
+            with_count=request.args.get('count', 'false').lower() == 'true'
+        )
+        response = {
+            "questions": [serialize_question(question) for question in page_data["items"]],
+            "next_cursor": page_data["next_cursor"],
+            "has_next": page_data["has_next"],
+            "size": size
+        }
+        if page_data["total"] is not None:
+            response["total_items"] = page_data["total"]
+        return jsonify(response), 200
 
     # Paginate the query
-    pagination = Question.query.filter_by(quiz_id=quiz_id).paginate(page=page, per_page=size, error_out=False)
+    pagination = query.paginate(page=page, per_page=size, error_out=False)
     
     # Get paginated questions
     questions = pagination.items
     
     # Serialize response
     return jsonify({
-        "questions": [{
-            "id": question.id,
-            "text": question.text,
-            "marks": question.marks,
-            "negative_marks": question.negative_marks,
-            "question_type": question.question_type,
-            "correct_options": question.correct_options,
-            "options": [{"id": opt.id, "text": opt.text} for opt in question.options]
-        } for question in questions],
+        "questions": [serialize_question(question) for question in questions],
         "total_pages": pagination.pages,
         "current_page": pagination.page,
         "has_next": pagination.has_next,
@@ -500,17 +545,34 @@ def get_questions(quiz_id):
     }), 200
 
 
+@quiz_bp.route('/paper/<int:quiz_id>', methods=['GET'])
+@jwt_required()
+@handle_exception
+def get_paper(quiz_id):
+    quiz = db.session.query(Quiz.questions_version, Quiz.start_time).filter(Quiz.id == quiz_id).first()
+    if quiz is None:
+        return jsonify({"error": "Quiz not found."}), 404
+
+    start_time = quiz.start_time.replace(tzinfo=timezone.utc) if quiz.start_time.tzinfo is None else quiz.start_time
+    if current_role() != 'admin' and datetime.now(timezone.utc) < start_time:
+        raise ValidationError("Quiz is not available at the moment.")
+
+    # Encoded once per questions_version; clients revalidate with If-None-Match
+    snapshot = paper_service.get_paper(quiz_id, quiz.questions_version)
+    response = Response(snapshot.body, mimetype='application/json')
+    response.set_etag(snapshot.etag)
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
+
+
 @quiz_bp.route('/start_attempt/<int:quiz_id>', methods=['POST'])
 @jwt_required()
 @handle_exception
+@user_required
+@retry_on_locked
 def start_quiz_attempt(quiz_id):
-    current_user_id = get_jwt_identity()
-    user = User.query.get(int(current_user_id))
     now = datetime.now(timezone.utc)
-    
-    if not user:
-        raise ValidationError("User not found.")
-
     quiz = Quiz.query.get_or_404(quiz_id)
 
     start_time = quiz.start_time.replace(tzinfo=timezone.utc) if quiz.start_time.tzinfo is None else quiz.start_time
@@ -519,14 +581,16 @@ def start_quiz_attempt(quiz_id):
     if not (start_time <= now <= end_time):
         raise ValidationError("Quiz is not available at the moment.")
 
-    existing_attempt = QuizAttempt.query.filter_by(user_id=user.id, quiz_id=quiz_id).first()
+    existing_attempt = QuizAttempt.query.filter_by(user_id=current_user_id(), quiz_id=quiz_id).first()
     
     if existing_attempt:
         return jsonify({"message": "Quiz attempt already started.", "attempt_id": existing_attempt.id, "quiz_title": quiz.title, "time_limit": quiz.time_limit}), 200
 
-    attempt = QuizAttempt(user_id=user.id, quiz_id=quiz_id, score=0)
+    attempt = QuizAttempt(user_id=current_user_id(), quiz_id=quiz_id, score=0)
     
     db.session.add(attempt)
+    db.session.flush()
+    analytics_service.record_attempt_started(attempt, quiz)
     db.session.commit()
 
     return jsonify({"message": "Quiz attempt started.", "attempt_id": attempt.id, "quiz_title": quiz.title,"time_limit": quiz.time_limit}), 201
@@ -534,32 +598,30 @@ def start_quiz_attempt(quiz_id):
 @quiz_bp.route('/submit_attempt/<int:attempt_id>', methods=['POST'])
 @jwt_required()
 @handle_exception
+@user_required
+@retry_on_locked
 def submit_quiz_attempt(attempt_id):
-    current_user_id = get_jwt_identity()
-    user = User.query.get(int(current_user_id))
-
-    if not user:
-        raise ValidationError("User not found.")
-
     attempt = QuizAttempt.query.get_or_404(attempt_id)
 
-    if attempt.user_id != user.id:
+    if attempt.user_id != current_user_id():
         raise ValidationError("Unauthorized access to this quiz attempt.")
 
-    # Fetch answers from the request
-    submitted_answers = request.json.get('answers', {})
+    # Answers sent with the submission win over the autosaved ones
+    submitted_answers = (request.get_json(silent=True) or {}).get('answers', {})
+    if not isinstance(submitted_answers, dict):
+        raise ValidationError("answers must be an object of question ID -> selected options.")
+    # Move this attempt's buffered answers to the database first, so none stay behind after scoring
+    autosave_service.drain(attempt.id)
+    submitted_answers = {**autosave_service.saved_answers(attempt.id), **submitted_answers}
 
-    # Calculate the score
-    score = 0
-    correct_answers = {}
-    for question_id, selected_options in submitted_answers.items():
-        question = Question.query.get(question_id)
-        if question:
-            score += question.calculate_score(selected_options)
-            correct_answers[question_id] = question.correct_options
+    # Calculate the score against the quiz's compiled answer key
+    score, correct_answers = get_answer_key(attempt.quiz).score_sheet(submitted_answers)
 
+    analytics_service.record_attempt_scored(attempt, attempt.quiz, score - attempt.score)
     attempt.score = score
+    attempt.submitted_at = datetime.now(timezone.utc)
     db.session.commit()
+    leaderboard_service.record_score(attempt.quiz_id, attempt.user_id, score)
 
     return jsonify({
         "message": "Quiz submitted successfully!", 
@@ -570,28 +632,108 @@ def submit_quiz_attempt(attempt_id):
     }), 200
 
 
-@quiz_bp.route('/get_attempt_result/<int:attempt_id>', methods=['GET'])
+@quiz_bp.route('/autosave/<int:attempt_id>', methods=['POST'])
 @jwt_required()
 @handle_exception
-def get_attempt_result(attempt_id):
-    current_user_id = get_jwt_identity()
-    user = User.query.get(int(current_user_id))
+@user_required
+def autosave_attempt(attempt_id):
+    attempt = QuizAttempt.query.get_or_404(attempt_id)
 
-    if not user:
-        raise ValidationError("User not found.")
+    if attempt.user_id != current_user_id():
+        raise ValidationError("Unauthorized access to this quiz attempt.")
+
+    # Buffered only; a background flush writes the answers to the database
+    saved = autosave_service.save(attempt, (request.get_json(silent=True) or {}).get('answers'))
+    return jsonify({"message": "Answers saved.", "saved": saved}), 202
 
+
+@quiz_bp.route('/get_attempt_result/<int:attempt_id>', methods=['GET'])
+@jwt_required()
+@handle_exception
+@user_required
+def get_attempt_result(attempt_id):
     attempt = QuizAttempt.query.get_or_404(attempt_id)
 
-    if attempt.user_id != user.id:
+    if attempt.user_id != current_user_id():
         raise ValidationError("Unauthorized access to this quiz attempt.")
 
     return jsonify({
         "attempt_id": attempt.id,
         "quiz_id": attempt.quiz_id,
         "score": attempt.score,
-        "created_at": attempt.created_at.isoformat()
+        "created_at": attempt.attempt_date.isoformat()
+    }), 200
+
+def _with_names(entries):
+    """Attach user names to leaderboard entries with a single query."""
+    user_ids = [entry["user_id"] for entry in entries]
+    names = dict(db.session.query(User.id, User.full_name).filter(User.id.in_(user_ids)).all()) if user_ids else {}
+    for entry in entries:
+        entry["name"] = names.get(entry["user_id"])
+    return entries
+
+
+def _quiz_exists(quiz_id):
+    """Checked before a leaderboard lookup, so unknown quiz IDs never create a board."""
+    return db.session.query(Quiz.id).filter(Quiz.id == quiz_id).first() is not None
+
+
+@quiz_bp.route('/leaderboard/<int:quiz_id>', methods=['GET'])
+@jwt_required()
+@handle_exception
+def get_leaderboard(quiz_id):
+    n = request.args.get('n', 10, type=int)
+    if n < 1 or n > 100:
+        raise ValidationError("n must be between 1 and 100.")
+    if not _quiz_exists(quiz_id):
+        return jsonify({"error": "Quiz not found."}), 404
+
+    return jsonify({
+        "quiz_id": quiz_id,
+        "top": _with_names(leaderboard_service.top(quiz_id, n))
     }), 200
 
+
+@quiz_bp.route('/leaderboard/<int:quiz_id>/me', methods=['GET'])
+@jwt_required()
+@handle_exception
+def get_my_rank(quiz_id):
+    if not _quiz_exists(quiz_id):
+        return jsonify({"error": "Quiz not found."}), 404
+    standing = leaderboard_service.standing(quiz_id, current_user_id())
+    if standing is None:
+        raise ValidationError("You have not attempted this quiz.")
+
+    return jsonify({"quiz_id": quiz_id, "user_id": current_user_id(), **standing}), 200
+
+
+@quiz_bp.route('/leaderboard/<int:quiz_id>/around', methods=['GET'])
+@jwt_required()
+@handle_exception
+def get_leaderboard_around(quiz_id):
+    radius = request.args.get('radius', 5, type=int)
+    rank = request.args.get('rank', type=int)
+    if radius < 0 or radius > 50:
+        raise ValidationError("radius must be between 0 and 50.")
+    if not _quiz_exists(quiz_id):
+        return jsonify({"error": "Quiz not found."}), 404
+
+    # Default to the caller's own position
+    if rank is None:
+        standing = leaderboard_service.standing(quiz_id, current_user_id())
+        if standing is None:
+            raise ValidationError("You have not attempted this quiz.")
+        rank = standing["rank"]
+    if rank < 1:
+        raise ValidationError("rank must be a positive integer.")
+
+    return jsonify({
+        "quiz_id": quiz_id,
+        "rank": rank,
+        "entries": _with_names(leaderboard_service.around(quiz_id, rank, radius))
+    }), 200
+
+
 @quiz_bp.route('/user_attempts', methods=['GET'])
 @jwt_required()
 @handle_exception
@@ -607,7 +749,7 @@ def get_user_attempts():
             "quiz_title": quiz.title,
             "subject": Subject.query.filter_by(id=quiz.subject_id).all()[0].name,
             "attempt_id": attempt.id,
-            "num_questions": quiz.questions.count(),
+            "num_questions": quiz.question_count,
             "score": attempt.score,
             "total_marks": quiz.total_marks,
             "date": attempt.attempt_date.strftime("%Y-%m-%d %H:%M")
@@ -621,71 +763,27 @@ def get_user_attempts():
 @handle_exception
 #@cache.cached(timeout=3600, key_prefix='user_summary')
 def get_user_summary():
-    user_id = get_jwt_identity()
-    # print(f"User ID: {user_id}")
-    
-    # Fix the query to properly join tables and handle NULL values
-    subject_scores = db.session.query(
-        Subject.name,
-        func.coalesce(func.avg(QuizAttempt.score), 0.0)  # Handle NULL values
-    ).join(
-        Quiz, Quiz.subject_id == Subject.id  # Explicit join condition
-    ).join(
-        QuizAttempt, QuizAttempt.quiz_id == Quiz.id  # Explicit join condition
-    ).filter(
-        QuizAttempt.user_id == user_id
-    ).group_by(
-        Subject.name
-    ).all()
-    
-    # print(f"Subject Scores: {subject_scores}")
-
-    monthly_attempts = db.session.query(
-        func.strftime('%Y-%m', QuizAttempt.attempt_date).label('month'),
-        func.count().label('count')
-    ).filter(
-        QuizAttempt.user_id == user_id
-    ).group_by(
-        'month'
-    ).order_by(
-        'month'
-    ).all()
-
-    #print(f"Monthly Attempts: {monthly_attempts}")
-
+    user_id = int(get_jwt_identity())
+    # Served from the per-user rollup tables maintained on every attempt
+    return jsonify(analytics_service.user_summary(user_id))
 
-    return jsonify({
-        "subject_scores": [
-            {
-                "subject": s[0],
-                "avg_score": float(s[1]) if s[1] is not None else 0.0
-            } for s in subject_scores
-        ],
-        "monthly_attempts": [
-            {
-                "month": m[0],
-                "count": m[1]
-            } for m in monthly_attempts
-        ]
-    })
 
+def _analytics_window():
+    """Optional ?days= window of the admin analytics endpoints, None for all time."""
+    days = request.args.get('days')
+    if days is None:
+        return None
+    if not days.isdigit() or int(days) not in analytics_service.WINDOWS:
+        raise ValidationError(f"days must be one of {', '.join(map(str, analytics_service.WINDOWS))}.")
+    return int(days)
 
 @quiz_bp.route('/admin/top_quizzes', methods=['GET'])
 @jwt_required()
 @handle_exception
-@cache.cached(timeout=3600, key_prefix='top_quizzes')
+@admin_required("Only admins have this facility.")
 def top_quizzes():
-    current_user_id = get_jwt_identity()
-    user = User.query.get(int(current_user_id))
-    
-    if not user or user.role != 'admin':
-        raise ValidationError("Only admins have this facility.")
-    
-    data = db.session.query(
-        Quiz.title,
-        func.count(QuizAttempt.id)
-    ).join(QuizAttempt, Quiz.id == QuizAttempt.quiz_id
-    ).group_by(Quiz.title).order_by(func.count(QuizAttempt.id).desc()).limit(5).all()
+    # Read from the daily rollup maintained on every attempt
+    data = analytics_service.top_quizzes(days=_analytics_window())
 
     return jsonify([
         {"quiz": d[0], "attempts": d[1]} for d in data
@@ -694,106 +792,47 @@ def top_quizzes():
 @quiz_bp.route('/admin/subject_avg_scores', methods=['GET'])
 @jwt_required()
 @handle_exception
-@cache.cached(timeout=3600, key_prefix='subject_avg_scores')
+@admin_required("Only admins have this facility.")
 def subject_avg_scores():
-    current_user_id = get_jwt_identity()
-    user = User.query.get(int(current_user_id))
-
-    if not user or user.role != 'admin':
-        raise ValidationError("Only admins have this facility.")
-
-    total_marks_subquery = db.session.query(
-        Question.quiz_id.label('quiz_id'),
-        func.sum(Question.marks).label('total_marks')
-    ).group_by(
-        Question.quiz_id
-    ).subquery()
-
-    result = db.session.query(
-        Subject.name.label('subject'),
-        func.coalesce(func.avg(QuizAttempt.score/ total_marks_subquery.c.total_marks) * 100, 0.0).label('avg_score_percent')
-    ).join(Quiz, Quiz.subject_id == Subject.id).join(
-        QuizAttempt, QuizAttempt.quiz_id == Quiz.id
-    ).join(
-        total_marks_subquery, total_marks_subquery.c.quiz_id == Quiz.id
-    ).group_by(
-        Subject.name
-    ).all()
+    result = analytics_service.subject_avg_scores(days=_analytics_window())
 
     return jsonify([
         {
-            "subject": row.subject,
-            "avg_score": round(row.avg_score_percent or 0.0, 2)
-        } for row in result
+            "subject": subject,
+            "avg_score": round(avg_score_percent, 2)
+        } for subject, avg_score_percent in result
     ])
 
 @quiz_bp.route('/export/all_csv', methods=['GET'])
 @jwt_required()
 @handle_exception
-
+@admin_required("Only admins have this facility.")
 def export_all_quizzes_csv():
-    current_user_id = get_jwt_identity()
-    user = User.query.get(int(current_user_id))
-
-    if not user or user.role != 'admin':
-        raise ValidationError("Only admins have this facility.")
-
-    attempts = db.session.query(QuizAttempt).join(Quiz).join(User).all()
-    print(f"Fetched {len(attempts)} attempts for CSV export.")
-    # print(attempts)
-
-    # Generate CSV data in-memory
-    output = io.StringIO()
-    writer = csv.writer(output)
-    writer.writerow(['User ID', 'User Name', 'Quiz Title', 'Subject', 'Chapters', 'Total Marks', 'Attempt Date'])
-    print("CSV header written.")
-
-    for attempt in attempts:
-        user_id = attempt.user_id
-        #print(f"Processing attempt for user ID: {user_id}")
-        user_name = User.query.get(user_id).full_name if user_id else 'N/A'
-        #print(f"User name: {user_name}")
-        quiz = Quiz.query.get(attempt.quiz_id)
-        quiz_title = quiz.title if quiz else 'N/A'
-        #print(f"Quiz title: {quiz_title}")
-        subject = Subject.query.get(quiz.subject_id).name if quiz and quiz.subject_id else 'N/A'
-        #print(f"Subject: {subject}")
-        chapters = [Chapter.query.filter_by(id=chapter.id).all()[0].name for chapter in quiz.chapters]
-        chapter_list = ', '.join(chapters)
-        #print(f"Chapter list: {chapter_list}")
-        score = attempt.score
-        #print(f"Score: {score}")
-        attempt_date = attempt.attempt_date.strftime("%Y-%m-%d %H:%M")
-        writer.writerow([user_id, user_name, quiz_title, subject, chapter_list, score, attempt_date])
-
-    print("CSV rows written.")
-    # Prepare response
-    output.seek(0)
-    mem = io.BytesIO()
-    mem.write(output.getvalue().encode('utf-8'))
-    mem.seek(0)
-    output.close()
-
-    return send_file(
-        mem,
-        mimetype='text/csv',
-        download_name='all_quizzes_export.csv',
-        as_attachment=True
+    # Stream rows straight from a single joined query, optionally gzipped
+    chunks = iter_csv(iter_attempt_rows())
+    download_name = 'all_quizzes_export.csv'
+    if request.args.get('gzip', 'false').lower() == 'true':
+        body = iter_gzip(chunks)
+        mimetype = 'application/gzip'
+        download_name += '.gz'
+    else:
+        body = (chunk.encode('utf-8') for chunk in chunks)
+        mimetype = 'text/csv'
+
+    return Response(
+        stream_with_context(body),
+        mimetype=mimetype,
+        headers={"Content-Disposition": f"attachment; filename={download_name}"}
     )
 
 @quiz_bp.route('/export/trigger', methods=['POST'])
 @jwt_required()
 @handle_exception
+@admin_required("Only admins have this facility.")
 def trigger_export():
-    current_user_id = get_jwt_identity()
-    user = User.query.get(int(current_user_id))
-
-    if not user or user.role != 'admin':
-        raise ValidationError("Only admins have this facility.")
-
     # Here you would typically trigger a background task to generate the CSV
     # For simplicity, we'll just return a success message
-    export_all_users_quiz_csv(current_user_id)
+    export_all_users_quiz_csv(current_user_id())
     return jsonify({"message": "Export job started successfully!"}), 200
 
 
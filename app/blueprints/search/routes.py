@@ -0,0 +1,25 @@
+from flask import request, jsonify
+from flask_jwt_extended import jwt_required
+from app.utils.exceptions import handle_exception
+from app.utils.permissions import current_role, user_required
+from app.services import suggest_service
+from . import search_bp
+
+# Suggestions returned per keystroke, overridable with ?limit= up to the maximum
+SUGGEST_LIMIT = 8
+SUGGEST_MAX_LIMIT = 20
+
+
+@search_bp.route('/suggest', methods=['GET'])
+@jwt_required()
+@handle_exception
+@user_required
+def suggest():
+    query = request.args.get('q', '').strip()
+    if not query:
+        return jsonify({"suggestions": []})
+
+    limit = max(1, min(request.args.get('limit', SUGGEST_LIMIT, type=int), SUGGEST_MAX_LIMIT))
+    # Served from this worker's in-memory index; user names are for admins only
+    suggestions = suggest_service.suggest(query, include_private=current_role() == 'admin', limit=limit)
+    return jsonify({"suggestions": suggestions})
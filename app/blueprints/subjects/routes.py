@@ -1,8 +1,9 @@
 from flask import request, jsonify
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from flask_jwt_extended import jwt_required
 from app.extensions import db
 from app.models import Subject, User
 from app.utils.exceptions import handle_exception, ValidationError
+from app.utils.permissions import admin_required, current_user
 from datetime import datetime
 from . import subject_bp
 
@@ -11,13 +12,12 @@ from . import subject_bp
 @jwt_required()
 @handle_exception
 def protected():
-    current_user_id = get_jwt_identity()
-    user = User.query.get(int(current_user_id))
+    user = current_user()
     role = user.role
     data = request.json
     name = data.get('code')
     return jsonify({
-        "user_id" : current_user_id,
+        "user_id" : user.id,
         "user" : user.serialize(),
         "role" : role,
         "sub_name" : name
@@ -27,13 +27,8 @@ def protected():
 @subject_bp.route('/create', methods=['POST'])
 @jwt_required()
 @handle_exception
+@admin_required("Only admins can create subjects.")
 def create_subject():
-    # Check if the current user is an admin
-    current_user_id = get_jwt_identity()
-    user = User.query.get(int(current_user_id))
-    if not user or user.role != 'admin':
-        raise ValidationError("Only admins can create subjects.")
-    
     # Parse data from the request
     data = request.json
     name = data.get('name')
@@ -68,12 +63,8 @@ def create_subject():
 @subject_bp.route('/edit/<int:id>', methods=['PUT'])
 @jwt_required()
 @handle_exception
+@admin_required("Only admins can update subjects.")
 def update_subject(id):
-    current_user_id = get_jwt_identity()
-    user = User.query.get(int(current_user_id))
-    if not user or user.role != 'admin':
-        raise ValidationError("Only admins can update subjects.")
-
     subject = Subject.query.get(id)
     if not subject:
         raise ValidationError("Subject not found.")
@@ -108,12 +99,8 @@ def update_subject(id):
 @subject_bp.route('/delete/<int:id>', methods=['DELETE'])
 @jwt_required()
 @handle_exception
+@admin_required("Only admins can delete subjects.")
 def delete_subject(id):
-    current_user_id = get_jwt_identity()
-    user = User.query.get(int(current_user_id))
-    if not user or user.role != 'admin':
-        raise ValidationError("Only admins can delete subjects.")
-
     subject = Subject.query.get(id)
     if not subject:
         raise ValidationError("Subject not found.")
@@ -1,16 +1,17 @@
-from flask import request, jsonify, send_file, after_this_request
+from flask import request, jsonify, send_file, current_app, url_for
 from datetime import datetime, timezone
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from sqlalchemy import func
 from app.extensions import db, cache   
 from app.models import Chapter, Subject, User, Quiz, Question, Option, QuizAttempt
 from app.utils.exceptions import ValidationError, handle_exception
+from app.utils.permissions import current_user, current_user_id, user_required
+from app.services import search_service, report_service
+from app.tasks.reports import render_user_report
+from app.utils.search_query import parse_search_query, date_filter, overlap_filter, score_filter
 from . import user_bp
-from fpdf import FPDF
-import base64
 import io
-import os
-import tempfile
+import uuid
 
 
 @user_bp.route('/scores')
@@ -37,33 +38,59 @@ def filter_scores():
 @user_bp.route('/search', methods=['GET'])
 @jwt_required()
 @handle_exception
+@user_required
 def user_search():
-    current_user_id = get_jwt_identity()
-    user = User.query.get(int(current_user_id))
-    # Check if valid user
-    if not user :
-        raise ValidationError("User not found.")
-    
     query = request.args.get('q', '').strip().lower()
     if not query:
         return jsonify({"subjects": [], "quizzes": [], "attempts": []})
 
-    # --- Search Subjects (match by title/name) ---
-    subject_results = Subject.query.filter(
-        Subject.name.ilike(f"%{query}%")
-    ).limit(20).all()
-
-    # --- Search Quizzes (match by title) ---
-    quiz_results = Quiz.query.filter(
-        Quiz.start_time.ilike(f"%{query}%") | Quiz.end_time.ilike(f"%{query}%") | Quiz.title.ilike(f"%{query}%") | Quiz.created_at.ilike(f"%{query}%") | Quiz.updated_at.ilike(f"%{query}%")
-    ).limit(20).all()
-
-    # --- Search Attempts (match by user name) ---
-    my_attempts = QuizAttempt.query.filter(
-        QuizAttempt.user_id == int(current_user_id)
-    ).filter(
-        QuizAttempt.attempt_date.ilike(f"%{query}%") | QuizAttempt.score.ilike(f"%{query}%")
-    ).limit(20).all()
+    # Dates and score comparisons become range filters, the rest is free text
+    parsed = parse_search_query(query)
+
+    # --- Search Subjects (ranked full-text match on name) ---
+    subject_results = search_service.search("subject", parsed.text, limit=20) if parsed.text else []
+
+    # Quizzes matching the free text by title, best match first, then quizzes of matching subjects
+    matched_quiz_ids = []
+    if parsed.text:
+        matched_quiz_ids = search_service.search_ids("quiz", parsed.text, limit=200)
+        if subject_results and len(matched_quiz_ids) < 200:
+            matched_quiz_ids += [quiz_id for (quiz_id,) in db.session.query(Quiz.id).filter(
+                Quiz.subject_id.in_([subject.id for subject in subject_results]),
+                Quiz.id.notin_(matched_quiz_ids)
+            ).order_by(Quiz.id).limit(200 - len(matched_quiz_ids))]
+
+    # Free text narrows to the matched quizzes; without it the filters alone decide
+    search_quizzes = bool(matched_quiz_ids) if parsed.text else bool(parsed.date_ranges)
+    search_attempts = bool(matched_quiz_ids) if parsed.text else parsed.has_filters
+
+    # --- Search Quizzes (text match, running in the given dates) ---
+    quiz_results = []
+    if search_quizzes:
+        quizzes = Quiz.query
+        if parsed.text:
+            quizzes = quizzes.filter(Quiz.id.in_(matched_quiz_ids))
+        if parsed.date_ranges:
+            quizzes = quizzes.filter(overlap_filter(Quiz.start_time, Quiz.end_time, parsed.date_ranges))
+        if parsed.text:
+            rank = {quiz_id: i for i, quiz_id in enumerate(matched_quiz_ids)}
+            quiz_results = sorted(quizzes.all(), key=lambda quiz: rank[quiz.id])[:20]
+        else:
+            quiz_results = quizzes.order_by(Quiz.start_time.desc()).limit(20).all()
+
+    # --- Search Attempts (own attempts on matching quizzes, dates and scores) ---
+    my_attempts = []
+    if search_attempts:
+        attempts = QuizAttempt.query.filter(
+            QuizAttempt.user_id == current_user_id()
+        )
+        if parsed.text:
+            attempts = attempts.filter(QuizAttempt.quiz_id.in_(matched_quiz_ids))
+        if parsed.date_ranges:
+            attempts = attempts.filter(date_filter(QuizAttempt.attempt_date, parsed.date_ranges))
+        if parsed.score_bounds:
+            attempts = attempts.filter(score_filter(QuizAttempt.score, parsed.score_bounds))
+        my_attempts = attempts.order_by(QuizAttempt.attempt_date.desc()).limit(20).all()
     
     return jsonify({
         "attempts": [attempt.serialize() for attempt in my_attempts],
@@ -72,66 +99,57 @@ def user_search():
     })
 
 
-@user_bp.route('/generate-pdf', methods=['POST'])
+@user_bp.route('/generate-pdf', methods=['GET', 'POST'])
 @jwt_required()
+@handle_exception
 def generate_pdf():
     # Get current user
-    current_user_id = get_jwt_identity()
-    user = User.query.get(current_user_id)
-    if not user:
+    if current_user() is None:
         return jsonify({"error": "User not found"}), 404
 
-    data = request.json
-    subject_chart = data.get("subject_chart")
-    monthly_chart = data.get("monthly_chart")
-    quiz_attempts = data.get("quiz_attempts", [])
-
-    pdf = FPDF()
-    pdf.add_page()
-    pdf.set_font("Arial", "B", 16)
-    pdf.cell(200, 10, "Your Quiz Report", ln=True, align="C")
-    pdf.ln(10)
-
-    # Add Subject Chart
-    if subject_chart:
-        pdf.cell(200, 10, "Subject Score Chart", ln=True)
-        img_data = base64.b64decode(subject_chart.split(",")[1])
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".png") as temp_img:
-            temp_img.write(img_data)
-            temp_img_path = temp_img.name
-        pdf.image(temp_img_path, x=30, w=150)
-        os.unlink(temp_img_path)  # Clean up the temporary file
-        pdf.ln(10)
-
-    # Add Monthly Attempts Chart
-    if monthly_chart:
-        pdf.cell(200, 10, "Monthly Attempts Chart", ln=True)
-        img_data = base64.b64decode(monthly_chart.split(",")[1])
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".png") as temp_img:
-            temp_img.write(img_data)
-            temp_img_path = temp_img.name
-        pdf.image(temp_img_path, x=40, w=125)
-        os.unlink(temp_img_path)  # Clean up the temporary file
-        pdf.ln(10)
-
-    # Add Quiz Attempts Table
-    pdf.set_font("Arial", "B", 12)
-    pdf.cell(200, 10, "Quiz Attempts", ln=True)
-    pdf.set_font("Arial", "", 10)
-    for attempt in quiz_attempts:
-        pdf.cell(200, 10, f"{attempt['quiz_title']}: {attempt['score']} / {attempt['total_marks']}", ln=True)
-
-    pdf_path = os.path.join(os.path.dirname(__file__), '..', "monthly_report.pdf")
-    pdf_path = os.path.abspath(pdf_path)
-    pdf.output(pdf_path)
-
-    @after_this_request
-    def cleanup(response):
-        try:
-            if os.path.exists(pdf_path):
-                os.remove(pdf_path)
-        except Exception as e:
-            print(f"Error deleting file {pdf_path}: {e}")
-        return response
-
-    return send_file(pdf_path, as_attachment=True, mimetype="application/pdf")
\ No newline at end of file
+    # Charts and attempts come from the database; anything in the body is ignored
+    user_id = current_user_id()
+    data = report_service.report_data(user_id)
+    version = report_service.data_version(data)
+
+    # Large reports, or on request, render in a worker and are fetched from /reports/<id>
+    run_async = request.args.get('async', 'false').lower() == 'true'
+    if report_service.cached_pdf(user_id, version) is None and (
+            run_async or len(data["attempts"]) > current_app.config['REPORT_ASYNC_ATTEMPTS']):
+        report_id = uuid.uuid4().hex
+        report_service.save_report(user_id, report_id, "pending")
+        render_user_report.delay(user_id, report_id)
+        return jsonify({
+            "report_id": report_id,
+            "status": "pending",
+            "download_url": url_for('user.download_report', report_id=report_id)
+        }), 202
+
+    version, pdf = report_service.build_report(user_id, data)
+    return _send_report(version, pdf)
+
+
+@user_bp.route('/reports/<report_id>', methods=['GET'])
+@jwt_required()
+@handle_exception
+def download_report(report_id):
+    user_id = current_user_id()
+    report = report_service.load_report(user_id, report_id)
+    if report is None:
+        return jsonify({"error": "Report not found or expired."}), 404
+    if report["status"] == "pending":
+        return jsonify({"report_id": report_id, "status": "pending"}), 202
+    if report["status"] == "failed":
+        return jsonify({"report_id": report_id, "status": "failed", "error": report["error"]}), 500
+
+    pdf = report_service.cached_pdf(user_id, report["version"])
+    version = report["version"]
+    if pdf is None:
+        version, pdf = report_service.build_report(user_id)
+    return _send_report(version, pdf)
+
+
+def _send_report(version, pdf):
+    # The data version is a strong ETag, so a GET for an unchanged report is answered with 304
+    return send_file(io.BytesIO(pdf), as_attachment=True, download_name="quiz_report.pdf",
+                     mimetype="application/pdf", etag=version, conditional=True)
@@ -1,7 +1,57 @@
 # backend/app/celery_app.py
 
-from celery import Celery
+from celery import Celery, Task
+from celery.signals import worker_process_init
+from celery.utils.log import get_task_logger
+from flask import has_app_context
+from app.config import Config
 import os
+import time
+
+logger = get_task_logger(__name__)
+
+_flask_app = None
+
+def get_flask_app():
+    """
+    Return the Flask app shared by every task run in this process.
+    Workers build it once in worker_process_init, anything else on first use.
+    """
+    global _flask_app
+    if _flask_app is None:
+        from app import create_app
+        _flask_app = create_app()
+    return _flask_app
+
+
+class FlaskTask(Task):
+    """
+    Runs each task inside an app context of the process-wide Flask app. The
+    context is pushed per task so every run gets its own DB session, which
+    Flask-SQLAlchemy removes when the context is torn down. Run times are
+    logged per task.
+    """
+
+    def __call__(self, *args, **kwargs):
+        # Called inline from a request or CLI command, reuse the caller's context
+        if has_app_context():
+            return super().__call__(*args, **kwargs)
+
+        started = time.perf_counter()
+        with get_flask_app().app_context():
+            try:
+                return super().__call__(*args, **kwargs)
+            finally:
+                logger.info(
+                    "Task %s[%s] ran in %.1f ms",
+                    self.name, self.request.id, (time.perf_counter() - started) * 1000
+                )
+
+
+@worker_process_init.connect
+def warm_flask_app(**kwargs):
+    get_flask_app()
+
 
 def make_celery(app=None):
     broker_url = os.getenv("CELERY_BROKER_URL")
@@ -11,11 +61,34 @@ def make_celery(app=None):
         app.import_name if app else __name__,
         broker=broker_url,
         backend=result_backend,
+        task_cls=FlaskTask,
         include=[
             'app.tasks.reminders',
             'app.tasks.monthly_reports',
             'app.tasks.csv_export',
+            'app.tasks.maintenance',
+            'app.tasks.reports',
+            'app.tasks.autosave',
+            'app.tasks.papers',
+            'app.tasks.imports',
         ]
     )
 
 celery = make_celery()
+
+# Periodic jobs, run by `celery -A app.celery_app.celery beat` (or a worker started with --beat).
+# start_scheduler() is not enabled in the web app, so these only run from here.
+celery.conf.beat_schedule = {
+    'reconcile-entity-counters': {
+        'task': 'app.tasks.maintenance.reconcile_entity_counters',
+        'schedule': 3600.0,
+    },
+    'flush-autosaves': {
+        'task': 'app.tasks.autosave.flush_autosaves',
+        'schedule': float(Config.AUTOSAVE_FLUSH_INTERVAL),
+    },
+    'warm-quiz-papers': {
+        'task': 'app.tasks.papers.warm_quiz_papers',
+        'schedule': 300.0,
+    },
+}
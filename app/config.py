@@ -9,11 +9,74 @@ class Config:
     JWT_TOKEN_LOCATION = ['headers'] 
     SQLALCHEMY_DATABASE_URI = os.environ['DATABASE_URL']
     SQLALCHEMY_TRACK_MODIFICATIONS = False
-    MAIL_SERVER = 'localhost'
-    MAIL_PORT = 1025
+    # Connections per worker process; a sync gunicorn worker only ever needs one or two
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        'pool_size': int(os.environ.get('DB_POOL_SIZE', 5)),
+        'max_overflow': int(os.environ.get('DB_MAX_OVERFLOW', 10)),
+        'pool_timeout': int(os.environ.get('DB_POOL_TIMEOUT', 30)),
+    }
+    # Reads of GET requests and read_only() blocks use their own pool, on this
+    # replica if set, otherwise on the primary database
+    READ_DATABASE_URL = os.environ.get('READ_DATABASE_URL')
+    READ_DB_POOL_SIZE = int(os.environ.get('READ_DB_POOL_SIZE', 5))
+    READ_DB_MAX_OVERFLOW = int(os.environ.get('READ_DB_MAX_OVERFLOW', 10))
+    # SQLite connection profile (ignored on other backends)
+    SQLITE_JOURNAL_MODE = os.environ.get('SQLITE_JOURNAL_MODE', 'WAL')
+    SQLITE_SYNCHRONOUS = os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL')  # Safe with WAL, fsync at checkpoints
+    SQLITE_CACHE_SIZE = int(os.environ.get('SQLITE_CACHE_SIZE', -64000))  # Negative = KiB, so 64 MB
+    SQLITE_MMAP_SIZE = int(os.environ.get('SQLITE_MMAP_SIZE', 256 * 1024 * 1024))  # Bytes
+    SQLITE_BUSY_TIMEOUT = int(os.environ.get('SQLITE_BUSY_TIMEOUT', 5000))  # ms to wait for a lock
+    # Re-runs of a write view that still found the database locked, and the first backoff
+    DB_LOCK_RETRIES = int(os.environ.get('DB_LOCK_RETRIES', 3))
+    DB_LOCK_RETRY_DELAY = float(os.environ.get('DB_LOCK_RETRY_DELAY', 0.05))  # Seconds, doubled per retry
+    MAIL_SERVER = os.environ.get('MAIL_SERVER', 'localhost')  # MailHog by default
+    MAIL_PORT = int(os.environ.get('MAIL_PORT', 1025))
     MAIL_USERNAME = ''
     MAIL_PASSWORD = ''
     MAIL_USE_TLS = False
     MAIL_USE_SSL = False
     MAIL_DEFAULT_SENDER = 'no-reply@quiz.local'
-
+    MAIL_BATCH_SIZE = int(os.environ.get('MAIL_BATCH_SIZE', 100))  # Messages per SMTP connection
+    MAIL_RATE_LIMIT = float(os.environ.get('MAIL_RATE_LIMIT', 0))  # Messages per second, 0 = unthrottled
+    MAIL_MAX_RETRIES = int(os.environ.get('MAIL_MAX_RETRIES', 3))
+    MAIL_RETRY_BACKOFF = float(os.environ.get('MAIL_RETRY_BACKOFF', 2.0))  # Seconds, doubled per retry
+    REDIS_URL = os.environ.get('REDIS_URL', 'redis://localhost:6379/0')
+    # Compiled answer keys kept per worker process
+    ANSWER_KEY_CACHE_SIZE = int(os.environ.get('ANSWER_KEY_CACHE_SIZE', 256))
+    # 'redis' shares leaderboards across workers, 'local' keeps them in-process
+    LEADERBOARD_BACKEND = os.environ.get('LEADERBOARD_BACKEND', 'redis')
+    # Labels held by each worker's autocomplete index, and how often it is rebuilt
+    SUGGEST_MAX_ENTRIES = int(os.environ.get('SUGGEST_MAX_ENTRIES', 200000))
+    SUGGEST_REFRESH_SECONDS = int(os.environ.get('SUGGEST_REFRESH_SECONDS', 300))
+    # Users per fan-out subtask of the daily reminder job
+    REMINDER_CHUNK_SIZE = int(os.environ.get('REMINDER_CHUNK_SIZE', 500))
+    # werkzeug hash method for new passwords; older hashes are replaced at login
+    PASSWORD_HASH_METHOD = os.environ.get('PASSWORD_HASH_METHOD', 'scrypt:32768:8:1')
+    PASSWORD_SALT_LENGTH = int(os.environ.get('PASSWORD_SALT_LENGTH', 16))
+    # Hashing processes per web worker (0 = hash in the request thread), the hashes
+    # each worker may have queued before answering 503, and the wait for one
+    HASH_POOL_WORKERS = int(os.environ.get('HASH_POOL_WORKERS', 2))
+    HASH_QUEUE_LIMIT = int(os.environ.get('HASH_QUEUE_LIMIT', 32))
+    HASH_TIMEOUT = float(os.environ.get('HASH_TIMEOUT', 10))  # Seconds
+    # Rows accepted per /admin/users/import upload, and rows per INSERT batch and commit
+    USER_IMPORT_MAX_ROWS = int(os.environ.get('USER_IMPORT_MAX_ROWS', 10000))
+    USER_IMPORT_BATCH_SIZE = int(os.environ.get('USER_IMPORT_BATCH_SIZE', 500))
+    # Larger uploads are imported by a Celery worker, whose report is kept this long
+    USER_IMPORT_SYNC_ROWS = int(os.environ.get('USER_IMPORT_SYNC_ROWS', 100))
+    USER_IMPORT_JOB_TTL = int(os.environ.get('USER_IMPORT_JOB_TTL', 86400))  # Seconds
+    USER_IMPORT_STAGE_TTL = int(os.environ.get('USER_IMPORT_STAGE_TTL', 3600))  # Seconds rows wait for a worker
+    # Reports with more attempts than this render in a Celery worker, and are kept for download this long
+    REPORT_ASYNC_ATTEMPTS = int(os.environ.get('REPORT_ASYNC_ATTEMPTS', 200))
+    REPORT_TTL = int(os.environ.get('REPORT_TTL', 3600))  # Seconds
+    REPORT_CACHE_TTL = int(os.environ.get('REPORT_CACHE_TTL', 86400))  # Seconds a rendered PDF is reused
+    # 'redis' buffers autosaved answers for every worker, 'local' keeps them in-process
+    AUTOSAVE_BACKEND = os.environ.get('AUTOSAVE_BACKEND', 'redis')
+    AUTOSAVE_MAX_ANSWERS = int(os.environ.get('AUTOSAVE_MAX_ANSWERS', 200))  # Per /quiz/autosave request
+    # Seconds between flushes of the buffer, and attempts written per INSERT and commit
+    AUTOSAVE_FLUSH_INTERVAL = int(os.environ.get('AUTOSAVE_FLUSH_INTERVAL', 10))
+    AUTOSAVE_FLUSH_BATCH = int(os.environ.get('AUTOSAVE_FLUSH_BATCH', 200))
+    AUTOSAVE_BUFFER_TTL = int(os.environ.get('AUTOSAVE_BUFFER_TTL', 86400))  # Seconds unflushed answers are kept
+    # Question papers kept per worker process, and seconds one stays in the shared cache
+    PAPER_CACHE_SIZE = int(os.environ.get('PAPER_CACHE_SIZE', 128))
+    PAPER_CACHE_TTL = int(os.environ.get('PAPER_CACHE_TTL', 86400))
+    PAPER_WARM_AHEAD = int(os.environ.get('PAPER_WARM_AHEAD', 15))  # Minutes before start_time a paper is built
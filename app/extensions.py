@@ -3,9 +3,21 @@ from flask_migrate import Migrate
 from flask_jwt_extended import JWTManager
 from flask_mail import Mail
 from flask_caching import Cache
+from app.utils.db import RoutingSession
 
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 migrate = Migrate()
 jwt = JWTManager()
 mail = Mail()
 cache = Cache(config={'CACHE_TYPE': 'RedisCache', 'CACHE_REDIS_URL': 'redis://localhost:6379/0'})
+
+_redis_client = None
+
+def get_redis():
+    """Return a process-wide Redis client built from the app's REDIS_URL."""
+    global _redis_client
+    if _redis_client is None:
+        import redis
+        from flask import current_app
+        _redis_client = redis.Redis.from_url(current_app.config['REDIS_URL'], decode_responses=True)
+    return _redis_client
@@ -49,7 +49,8 @@ class Subject(db.Model):
 quiz_chapters = db.Table(
     'quiz_chapters',
     db.Column('quiz_id', db.Integer, db.ForeignKey('quiz.id'), primary_key=True),
-    db.Column('chapter_id', db.Integer, db.ForeignKey('chapter.id'), primary_key=True)
+    db.Column('chapter_id', db.Integer, db.ForeignKey('chapter.id'), primary_key=True),
+    db.Index('ix_quiz_chapters_chapter_id', 'chapter_id')
 )
 
 class Chapter(db.Model):
@@ -58,7 +59,7 @@ class Chapter(db.Model):
     code = db.Column(db.String(20), unique=True, nullable=False)
     description = db.Column(db.Text, nullable=True)
     created_at = db.Column(db.DateTime, default=db.func.now())
-    subject_id = db.Column(db.Integer, db.ForeignKey('subject.id'), nullable=False)
+    subject_id = db.Column(db.Integer, db.ForeignKey('subject.id'), nullable=False, index=True)
 
     quizzes = db.relationship('Quiz', secondary=quiz_chapters, back_populates='chapters')
 
@@ -77,22 +78,57 @@ class Quiz(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(150), nullable=False)
     description = db.Column(db.Text, nullable=True)
-    subject_id = db.Column(db.Integer, db.ForeignKey('subject.id'), nullable=False)  # Associate with Subject
+    subject_id = db.Column(db.Integer, db.ForeignKey('subject.id'), nullable=False, index=True)  # Associate with Subject
     time_limit = db.Column(db.Integer, nullable=True)  # Time in minutes, null for no limit
-    start_time = db.Column(db.DateTime(timezone=True), nullable=False, default=datetime.now(timezone.utc))  # When quiz starts
-    end_time = db.Column(db.DateTime(timezone=True), nullable=False)  # When quiz ends
-    created_at = db.Column(db.DateTime(timezone=True), default=datetime.now(timezone.utc), nullable=False)
+    start_time = db.Column(db.DateTime(timezone=True), nullable=False, default=datetime.now(timezone.utc), index=True)  # When quiz starts
+    end_time = db.Column(db.DateTime(timezone=True), nullable=False, index=True)  # When quiz ends
+    created_at = db.Column(db.DateTime(timezone=True), default=datetime.now(timezone.utc), nullable=False, index=True)
     updated_at = db.Column(db.DateTime(timezone=True), onupdate=datetime.now(timezone.utc))
 
+    # Denormalized aggregates over questions, kept in sync by the question routes
+    total_marks = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    question_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    # Bumped on every question change so cached derivatives can be invalidated
+    questions_version = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+
     # Relationships
     chapters = db.relationship('Chapter', secondary=quiz_chapters, back_populates='quizzes')
     questions = db.relationship('Question', backref='quiz', cascade='all, delete-orphan', lazy='dynamic')
     attempts = db.relationship('QuizAttempt', backref='quiz', cascade='all, delete-orphan')
-    
-    @property
-    def total_marks(self):
-        """Calculate total marks based on marks assigned to questions."""
-        return sum(question.marks for question in self.questions)
+
+    # Ids are never reused, so caches keyed by quiz id cannot outlive a deleted quiz
+    __table_args__ = {'sqlite_autoincrement': True}
+
+    def adjust_aggregates(self, marks_delta=0, count_delta=0):
+        """
+        Apply a delta to the stored aggregates as part of the current transaction
+        and bump questions_version. The update is expressed in SQL so concurrent
+        writers do not lose increments.
+        """
+        self.total_marks = Quiz.total_marks + marks_delta
+        self.question_count = Quiz.question_count + count_delta
+        self.questions_version = Quiz.questions_version + 1
+
+    @classmethod
+    def recompute_aggregates(cls, quiz_ids=None):
+        """
+        Recompute total_marks and question_count from the question table in bulk.
+        Args:
+            quiz_ids (list): Restrict the update to these quizzes, all quizzes if None.
+        Returns:
+            int: Number of quizzes updated.
+        """
+        marks = select(func.coalesce(func.sum(Question.marks), 0)).where(
+            Question.quiz_id == cls.id
+        ).scalar_subquery()
+        count = select(func.count(Question.id)).where(
+            Question.quiz_id == cls.id
+        ).scalar_subquery()
+
+        stmt = db.update(cls).values(total_marks=marks, question_count=count)
+        if quiz_ids is not None:
+            stmt = stmt.where(cls.id.in_(quiz_ids))
+        return db.session.execute(stmt).rowcount
 
     def serialize(self):
         return {
@@ -102,7 +138,7 @@ class Quiz(db.Model):
             "duration": self.time_limit,
             "total_marks": self.total_marks,
             "chapters": [chapter.serialize() for chapter in self.chapters],
-            "num_of_questions": self.questions.count()
+            "num_of_questions": self.question_count
         }
     
     def __repr__(self):
@@ -111,7 +147,7 @@ class Quiz(db.Model):
 
 class Question(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    quiz_id = db.Column(db.Integer, db.ForeignKey('quiz.id'), nullable=False)
+    quiz_id = db.Column(db.Integer, db.ForeignKey('quiz.id'), nullable=False, index=True)
     text = db.Column(db.Text, nullable=False)
     marks = db.Column(db.Integer, nullable=False)  # Marks for a correct response
     negative_marks = db.Column(db.Float, nullable=False, default=0.0)  # Negative marks for incorrect options
@@ -119,6 +155,8 @@ class Question(db.Model):
     correct_options = db.Column(db.JSON, nullable=False)  # Correct option(s), stored as JSON
     options = db.relationship('Option', backref='question', cascade='all, delete-orphan')
 
+    __table_args__ = {'sqlite_autoincrement': True}
+
     def calculate_score(self, selected_options):
         """
         Calculate the score for the question based on selected options.
@@ -127,7 +165,6 @@ class Question(db.Model):
         Returns:
             float: Score for the question.
         """
-        print(selected_options)
         if not selected_options:
             return 0
         if self.question_type == 'MCQ':
@@ -151,9 +188,11 @@ class Question(db.Model):
 
 class Option(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    question_id = db.Column(db.Integer, db.ForeignKey('question.id'), nullable=False)
+    question_id = db.Column(db.Integer, db.ForeignKey('question.id'), nullable=False, index=True)
     text = db.Column(db.Text, nullable=False)
 
+    __table_args__ = {'sqlite_autoincrement': True}
+
     def __repr__(self):
         return f"<Option(id={self.id}, question_id={self.question_id}, text={self.text[:50]})>"
 
@@ -163,7 +202,17 @@ class QuizAttempt(db.Model):
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     quiz_id = db.Column(db.Integer, db.ForeignKey('quiz.id'), nullable=False)
     score = db.Column(db.Float, nullable=False, default=0)
-    attempt_date = db.Column(db.DateTime(timezone=True), default=datetime.now(timezone.utc))
+    attempt_date = db.Column(db.DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
+    submitted_at = db.Column(db.DateTime(timezone=True), nullable=True)  # Last submission, None while in progress
+    answers = db.relationship('AttemptAnswer', backref='attempt', cascade='all, delete-orphan')
+
+    # A user's attempts by date, for history and search date filters, and a
+    # quiz's attempts by score, for leaderboards and rankings
+    __table_args__ = (
+        db.Index('ix_quiz_attempt_user_id_attempt_date', 'user_id', 'attempt_date'),
+        db.Index('ix_quiz_attempt_quiz_id_score', 'quiz_id', 'score'),
+        {'sqlite_autoincrement': True},
+    )
 
     def serialize(self):
         return {
@@ -177,3 +226,69 @@ class QuizAttempt(db.Model):
     def __repr__(self):
         return f"<QuizAttempt(id={self.id}, user_id={self.user_id}, quiz_id={self.quiz_id})>"
 
+
+class AttemptAnswer(db.Model):
+    """
+    Latest autosaved selection per attempt and question, written in batches by
+    autosave_service.flush. saved_at is when the answer was given, not flushed.
+    """
+    attempt_id = db.Column(db.Integer, db.ForeignKey('quiz_attempt.id'), primary_key=True)
+    question_id = db.Column(db.Integer, primary_key=True)
+    selected = db.Column(db.JSON, nullable=True)
+    saved_at = db.Column(db.DateTime(timezone=True), nullable=False)
+
+    def __repr__(self):
+        return f"<AttemptAnswer(attempt_id={self.attempt_id}, question_id={self.question_id})>"
+
+
+class UserSubjectStat(db.Model):
+    """Per user and subject attempt rollup, maintained on every attempt and submission."""
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    subject_id = db.Column(db.Integer, db.ForeignKey('subject.id'), primary_key=True)
+    attempt_count = db.Column(db.Integer, nullable=False, default=0)
+    score_sum = db.Column(db.Float, nullable=False, default=0.0)
+
+    def __repr__(self):
+        return f"<UserSubjectStat(user_id={self.user_id}, subject_id={self.subject_id}, attempts={self.attempt_count})>"
+
+
+class UserMonthStat(db.Model):
+    """Per user and calendar month ('YYYY-MM') attempt count rollup."""
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    month = db.Column(db.String(7), primary_key=True)
+    attempt_count = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<UserMonthStat(user_id={self.user_id}, month={self.month}, attempts={self.attempt_count})>"
+
+
+class QuizDailyStat(db.Model):
+    """Attempts started per quiz and day, feeding the admin top quizzes chart."""
+    quiz_id = db.Column(db.Integer, db.ForeignKey('quiz.id'), primary_key=True)
+    day = db.Column(db.Date, primary_key=True, index=True)
+    attempt_count = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<QuizDailyStat(quiz_id={self.quiz_id}, day={self.day}, attempts={self.attempt_count})>"
+
+
+class SubjectDailyStat(db.Model):
+    """Attempts, score sum and score percentage sum per subject and day."""
+    subject_id = db.Column(db.Integer, db.ForeignKey('subject.id'), primary_key=True)
+    day = db.Column(db.Date, primary_key=True, index=True)
+    attempt_count = db.Column(db.Integer, nullable=False, default=0)
+    score_sum = db.Column(db.Float, nullable=False, default=0.0)
+    percent_sum = db.Column(db.Float, nullable=False, default=0.0)
+
+    def __repr__(self):
+        return f"<SubjectDailyStat(subject_id={self.subject_id}, day={self.day}, attempts={self.attempt_count})>"
+
+
+class EntityCounter(db.Model):
+    """Row count of a table, kept current by the listeners in stats_service."""
+    name = db.Column(db.String(30), primary_key=True)
+    value = db.Column(db.Integer, nullable=False, default=0)
+    reconciled_at = db.Column(db.DateTime(timezone=True), nullable=True)
+
+    def __repr__(self):
+        return f"<EntityCounter(name={self.name}, value={self.value})>"
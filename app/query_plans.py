@@ -0,0 +1,242 @@
+"""
+Query plan regression check for the routes.
+
+Builds a throwaway SQLite database with a small seeded data set, calls every
+GET route (as an admin and as a student) plus the hot write routes, records
+each statement they run, and asks SQLite for its EXPLAIN QUERY PLAN. Any full
+table or full index scan that is not listed in ALLOWED_SCANS is reported; an
+index walked in ORDER BY order up to a LIMIT is not a full scan.
+SQLite plans from its heuristics when no ANALYZE statistics exist, so a small
+data set gets the same plans as production-sized tables.
+
+Run with `flask check_query_plans`; it exits non-zero when a scan is found.
+"""
+import os
+import re
+import shutil
+import tempfile
+from sqlalchemy import event
+
+# (route, table) pairs where reading the whole table is the point of the route
+ALLOWED_SCANS = {
+    ("GET /admin/stats", "entity_counter"): "reads the five counter rows",
+    ("GET /quiz/list", "quiz"): "offset pagination over every quiz, ?cursor= is the indexed mode",
+    ("GET /search/suggest", "quiz"): "first call builds the in-memory suggestion index",
+    ("GET /search/suggest", "subject"): "first call builds the in-memory suggestion index",
+    ("GET /search/suggest", "chapter"): "first call builds the in-memory suggestion index",
+    ("GET /search/suggest", "user"): "first call builds the in-memory suggestion index",
+    ("GET /subjects/", "subject"): "lists every subject",
+    ("GET /subjects/", "chapter"): "lists the chapters of every subject",
+    ("GET /chapters/", "chapter"): "lists every chapter",
+    ("GET /quiz/allquizzes", "quiz"): "lists every quiz",
+    ("GET /admin/search/users", "user"): "an empty query lists every user, a page at a time",
+    ("GET /admin/search/subjects", "subject"): "an empty query lists every subject, a page at a time",
+    ("GET /admin/search/quizzes", "quiz"): "an empty query lists every quiz, a page at a time",
+    ("GET /quiz/export/all_csv", "quiz_attempt"): "exports every attempt",
+    ("GET /quiz/export/all_csv", "quiz_chapters"): "exports every attempt",
+}
+
+_SCAN = re.compile(r'^SCAN (\S+)')
+_LIMIT = re.compile(r'\bLIMIT\b', re.IGNORECASE)
+
+_ROUTE_ARGUMENT = re.compile(r'<(?:int:)?(\w+)>')
+
+# Routes that cannot succeed in the check, with the status they answer instead
+EXPECTED_FAILURES = {
+    "GET /user/reports/<report_id>": (404, "no report exists while the cache is a NullCache"),
+    "GET /admin/users/import/<job_id>": (404, "no import job exists while the cache is a NullCache"),
+}
+
+# Query string sent to every GET route, covering the search and window parameters
+_GET_PARAMS = {"q": "physics >=1", "days": "30", "limit": "5"}
+
+
+def _seed(db):
+    from datetime import datetime, timedelta, timezone
+    from app.models import User, Subject, Chapter, Quiz, Question, Option, QuizAttempt
+    from app.services.stats_service import reconcile
+    from app.utils.auth import hash_password
+
+    now = datetime.now(timezone.utc)
+    password = hash_password('plans')
+    admin = User(email='admin@plans.local', password_hash=password, full_name='Plan Admin', role='admin')
+    student = User(email='student@plans.local', password_hash=password, full_name='Plan Student', role='user')
+    # Sits the quiz during the check, autosaving and then submitting
+    candidate = User(email='candidate@plans.local', password_hash=password, full_name='Plan Candidate', role='user')
+    subject = Subject(name='Physics', code='PHY', description='Mechanics')
+    chapter = Chapter(name='Motion', code='PHY-1', subject=subject)
+    db.session.add_all([admin, student, candidate, subject, chapter])
+    db.session.flush()
+    quiz = Quiz(title='Physics Motion', subject_id=subject.id, start_time=now - timedelta(days=1),
+                end_time=now + timedelta(days=1), created_at=now, chapters=[chapter])
+    db.session.add(quiz)
+    db.session.flush()
+
+    for text, marks in (('Unit of force?', 4), ('Unit of work?', 2)):
+        question = Question(quiz_id=quiz.id, text=text, marks=marks, correct_options=[])
+        db.session.add(question)
+        db.session.flush()
+        options = [Option(question_id=question.id, text=label) for label in ('a', 'b', 'c')]
+        db.session.add_all(options)
+        db.session.flush()
+        question.correct_options = [options[0].id]
+        quiz.adjust_aggregates(marks_delta=marks, count_delta=1)
+    # A second open quiz for the student to start an attempt on
+    open_quiz = Quiz(title='Physics Forces', subject_id=subject.id, start_time=now - timedelta(days=1),
+                     end_time=now + timedelta(days=1), created_at=now, chapters=[chapter])
+    admin_attempt = QuizAttempt(user_id=admin.id, quiz_id=quiz.id, score=4, submitted_at=now)
+    student_attempt = QuizAttempt(user_id=student.id, quiz_id=quiz.id, score=2, submitted_at=now)
+    open_attempt = QuizAttempt(user_id=candidate.id, quiz_id=quiz.id, score=0)
+    db.session.add_all([open_quiz, admin_attempt, student_attempt, open_attempt])
+    db.session.commit()
+    reconcile()
+    return {
+        "quiz_id": quiz.id,
+        "open_quiz_id": open_quiz.id,
+        "chapter_id": chapter.id,
+        "question_id": question.id,
+        "option_id": question.correct_options[0],
+        "admin_attempt_id": admin_attempt.id,
+        "attempt_id": student_attempt.id,
+        "open_attempt_id": open_attempt.id,
+    }
+
+
+def _login(client, email):
+    response = client.post('/auth/login', json={"email": email, "password": "plans"})
+    return {"Authorization": f"Bearer {response.get_json()['token']}"}
+
+
+def _calls(app, ids, admin, student, candidate):
+    """(label, method, url, headers, json) for every request the check makes."""
+    quiz_id, attempt_id = ids["quiz_id"], ids["attempt_id"]
+    answers = {str(ids["question_id"]): ids["option_id"]}
+    calls = [("POST /auth/login", "POST", "/auth/login", {},
+              {"email": "student@plans.local", "password": "plans"})]
+    for rule in sorted(app.url_map.iter_rules(), key=lambda rule: rule.rule):
+        if 'GET' not in rule.methods or rule.endpoint == 'static':
+            continue
+        # Admin-only routes refuse students before running any query
+        callers = [(admin, ids["admin_attempt_id"])]
+        if not getattr(app.view_functions[rule.endpoint], 'admin_only', False):
+            callers.append((student, attempt_id))
+        for headers, own_attempt in callers:
+            # Route arguments are filled with the seeded ids; unknown ones (report ids) with 1
+            values = {**ids, "attempt_id": own_attempt}
+            url = _ROUTE_ARGUMENT.sub(lambda match: str(values.get(match.group(1), 1)), rule.rule)
+            calls.append((f"GET {rule.rule}", "GET", url, headers, None))
+
+    calls += [
+        ("GET /quiz/list?cursor", "GET", "/quiz/list?cursor=&sort=created_at", student, None),
+        ("GET /quiz/list?cursor", "GET", "/quiz/list?cursor=&sort=start_time&subject_id=1", student, None),
+        ("GET /admin/search/users", "GET", "/admin/search/users?q=&page=2", admin, None),
+        ("GET /admin/search/subjects", "GET", "/admin/search/subjects?q=&page=2", admin, None),
+        ("GET /admin/search/quizzes", "GET", "/admin/search/quizzes?q=&page=2", admin, None),
+        ("POST /quiz/start_attempt", "POST", f"/quiz/start_attempt/{ids['open_quiz_id']}", student, None),
+        ("POST /quiz/autosave", "POST", f"/quiz/autosave/{ids['open_attempt_id']}", candidate, {"answers": answers}),
+        ("POST /quiz/submit_attempt", "POST", f"/quiz/submit_attempt/{ids['open_attempt_id']}", candidate,
+         {"answers": answers}),
+        ("PUT /quiz/edit_question", "PUT", f"/quiz/edit_question/{ids['question_id']}", admin,
+         {"text": "Unit of force (SI)?"}),
+        ("PUT /quiz/edit_quiz", "PUT", f"/quiz/edit_quiz/{quiz_id}", admin, {"title": "Physics Motion I"}),
+        ("POST /admin/users/import", "POST", "/admin/users/import", admin,
+         {"users": [{"email": "import@plans.local", "password": "plans", "full_name": "Plan Import"}]}),
+        ("DELETE /quiz/delete_question", "DELETE", f"/quiz/delete_question/{ids['question_id']}", admin, None),
+        ("DELETE /quiz/delete_quiz", "DELETE", f"/quiz/delete_quiz/{quiz_id}", admin, None),
+    ]
+    return calls
+
+
+def _scans(cursor, statement, parameters, tables):
+    cursor.execute(f"EXPLAIN QUERY PLAN {statement}", parameters)
+    plan = [row[-1] for row in cursor.fetchall()]
+    # Walking an index in ORDER BY order stops at the LIMIT, so it is not a full scan
+    bounded = _LIMIT.search(statement) and not any('TEMP B-TREE' in detail for detail in plan)
+    for detail in plan:
+        match = _SCAN.match(detail)
+        if not match or match.group(1) not in tables or 'VIRTUAL TABLE' in detail:
+            continue
+        if bounded and ' USING ' in detail:
+            continue
+        yield match.group(1), detail
+
+
+def check_query_plans():
+    """
+    Returns:
+        list: (route, table, plan detail, statement) for every unexpected scan.
+    Raises:
+        RuntimeError: A call failed, so its queries were not all checked.
+    """
+    from app import create_app
+    from app.extensions import db, cache
+
+    workdir = tempfile.mkdtemp(prefix='query-plans-')
+    try:
+        app = create_app({
+            "SQLALCHEMY_DATABASE_URI": f"sqlite:///{os.path.join(workdir, 'plans.db')}",
+            "TESTING": True,
+            "MAIL_SUPPRESS_SEND": True,
+            "LEADERBOARD_BACKEND": "local",
+            "AUTOSAVE_BACKEND": "local",
+            "READ_DATABASE_URL": None,
+        })
+        cache.init_app(app, config={"CACHE_TYPE": "NullCache"})
+
+        with app.app_context():
+            db.create_all()
+            ids = _seed(db)
+            tables = set(db.metadata.tables)
+
+            client = app.test_client()
+            admin = _login(client, 'admin@plans.local')
+            student = _login(client, 'student@plans.local')
+            candidate = _login(client, 'candidate@plans.local')
+
+            captured = []
+            failures = []
+            current = {"route": None}
+
+            def capture(conn, cursor, statement, parameters, context, executemany):
+                if current["route"] and statement.lstrip().split(None, 1)[0].upper() in ('SELECT', 'UPDATE', 'DELETE', 'WITH'):
+                    captured.append((current["route"], statement, parameters[0] if executemany else parameters))
+
+            engines = set(db.engines.values())
+            for engine in engines:
+                event.listen(engine, 'before_cursor_execute', capture)
+            try:
+                for label, method, url, headers, body in _calls(app, ids, admin, student, candidate):
+                    current["route"] = label
+                    response = client.open(url, method=method, headers=headers, json=body,
+                                           query_string=_GET_PARAMS if method == 'GET' and '?' not in url else None)
+                    current["route"] = None
+                    expected = EXPECTED_FAILURES.get(label, (None,))[0]
+                    if response.status_code >= 400 and response.status_code != expected:
+                        failures.append(f"{method} {url}: HTTP {response.status_code} {response.get_data(as_text=True)[:200]}")
+            finally:
+                for engine in engines:
+                    event.remove(engine, 'before_cursor_execute', capture)
+
+            if failures:
+                raise RuntimeError("Calls failed before all their queries ran:\n" + "\n".join(failures))
+
+            findings = []
+            seen = set()
+            connection = db.engine.raw_connection()
+            try:
+                cursor = connection.cursor()
+                for route, statement, parameters in captured:
+                    if (route, statement) in seen:
+                        continue
+                    seen.add((route, statement))
+                    for table, detail in _scans(cursor, statement, parameters, tables):
+                        if (route, table) not in ALLOWED_SCANS:
+                            findings.append((route, table, detail, statement))
+            finally:
+                connection.close()
+            db.session.remove()
+            for engine in engines:
+                engine.dispose()
+        return findings
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
@@ -0,0 +1,271 @@
+from datetime import datetime, timezone, timedelta
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+from app.extensions import db
+from app.models import (
+    Subject, Quiz, QuizAttempt, UserSubjectStat, UserMonthStat, QuizDailyStat, SubjectDailyStat
+)
+
+# Time windows, in days, accepted by the admin analytics endpoints
+WINDOWS = (7, 30, 90)
+
+
+def _month_key(moment):
+    return moment.strftime('%Y-%m')
+
+
+def _day_key(moment):
+    return moment.date()
+
+
+def _percent(score, total_marks):
+    return score * 100.0 / total_marks if total_marks else 0.0
+
+
+def _bump(model, key, **deltas):
+    """
+    Add deltas to the rollup row identified by key, creating it if needed.
+    Plain UPDATE-then-INSERT keeps this portable across SQL backends; a
+    concurrent insert of the same row is resolved by retrying the UPDATE.
+    """
+    values = {name: getattr(model, name) + delta for name, delta in deltas.items()}
+    stmt = db.update(model).filter_by(**key).values(**values)
+    if db.session.execute(stmt).rowcount:
+        return
+    try:
+        with db.session.begin_nested():
+            db.session.add(model(**key, **deltas))
+    except IntegrityError:
+        db.session.execute(stmt)
+
+
+def record_attempt_started(attempt, quiz):
+    """
+    Count a new attempt in the user's rollups. Call after the attempt is flushed,
+    in the same transaction.
+    """
+    _bump(UserSubjectStat, {"user_id": attempt.user_id, "subject_id": quiz.subject_id},
+          attempt_count=1, score_sum=0.0)
+    _bump(UserMonthStat, {"user_id": attempt.user_id, "month": _month_key(attempt.attempt_date)},
+          attempt_count=1)
+    day = _day_key(attempt.attempt_date)
+    _bump(QuizDailyStat, {"quiz_id": quiz.id, "day": day}, attempt_count=1)
+    _bump(SubjectDailyStat, {"subject_id": quiz.subject_id, "day": day},
+          attempt_count=1, score_sum=0.0, percent_sum=0.0)
+
+
+def record_attempt_scored(attempt, quiz, score_delta):
+    """
+    Apply the change in an attempt's score to the user's and the admin rollups,
+    in the same transaction as the submission.
+    """
+    if score_delta:
+        _bump(UserSubjectStat, {"user_id": attempt.user_id, "subject_id": quiz.subject_id},
+              score_sum=score_delta)
+        _bump(SubjectDailyStat, {"subject_id": quiz.subject_id, "day": _day_key(attempt.attempt_date)},
+              score_sum=score_delta, percent_sum=_percent(score_delta, quiz.total_marks))
+
+
+def forget_quiz_attempts(quiz):
+    """
+    Remove the attempts of a quiz that is about to be deleted from the rollups.
+    """
+    rows = db.session.query(
+        QuizAttempt.user_id, QuizAttempt.score, QuizAttempt.attempt_date
+    ).filter(
+        QuizAttempt.quiz_id == quiz.id
+    ).all()
+
+    by_user, by_month, by_day = {}, {}, {}
+    for user_id, score, attempt_date in rows:
+        count, total = by_user.get(user_id, (0, 0.0))
+        by_user[user_id] = (count + 1, total + score)
+        if attempt_date is not None:
+            month_key = (user_id, _month_key(attempt_date))
+            by_month[month_key] = by_month.get(month_key, 0) + 1
+            day = _day_key(attempt_date)
+            day_count, day_total = by_day.get(day, (0, 0.0))
+            by_day[day] = (day_count + 1, day_total + score)
+
+    for user_id, (count, total) in by_user.items():
+        _bump(UserSubjectStat, {"user_id": user_id, "subject_id": quiz.subject_id},
+              attempt_count=-count, score_sum=-total)
+    for (user_id, month), count in by_month.items():
+        _bump(UserMonthStat, {"user_id": user_id, "month": month}, attempt_count=-count)
+    for day, (count, total) in by_day.items():
+        _bump(SubjectDailyStat, {"subject_id": quiz.subject_id, "day": day},
+              attempt_count=-count, score_sum=-total, percent_sum=-_percent(total, quiz.total_marks))
+    db.session.query(QuizDailyStat).filter(QuizDailyStat.quiz_id == quiz.id).delete()
+
+
+def user_summary(user_id):
+    """
+    Per-subject average scores and per-month attempt counts of a user, read
+    straight from the rollup tables.
+    """
+    subject_scores = db.session.query(
+        Subject.name,
+        UserSubjectStat.attempt_count,
+        UserSubjectStat.score_sum
+    ).join(
+        Subject, Subject.id == UserSubjectStat.subject_id
+    ).filter(
+        UserSubjectStat.user_id == user_id,
+        UserSubjectStat.attempt_count > 0
+    ).order_by(
+        Subject.name
+    ).all()
+
+    monthly_attempts = db.session.query(
+        UserMonthStat.month,
+        UserMonthStat.attempt_count
+    ).filter(
+        UserMonthStat.user_id == user_id,
+        UserMonthStat.attempt_count > 0
+    ).order_by(
+        UserMonthStat.month
+    ).all()
+
+    return {
+        "subject_scores": [
+            {"subject": name, "avg_score": float(score_sum) / count}
+            for name, count, score_sum in subject_scores
+        ],
+        "monthly_attempts": [
+            {"month": month, "count": count} for month, count in monthly_attempts
+        ]
+    }
+
+
+def _window_start(days):
+    """First day covered by a window of the given length, ending today (UTC)."""
+    return datetime.now(timezone.utc).date() - timedelta(days=days - 1)
+
+
+def top_quizzes(days=None, limit=5):
+    """
+    Most attempted quizzes, over all time or the last `days` days, summed from
+    the daily quiz rollup.
+    """
+    attempts = func.sum(QuizDailyStat.attempt_count)
+    query = db.session.query(
+        Quiz.title,
+        attempts
+    ).join(
+        Quiz, Quiz.id == QuizDailyStat.quiz_id
+    )
+    if days:
+        query = query.filter(QuizDailyStat.day >= _window_start(days))
+    return query.group_by(
+        Quiz.id, Quiz.title
+    ).having(
+        attempts > 0
+    ).order_by(
+        attempts.desc(), Quiz.id
+    ).limit(limit).all()
+
+
+def subject_avg_scores(days=None):
+    """
+    Average attempt score per subject as a percentage of the quiz's total marks,
+    over all time or the last `days` days, summed from the daily subject rollup.
+    """
+    attempts = func.sum(SubjectDailyStat.attempt_count)
+    query = db.session.query(
+        Subject.name,
+        attempts,
+        func.sum(SubjectDailyStat.percent_sum)
+    ).join(
+        Subject, Subject.id == SubjectDailyStat.subject_id
+    )
+    if days:
+        query = query.filter(SubjectDailyStat.day >= _window_start(days))
+    rows = query.group_by(
+        Subject.id, Subject.name
+    ).having(
+        attempts > 0
+    ).order_by(
+        Subject.name
+    ).all()
+    return [(name, float(percent_sum) / count) for name, count, percent_sum in rows]
+
+
+def rebuild_user_rollups(batch_size=1000):
+    """
+    Recompute every user rollup from quiz_attempt. Used to backfill the tables
+    and to repair drift.
+    """
+    db.session.query(UserSubjectStat).delete()
+    db.session.query(UserMonthStat).delete()
+
+    subject_rows = db.session.query(
+        QuizAttempt.user_id,
+        Quiz.subject_id,
+        func.count(QuizAttempt.id),
+        func.coalesce(func.sum(QuizAttempt.score), 0.0)
+    ).join(
+        Quiz, Quiz.id == QuizAttempt.quiz_id
+    ).group_by(
+        QuizAttempt.user_id, Quiz.subject_id
+    ).all()
+    if subject_rows:
+        db.session.execute(db.insert(UserSubjectStat), [
+            {"user_id": user_id, "subject_id": subject_id, "attempt_count": count, "score_sum": total}
+            for user_id, subject_id, count, total in subject_rows
+        ])
+
+    # Month buckets are derived in Python so no dialect-specific date function is needed
+    months = {}
+    for user_id, attempt_date in db.session.query(
+        QuizAttempt.user_id, QuizAttempt.attempt_date
+    ).filter(
+        QuizAttempt.attempt_date.isnot(None)
+    ).yield_per(batch_size):
+        key = (user_id, _month_key(attempt_date))
+        months[key] = months.get(key, 0) + 1
+    if months:
+        db.session.execute(db.insert(UserMonthStat), [
+            {"user_id": user_id, "month": month, "attempt_count": count}
+            for (user_id, month), count in months.items()
+        ])
+
+    return len(subject_rows), len(months)
+
+
+def rebuild_daily_rollups(batch_size=1000):
+    """
+    Recompute the daily quiz and subject rollups behind the admin analytics from
+    quiz_attempt. Percentages use each quiz's current total marks.
+    """
+    db.session.query(QuizDailyStat).delete()
+    db.session.query(SubjectDailyStat).delete()
+
+    # Day buckets are derived in Python for the same reason as the month buckets
+    quiz_days, subject_days = {}, {}
+    for quiz_id, subject_id, total_marks, score, attempt_date in db.session.query(
+        QuizAttempt.quiz_id, Quiz.subject_id, Quiz.total_marks, QuizAttempt.score, QuizAttempt.attempt_date
+    ).join(
+        Quiz, Quiz.id == QuizAttempt.quiz_id
+    ).filter(
+        QuizAttempt.attempt_date.isnot(None)
+    ).yield_per(batch_size):
+        day = _day_key(attempt_date)
+        quiz_days[(quiz_id, day)] = quiz_days.get((quiz_id, day), 0) + 1
+        count, score_sum, percent_sum = subject_days.get((subject_id, day), (0, 0.0, 0.0))
+        subject_days[(subject_id, day)] = (
+            count + 1, score_sum + score, percent_sum + _percent(score, total_marks)
+        )
+
+    if quiz_days:
+        db.session.execute(db.insert(QuizDailyStat), [
+            {"quiz_id": quiz_id, "day": day, "attempt_count": count}
+            for (quiz_id, day), count in quiz_days.items()
+        ])
+    if subject_days:
+        db.session.execute(db.insert(SubjectDailyStat), [
+            {"subject_id": subject_id, "day": day, "attempt_count": count,
+             "score_sum": score_sum, "percent_sum": percent_sum}
+            for (subject_id, day), (count, score_sum, percent_sum) in subject_days.items()
+        ])
+
+    return len(quiz_days), len(subject_days)
@@ -1,13 +1,15 @@
 from datetime import datetime
-from app.utils.auth import hash_password, verify_password
+from app.utils.auth import hash_password, verify_password, needs_rehash
 from app.utils.token import generate_jwt
 from app.extensions import db
 from app.models import User
-from app.utils.exceptions import ValidationError
+from app.utils.exceptions import ValidationError, ServiceBusyError
+from app.utils.validators import normalize_email
 from datetime import datetime
 #from app.utils.email import send_email_verification
 
 def register_user(email, password, full_name, qualification=None, dob=None, role='user'):
+    email = normalize_email(email)
     if User.query.filter_by(email=email).first():
         raise ValidationError("Email is already registered.")
     
@@ -29,11 +31,22 @@ def register_user(email, password, full_name, qualification=None, dob=None, role
 
 
 def login_user(email, password):
-    user = User.query.filter_by(email=email).first()
+    user = User.query.filter_by(email=normalize_email(email)).first()
+    if user is None and email != normalize_email(email):
+        # Accounts the lowercasing migration left alone because they collide with another
+        user = User.query.filter_by(email=email).first()
     if not user or not verify_password(user.password_hash, password):
         raise ValidationError("Invalid credentials.")
+
+    # Move the stored hash to the current PASSWORD_HASH_METHOD while the password is at hand
+    if needs_rehash(user.password_hash):
+        try:
+            user.password_hash = hash_password(password)
+            db.session.commit()
+        except ServiceBusyError:
+            db.session.rollback()
     
-    token = generate_jwt(user.id, user.email)
+    token = generate_jwt(user.id, user.email, user.role)
     
     return {
         "token": token,
@@ -0,0 +1,333 @@
+import json
+import threading
+import time
+from datetime import datetime, timezone
+from flask import current_app
+from sqlalchemy import bindparam, insert, update
+from sqlalchemy.dialects import postgresql, sqlite
+from app.extensions import db, get_redis
+from app.models import AttemptAnswer
+from app.services.scoring_service import get_answer_key
+from app.utils.exceptions import ValidationError
+
+# INSERT constructs with ON CONFLICT support, by dialect; others use _merge_rows
+_UPSERT_INSERTS = {
+    "sqlite": sqlite.insert,
+    "postgresql": postgresql.insert,
+}
+
+
+class LocalBuffer:
+    """
+    In-process answer buffer, only seen by the worker process that took the
+    answers. Answers being flushed are kept apart until their commit.
+    """
+
+    def __init__(self):
+        self._live = {}
+        self._flushing = {}
+        self._lock = threading.Lock()
+
+    def write(self, attempt_id, fields):
+        with self._lock:
+            self._live.setdefault(attempt_id, {}).update(fields)
+
+    def read(self, attempt_id):
+        with self._lock:
+            return [dict(self._flushing.get(attempt_id, {})), dict(self._live.get(attempt_id, {}))]
+
+    def take(self, limit=None, attempt_ids=None):
+        with self._lock:
+            if attempt_ids is None:
+                attempt_ids = [attempt_id for attempt_id in self._live if attempt_id not in self._flushing][:limit]
+            taken = {}
+            for attempt_id in attempt_ids:
+                if attempt_id in self._flushing or attempt_id not in self._live:
+                    continue
+                taken[attempt_id] = self._flushing[attempt_id] = self._live.pop(attempt_id)
+            return taken
+
+    def done(self, attempt_ids):
+        with self._lock:
+            for attempt_id in attempt_ids:
+                self._flushing.pop(attempt_id, None)
+
+    def restore(self, buffers):
+        with self._lock:
+            for attempt_id, fields in buffers.items():
+                self._flushing.pop(attempt_id, None)
+                # Answers saved since the take are newer, keep them
+                self._live[attempt_id] = {**fields, **self._live.get(attempt_id, {})}
+
+
+class RedisBuffer:
+    """
+    Answer buffer shared by every worker: a hash of question ID -> answer per
+    attempt, plus a set of the attempts with unflushed answers. A flush renames
+    an attempt's hash to a :flushing key and deletes it only after its commit,
+    so the answers stay readable while they are on their way to the database.
+    """
+
+    _DIRTY = "autosave:dirty"
+
+    # Move an attempt's answers aside for flushing, unless a flush of it is already running
+    _TAKE = (
+        "if redis.call('EXISTS', KEYS[2]) == 1 then return false end "
+        "if redis.call('EXISTS', KEYS[1]) == 0 then return {} end "
+        "redis.call('RENAME', KEYS[1], KEYS[2]) "
+        "redis.call('EXPIRE', KEYS[2], ARGV[1]) "
+        "return redis.call('HGETALL', KEYS[2])"
+    )
+
+    @staticmethod
+    def _key(attempt_id):
+        return f"autosave:{attempt_id}"
+
+    @staticmethod
+    def _flushing_key(attempt_id):
+        return f"autosave:{attempt_id}:flushing"
+
+    def write(self, attempt_id, fields):
+        ttl = current_app.config['AUTOSAVE_BUFFER_TTL']
+        pipe = get_redis().pipeline(transaction=False)
+        pipe.hset(self._key(attempt_id), mapping=fields)
+        pipe.expire(self._key(attempt_id), ttl)
+        pipe.sadd(self._DIRTY, attempt_id)
+        pipe.expire(self._DIRTY, ttl)
+        pipe.execute()
+
+    def read(self, attempt_id):
+        pipe = get_redis().pipeline()
+        pipe.hgetall(self._flushing_key(attempt_id))
+        pipe.hgetall(self._key(attempt_id))
+        return pipe.execute()
+
+    def take(self, limit=None, attempt_ids=None):
+        if attempt_ids is None:
+            attempt_ids = [int(attempt_id) for attempt_id in get_redis().spop(self._DIRTY, limit) or []]
+        else:
+            get_redis().srem(self._DIRTY, *attempt_ids)
+        if not attempt_ids:
+            return {}
+
+        pipe = get_redis().pipeline(transaction=False)
+        for attempt_id in attempt_ids:
+            pipe.eval(self._TAKE, 2, self._key(attempt_id), self._flushing_key(attempt_id),
+                      current_app.config['AUTOSAVE_BUFFER_TTL'])
+        taken, busy = {}, []
+        for attempt_id, result in zip(attempt_ids, pipe.execute()):
+            if result is None:
+                busy.append(attempt_id)
+            elif result:
+                taken[attempt_id] = dict(zip(result[::2], result[1::2]))
+        if busy:
+            # Flushed by someone else right now; their newer answers wait for the next run
+            get_redis().sadd(self._DIRTY, *busy)
+        return taken
+
+    def done(self, attempt_ids):
+        if attempt_ids:
+            get_redis().delete(*[self._flushing_key(attempt_id) for attempt_id in attempt_ids])
+
+    def restore(self, buffers):
+        ttl = current_app.config['AUTOSAVE_BUFFER_TTL']
+        pipe = get_redis().pipeline(transaction=False)
+        for attempt_id, fields in buffers.items():
+            for question_id, value in fields.items():
+                pipe.hsetnx(self._key(attempt_id), question_id, value)
+            pipe.expire(self._key(attempt_id), ttl)
+            pipe.delete(self._flushing_key(attempt_id))
+            pipe.sadd(self._DIRTY, attempt_id)
+        pipe.execute()
+
+
+_local_buffer = LocalBuffer()
+_redis_buffer = RedisBuffer()
+
+
+def _buffer():
+    if current_app.config['AUTOSAVE_BACKEND'] == 'local':
+        return _local_buffer
+    return _redis_buffer
+
+
+def _valid_selection(entry, selected):
+    """An option ID of the question, a list of them, or None to clear the answer."""
+    if selected is None:
+        return True
+    options = selected if isinstance(selected, list) else [selected]
+    return all(
+        isinstance(option_id, int) and not isinstance(option_id, bool) and option_id in entry.option_bits
+        for option_id in options
+    )
+
+
+def _utc(moment):
+    return moment.replace(tzinfo=timezone.utc) if moment.tzinfo is None else moment
+
+
+def save(attempt, answers):
+    """
+    Buffer a delta of an attempt's answers. Nothing is written to the database
+    here; flush moves buffered answers there in batches.
+    :param attempt: QuizAttempt owned by the caller
+    :param answers: Question ID -> option ID, list of option IDs, or None
+    :return: Number of answers saved
+    """
+    if attempt.submitted_at is not None:
+        raise ValidationError("This quiz attempt has already been submitted.")
+    quiz = attempt.quiz
+    if datetime.now(timezone.utc) > _utc(quiz.end_time):
+        raise ValidationError("Quiz is not available at the moment.")
+
+    if not isinstance(answers, dict) or not answers:
+        raise ValidationError("answers must be a non-empty object of question ID -> selected options.")
+    if len(answers) > current_app.config['AUTOSAVE_MAX_ANSWERS']:
+        raise ValidationError(f"At most {current_app.config['AUTOSAVE_MAX_ANSWERS']} answers can be saved at once.")
+
+    questions = get_answer_key(quiz).entries
+    saved_at = time.time()
+    fields = {}
+    for question_id, selected in answers.items():
+        try:
+            question_id = int(question_id)
+        except (TypeError, ValueError):
+            question_id = None
+        if question_id not in questions:
+            raise ValidationError(f"Question {question_id} is not part of this quiz.")
+        if not _valid_selection(questions[question_id], selected):
+            raise ValidationError(f"Invalid selection for question {question_id}.")
+        fields[str(question_id)] = json.dumps([saved_at, selected])
+
+    _buffer().write(attempt.id, fields)
+    return len(fields)
+
+
+def saved_answers(attempt_id):
+    """
+    An attempt's autosaved answers, the most recent per question across the
+    flushed rows, answers being flushed and answers still buffered. The
+    buffer is read first: answers a flush commits in between are then found
+    in the database. An unreachable buffer is logged and skipped so it never
+    fails a submission.
+    :return: Question ID (as a string) -> selected options
+    """
+    try:
+        buffered = _buffer().read(attempt_id)
+    except Exception:
+        current_app.logger.exception(f"Autosave buffer unavailable for attempt {attempt_id}")
+        buffered = []
+
+    answers = {
+        str(question_id): (_utc(saved_at).timestamp(), selected)
+        for question_id, selected, saved_at in db.session.query(
+            AttemptAnswer.question_id, AttemptAnswer.selected, AttemptAnswer.saved_at
+        ).filter(
+            AttemptAnswer.attempt_id == attempt_id
+        )
+    }
+    for fields in buffered:
+        for question_id, value in fields.items():
+            saved_at, selected = json.loads(value)
+            if question_id not in answers or answers[question_id][0] < saved_at:
+                answers[question_id] = (saved_at, selected)
+    return {question_id: selected for question_id, (_, selected) in answers.items() if selected is not None}
+
+
+def _merge_rows(rows):
+    """Upsert for dialects without ON CONFLICT: look up the stored rows, then insert or update."""
+    table = AttemptAnswer.__table__
+    stored = {
+        (attempt_id, question_id): _utc(saved_at)
+        for attempt_id, question_id, saved_at in db.session.query(
+            table.c.attempt_id, table.c.question_id, table.c.saved_at
+        ).filter(table.c.attempt_id.in_({row["attempt_id"] for row in rows}))
+    }
+    inserts = [row for row in rows if (row["attempt_id"], row["question_id"]) not in stored]
+    updates = [
+        {"b_attempt_id": row["attempt_id"], "b_question_id": row["question_id"],
+         "b_selected": row["selected"], "b_saved_at": row["saved_at"]}
+        for row in rows
+        if (row["attempt_id"], row["question_id"]) in stored
+        and stored[(row["attempt_id"], row["question_id"])] < row["saved_at"]
+    ]
+    if inserts:
+        db.session.execute(insert(table), inserts)
+    if updates:
+        db.session.execute(update(table).where(
+            table.c.attempt_id == bindparam("b_attempt_id"),
+            table.c.question_id == bindparam("b_question_id")
+        ).values(selected=bindparam("b_selected"), saved_at=bindparam("b_saved_at")), updates)
+
+
+def _write(buffers):
+    rows = []
+    for attempt_id, fields in buffers.items():
+        for question_id, value in fields.items():
+            saved_at, selected = json.loads(value)
+            rows.append({
+                "attempt_id": attempt_id,
+                "question_id": int(question_id),
+                "selected": selected,
+                "saved_at": datetime.fromtimestamp(saved_at, timezone.utc),
+            })
+
+    upsert = _UPSERT_INSERTS.get(db.engine.dialect.name)
+    if upsert is None:
+        _merge_rows(rows)
+    else:
+        statement = upsert(AttemptAnswer.__table__)
+        # A concurrent flush may already have stored a newer answer; never overwrite it
+        db.session.execute(statement.on_conflict_do_update(
+            index_elements=['attempt_id', 'question_id'],
+            set_={"selected": statement.excluded.selected, "saved_at": statement.excluded.saved_at},
+            where=AttemptAnswer.__table__.c.saved_at < statement.excluded.saved_at,
+        ), rows)
+    db.session.commit()
+    return len(rows)
+
+
+def _write_taken(buffer, buffers):
+    """Commit taken answers, then release them; on failure they go back to the buffer."""
+    try:
+        written = _write(buffers)
+    except Exception:
+        db.session.rollback()
+        buffer.restore(buffers)
+        raise
+    buffer.done(list(buffers))
+    return written
+
+
+def drain(attempt_id):
+    """
+    Write one attempt's buffered answers to the database in their own
+    transaction and clear them from the buffer, as a submission does. An
+    unreachable buffer is logged and skipped.
+    :return: Number of answers written
+    """
+    buffer = _buffer()
+    try:
+        buffers = buffer.take(attempt_ids=[attempt_id])
+    except Exception:
+        current_app.logger.exception(f"Autosave buffer unavailable for attempt {attempt_id}")
+        return 0
+    return _write_taken(buffer, buffers) if buffers else 0
+
+
+def flush():
+    """
+    Move buffered answers to the database, AUTOSAVE_FLUSH_BATCH attempts per
+    INSERT and commit. Answers of a failed batch go back to the buffer for the
+    next run.
+    :return: Number of answers written
+    """
+    batch_size = current_app.config['AUTOSAVE_FLUSH_BATCH']
+    buffer = _buffer()
+    written = 0
+    while True:
+        buffers = buffer.take(batch_size)
+        if buffers:
+            written += _write_taken(buffer, buffers)
+        if len(buffers) < batch_size:
+            return written
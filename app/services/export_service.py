@@ -0,0 +1,99 @@
+import csv
+import io
+import zlib
+from app.extensions import db
+from app.models import Chapter, Subject, User, Quiz, QuizAttempt, quiz_chapters
+
+ATTEMPTS_CSV_HEADER = ['User ID', 'User Name', 'Quiz Title', 'Subject', 'Chapters', 'Total Marks', 'Attempt Date']
+
+
+def quiz_chapter_names():
+    """
+    Map every quiz to its comma separated chapter names with one query.
+    """
+    rows = db.session.query(
+        quiz_chapters.c.quiz_id,
+        Chapter.name
+    ).join(
+        Chapter, Chapter.id == quiz_chapters.c.chapter_id
+    ).order_by(
+        quiz_chapters.c.quiz_id, Chapter.id
+    ).all()
+
+    names = {}
+    for quiz_id, chapter_name in rows:
+        names.setdefault(quiz_id, []).append(chapter_name)
+    return {quiz_id: ', '.join(chapters) for quiz_id, chapters in names.items()}
+
+
+def iter_attempt_rows(batch_size=1000):
+    """
+    Yield one denormalized CSV row per quiz attempt.
+    Attempts come from a single joined query streamed with yield_per, so memory
+    does not grow with the number of attempts.
+    """
+    chapter_names = quiz_chapter_names()
+    query = db.session.query(
+        QuizAttempt.user_id,
+        User.full_name,
+        Quiz.id,
+        Quiz.title,
+        Subject.name,
+        QuizAttempt.score,
+        QuizAttempt.attempt_date
+    ).join(
+        User, User.id == QuizAttempt.user_id
+    ).join(
+        Quiz, Quiz.id == QuizAttempt.quiz_id
+    ).outerjoin(
+        Subject, Subject.id == Quiz.subject_id
+    ).order_by(
+        QuizAttempt.id
+    ).yield_per(batch_size)
+
+    for user_id, user_name, quiz_id, quiz_title, subject_name, score, attempt_date in query:
+        yield [
+            user_id,
+            user_name or 'N/A',
+            quiz_title or 'N/A',
+            subject_name or 'N/A',
+            chapter_names.get(quiz_id, ''),
+            score,
+            attempt_date.strftime("%Y-%m-%d %H:%M") if attempt_date else ''
+        ]
+
+
+def iter_csv(rows, header=ATTEMPTS_CSV_HEADER, rows_per_chunk=500):
+    """
+    Turn rows into CSV text chunks of roughly rows_per_chunk rows each.
+    The header goes out in the first chunk so the response starts right away.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(header)
+    yield buffer.getvalue()
+    buffer.seek(0)
+    buffer.truncate(0)
+
+    for count, row in enumerate(rows, start=1):
+        writer.writerow(row)
+        if count % rows_per_chunk == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate(0)
+
+    remaining = buffer.getvalue()
+    if remaining:
+        yield remaining
+
+
+def iter_gzip(chunks, level=6):
+    """
+    Gzip a stream of text chunks on the fly.
+    """
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode('utf-8'))
+        if data:
+            yield data
+    yield compressor.flush()
@@ -0,0 +1,244 @@
+import csv
+import io
+import json
+from datetime import datetime
+from flask import current_app
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError
+from app.extensions import db, cache
+from app.models import User
+from app.services import stats_service, search_service, suggest_service
+from app.utils.auth import hash_passwords
+from app.utils.exceptions import ValidationError
+from app.utils.validators import is_valid_email, normalize_email
+
+# Columns read from each row; anything else is ignored
+FIELDS = ("email", "password", "full_name", "qualification", "dob")
+
+# Emails per IN (...) lookup, well below SQLite's bound parameter limit
+_LOOKUP_CHUNK = 500
+
+# Cache keys of a background import's status and report, and of its staged rows
+_JOB_KEY = "user_import:{job_id}"
+_ROWS_KEY = "user_import:{job_id}:rows"
+
+
+def parse_rows(filename, content):
+    """
+    Read the student rows of an uploaded file.
+    :param filename: Name of the upload, its extension picks the format
+    :param content: File contents as bytes
+    :return: List of row dicts
+    """
+    try:
+        text = content.decode('utf-8-sig')
+    except UnicodeDecodeError:
+        raise ValidationError("The file must be UTF-8 encoded.")
+
+    extension = filename.rsplit('.', 1)[-1].lower() if '.' in filename else ''
+    if extension == 'json':
+        try:
+            rows = json.loads(text)
+        except ValueError:
+            raise ValidationError("The file is not valid JSON.")
+        if isinstance(rows, dict):
+            rows = rows.get('users')
+        if not isinstance(rows, list):
+            raise ValidationError("A JSON import must be a list of users or {\"users\": [...]}.")
+        return rows
+    if extension == 'csv':
+        reader = csv.DictReader(io.StringIO(text))
+        missing = {"email", "password", "full_name"} - {name.strip() for name in reader.fieldnames or []}
+        if missing:
+            raise ValidationError(f"The CSV header is missing: {', '.join(sorted(missing))}.")
+        return [{(key or '').strip(): value for key, value in row.items()} for row in reader]
+    raise ValidationError("Upload a .csv or .json file.")
+
+
+def _clean(row):
+    """
+    :return: (values, error) where values holds the User columns of a valid row
+    """
+    if not isinstance(row, dict):
+        return None, "Row is not an object."
+    values = {name: (str(row[name]).strip() if row.get(name) not in (None, '') else None) for name in FIELDS}
+    if not values["email"] or not is_valid_email(values["email"]):
+        return None, "A valid email is required."
+    values["email"] = normalize_email(values["email"])
+    if not values["full_name"]:
+        return None, "full_name is required."
+    if not row.get("password"):
+        return None, "password is required."
+    values["password"] = str(row["password"])
+    if values["dob"]:
+        try:
+            values["dob"] = datetime.strptime(values["dob"], "%Y-%m-%d").date()
+        except ValueError:
+            return None, "dob must be YYYY-MM-DD."
+    return values, None
+
+
+def _existing_emails(emails):
+    """Emails already registered, looked up in chunks with one IN query each."""
+    emails = list(emails)
+    found = set()
+    for start in range(0, len(emails), _LOOKUP_CHUNK):
+        chunk = emails[start:start + _LOOKUP_CHUNK]
+        found.update(email for (email,) in db.session.query(User.email).filter(User.email.in_(chunk)))
+    return found
+
+
+def _records(batch):
+    """
+    Hash the passwords of one batch of (row_number, values) in the password pool.
+    :return: List of (row_number, User column values)
+    """
+    passwords = hash_passwords([values["password"] for _, values in batch])
+    return [
+        (number, {
+            "email": values["email"],
+            "password_hash": password_hash,
+            "full_name": values["full_name"],
+            "qualification": values["qualification"],
+            "dob": values["dob"],
+            "role": "user",
+        })
+        for (number, values), password_hash in zip(batch, passwords)
+    ]
+
+
+def _insert_records(records):
+    """
+    Insert User column values with a single executemany and bring the
+    counters, search index and suggestions up to date, which the mapper
+    events would otherwise do per row.
+    :return: Inserted rows as dicts
+    """
+    inserted = db.session.execute(
+        insert(User.__table__).returning(User.id, User.email, User.full_name), records
+    ).mappings().all()
+    inserted = [dict(row) for row in inserted]
+    stats_service.adjust('user', len(inserted))
+    search_service.index_rows('user', inserted)
+    db.session.commit()
+    suggest_service.apply_changes([("user", row["id"], row["full_name"]) for row in inserted])
+    return inserted
+
+
+def _insert_each(records, errors):
+    """Insert rows one per transaction, reporting those whose email was taken meanwhile."""
+    created = 0
+    for number, record in records:
+        try:
+            created += len(_insert_records([record]))
+        except IntegrityError:
+            db.session.rollback()
+            errors.append({"row": number, "email": record["email"], "error": "Email is already registered."})
+    return created
+
+
+def check_size(rows):
+    """Reject uploads with more than USER_IMPORT_MAX_ROWS rows."""
+    if len(rows) > current_app.config['USER_IMPORT_MAX_ROWS']:
+        raise ValidationError(f"At most {current_app.config['USER_IMPORT_MAX_ROWS']} users can be imported at once.")
+
+
+def _report(created, errors):
+    return {"created": created, "failed": len(errors), "errors": sorted(errors, key=lambda error: error["row"])}
+
+
+def import_users(rows, progress=None):
+    """
+    Create student accounts in bulk. Rows are validated, checked against
+    existing and repeated emails, hashed in the password pool and inserted
+    USER_IMPORT_BATCH_SIZE at a time, each batch in its own transaction.
+    :param rows: Row dicts with email, password, full_name and optionally
+        qualification and dob
+    :param progress: Called with the report so far after every committed batch
+    :return: Report with the created count and an error per rejected row
+    """
+    check_size(rows)
+
+    errors = []
+    accepted = []
+    seen = {}
+    for number, row in enumerate(rows, start=1):
+        values, error = _clean(row)
+        if error is None and values["email"] in seen:
+            error = f"Duplicate of row {seen[values['email']]}."
+        if error:
+            email = row.get("email") if isinstance(row, dict) else None
+            errors.append({"row": number, "email": email, "error": error})
+            continue
+        seen[values["email"]] = number
+        accepted.append((number, values))
+
+    existing = _existing_emails(seen)
+    pending = []
+    for number, values in accepted:
+        if values["email"] in existing:
+            errors.append({"row": number, "email": values["email"], "error": "Email is already registered."})
+        else:
+            pending.append((number, values))
+
+    created = 0
+    batch_size = current_app.config['USER_IMPORT_BATCH_SIZE']
+    for start in range(0, len(pending), batch_size):
+        records = _records(pending[start:start + batch_size])
+        try:
+            created += len(_insert_records([record for _, record in records]))
+        except IntegrityError:
+            # Someone registered one of these emails meanwhile; retry the batch without them
+            db.session.rollback()
+            taken = _existing_emails(record["email"] for _, record in records)
+            errors += [{"row": number, "email": record["email"], "error": "Email is already registered."}
+                       for number, record in records if record["email"] in taken]
+            records = [(number, record) for number, record in records if record["email"] not in taken]
+            try:
+                created += len(_insert_records([record for _, record in records])) if records else 0
+            except IntegrityError:
+                # Registrations are still racing this batch; find the taken emails row by row
+                db.session.rollback()
+                created += _insert_each(records, errors)
+        if progress is not None:
+            progress(_report(created, errors))
+
+    return _report(created, errors)
+
+
+def save_job(job_id, status, report=None, error=None):
+    """
+    Record the state of a background import: 'pending', 'running' or 'done'
+    with the report so far, or 'failed' with an error and the users created
+    before it. Entries expire after USER_IMPORT_JOB_TTL seconds.
+    """
+    cache.set(_JOB_KEY.format(job_id=job_id),
+              {"status": status, "report": report, "error": error},
+              timeout=current_app.config['USER_IMPORT_JOB_TTL'])
+
+
+def load_job(job_id):
+    """
+    :return: The entry written by save_job, or None if unknown or expired
+    """
+    return cache.get(_JOB_KEY.format(job_id=job_id))
+
+
+def stage_rows(job_id, rows):
+    """
+    Keep the rows of a background import on the server for the worker, so
+    their plaintext passwords never pass through the task broker. They expire
+    after USER_IMPORT_STAGE_TTL seconds if no worker picks them up.
+    :return: False if the cache did not store them
+    """
+    return cache.set(_ROWS_KEY.format(job_id=job_id), rows, timeout=current_app.config['USER_IMPORT_STAGE_TTL'])
+
+
+def take_rows(job_id):
+    """
+    :return: The rows staged for a background import, removed from the cache, or None if expired
+    """
+    key = _ROWS_KEY.format(job_id=job_id)
+    rows = cache.get(key)
+    cache.delete(key)
+    return rows
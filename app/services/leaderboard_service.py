@@ -0,0 +1,325 @@
+import random
+import threading
+import uuid
+from flask import current_app
+from app.extensions import db, get_redis
+from app.models import QuizAttempt
+
+
+class _SkipNode:
+    __slots__ = ('key', 'next', 'width')
+
+    def __init__(self, key, levels):
+        self.key = key
+        self.next = [None] * levels
+        # width[level]: positions skipped by following next[level]
+        self.width = [1] * levels
+
+
+class _LocalBoard:
+    """
+    Order statistics for one quiz kept in an indexable skip list of
+    (-score, user_id). Updates, rank and position lookups take O(log n)
+    expected time.
+    """
+
+    _LEVELS = 32
+
+    def __init__(self):
+        self._scores = {}
+        self._head = _SkipNode(None, self._LEVELS)
+        self._nil = _SkipNode(None, 0)
+        self._head.next = [self._nil] * self._LEVELS
+
+    def _path(self, key):
+        """Last node before key on every level, and the positions skipped on each."""
+        node, path, steps = self._head, [None] * self._LEVELS, [0] * self._LEVELS
+        for level in reversed(range(self._LEVELS)):
+            while node.next[level] is not self._nil and node.next[level].key < key:
+                steps[level] += node.width[level]
+                node = node.next[level]
+            path[level] = node
+        return path, steps
+
+    def _insert(self, key):
+        path, steps = self._path(key)
+        levels = 1
+        while levels < self._LEVELS and random.random() < 0.5:
+            levels += 1
+        node = _SkipNode(key, levels)
+        skipped = 0
+        for level in range(levels):
+            before = path[level]
+            node.next[level] = before.next[level]
+            before.next[level] = node
+            node.width[level] = before.width[level] - skipped
+            before.width[level] = skipped + 1
+            skipped += steps[level]
+        for level in range(levels, self._LEVELS):
+            path[level].width[level] += 1
+
+    def _remove(self, key):
+        path, _ = self._path(key)
+        node = path[0].next[0]
+        for level in range(len(node.next)):
+            before = path[level]
+            before.width[level] += node.width[level] - 1
+            before.next[level] = node.next[level]
+        for level in range(len(node.next), self._LEVELS):
+            path[level].width[level] -= 1
+
+    def set(self, user_id, score):
+        old = self._scores.get(user_id)
+        if old is not None:
+            self._remove((-old, user_id))
+        self._insert((-score, user_id))
+        self._scores[user_id] = score
+
+    def size(self):
+        return len(self._scores)
+
+    def score(self, user_id):
+        return self._scores.get(user_id)
+
+    def count_above(self, score):
+        # (-score,) sorts before every (-score, user_id) entry
+        node, position = self._head, 0
+        for level in reversed(range(self._LEVELS)):
+            while node.next[level] is not self._nil and node.next[level].key < (-score,):
+                position += node.width[level]
+                node = node.next[level]
+        return position
+
+    def range(self, start, stop):
+        stop = min(stop, self.size())
+        if start >= stop:
+            return []
+        node, remaining = self._head, start + 1
+        for level in reversed(range(self._LEVELS)):
+            while node.width[level] <= remaining:
+                remaining -= node.width[level]
+                node = node.next[level]
+        entries = []
+        for _ in range(stop - start):
+            entries.append((node.key[1], -node.key[0]))
+            node = node.next[0]
+        return entries
+
+
+class LocalBackend:
+    """In-process leaderboards, only consistent within a single worker process."""
+
+    def __init__(self):
+        self._boards = {}
+        self._lock = threading.Lock()
+
+    def is_loaded(self, quiz_id):
+        return quiz_id in self._boards
+
+    def begin_load(self, quiz_id):
+        board = _LocalBoard()
+        with self._lock:
+            self._boards[quiz_id] = board
+        return board
+
+    def load(self, quiz_id, token, pairs):
+        with self._lock:
+            board = self._boards.get(quiz_id)
+            if board is not token:
+                return
+            for user_id, score in pairs:
+                if board.score(user_id) is None:
+                    board.set(user_id, score)
+
+    def drop(self, quiz_id):
+        with self._lock:
+            self._boards.pop(quiz_id, None)
+
+    def set(self, quiz_id, user_id, score):
+        with self._lock:
+            board = self._boards.get(quiz_id)
+            if board is not None:
+                board.set(user_id, score)
+
+    def size(self, quiz_id):
+        return self._boards[quiz_id].size()
+
+    def score(self, quiz_id, user_id):
+        return self._boards[quiz_id].score(user_id)
+
+    def count_above(self, quiz_id, score):
+        with self._lock:
+            return self._boards[quiz_id].count_above(score)
+
+    def range(self, quiz_id, start, stop):
+        with self._lock:
+            return self._boards[quiz_id].range(start, stop)
+
+
+class RedisBackend:
+    """
+    Leaderboards stored as Redis sorted sets shared by every worker. Redis
+    drops empty sets, so a marker key records that a board was built; it
+    holds the token of the rebuild that started it.
+    """
+
+    # Only update boards that were already built, a missing board is rebuilt from the DB
+    _SET_IF_LOADED = (
+        "if redis.call('EXISTS', KEYS[2]) == 1 then "
+        "return redis.call('ZADD', KEYS[1], ARGV[1], ARGV[2]) end return 0"
+    )
+    # Fill in a rebuild's scores, unless a later rebuild took over. NX keeps the
+    # scores submitted since the rebuild started, which are newer than its snapshot.
+    _LOAD_IF_CURRENT = (
+        "if redis.call('GET', KEYS[2]) ~= ARGV[1] then return 0 end "
+        "for i = 2, #ARGV, 2 do redis.call('ZADD', KEYS[1], 'NX', ARGV[i], ARGV[i + 1]) end "
+        "return 1"
+    )
+    # Score/member pairs per _LOAD_IF_CURRENT call, well under Lua's unpack limits
+    _LOAD_BATCH = 1000
+
+    @staticmethod
+    def _key(quiz_id):
+        return f"leaderboard:{quiz_id}"
+
+    @staticmethod
+    def _loaded_key(quiz_id):
+        return f"leaderboard:{quiz_id}:loaded"
+
+    def is_loaded(self, quiz_id):
+        return get_redis().exists(self._loaded_key(quiz_id)) == 1
+
+    def begin_load(self, quiz_id):
+        token = uuid.uuid4().hex
+        pipe = get_redis().pipeline()
+        pipe.delete(self._key(quiz_id))
+        pipe.set(self._loaded_key(quiz_id), token)
+        pipe.execute()
+        return token
+
+    def load(self, quiz_id, token, pairs):
+        for start in range(0, len(pairs), self._LOAD_BATCH):
+            args = []
+            for user_id, score in pairs[start:start + self._LOAD_BATCH]:
+                args.extend((score, str(user_id)))
+            if not get_redis().eval(self._LOAD_IF_CURRENT, 2, self._key(quiz_id), self._loaded_key(quiz_id),
+                                    token, *args):
+                return
+
+    def drop(self, quiz_id):
+        get_redis().delete(self._key(quiz_id), self._loaded_key(quiz_id))
+
+    def set(self, quiz_id, user_id, score):
+        get_redis().eval(self._SET_IF_LOADED, 2, self._key(quiz_id), self._loaded_key(quiz_id),
+                         score, str(user_id))
+
+    def size(self, quiz_id):
+        return get_redis().zcard(self._key(quiz_id))
+
+    def score(self, quiz_id, user_id):
+        return get_redis().zscore(self._key(quiz_id), str(user_id))
+
+    def count_above(self, quiz_id, score):
+        return get_redis().zcount(self._key(quiz_id), f"({score}", "+inf")
+
+    def range(self, quiz_id, start, stop):
+        if stop <= start:
+            return []
+        rows = get_redis().zrevrange(self._key(quiz_id), start, stop - 1, withscores=True)
+        return [(int(user_id), score) for user_id, score in rows]
+
+
+_local_backend = LocalBackend()
+_redis_backend = RedisBackend()
+
+
+def _backend():
+    if current_app.config['LEADERBOARD_BACKEND'] == 'local':
+        return _local_backend
+    return _redis_backend
+
+
+def rebuild(quiz_id):
+    """
+    Reload a quiz's leaderboard from its submitted attempts. The board is
+    emptied and marked built before the attempts are read, so scores
+    submitted meanwhile land on it; the snapshot only fills in the others.
+    """
+    backend = _backend()
+    token = backend.begin_load(quiz_id)
+    pairs = db.session.query(QuizAttempt.user_id, QuizAttempt.score).filter(
+        QuizAttempt.quiz_id == quiz_id,
+        QuizAttempt.submitted_at.isnot(None)
+    ).all()
+    backend.load(quiz_id, token, pairs)
+    return len(pairs)
+
+
+def drop(quiz_id):
+    """Remove a deleted quiz's leaderboard. Failures are logged like record_score's."""
+    try:
+        _backend().drop(quiz_id)
+    except Exception:
+        current_app.logger.exception(f"Leaderboard removal failed for quiz {quiz_id}")
+
+
+def _ensure_loaded(quiz_id):
+    backend = _backend()
+    if not backend.is_loaded(quiz_id):
+        rebuild(quiz_id)
+    return backend
+
+
+def record_score(quiz_id, user_id, score):
+    """
+    Apply a committed score to the leaderboard. Failures are logged and left
+    to the next rebuild so they never fail a submission.
+    """
+    try:
+        _backend().set(quiz_id, user_id, score)
+    except Exception:
+        current_app.logger.exception(f"Leaderboard update failed for quiz {quiz_id}")
+
+
+def _ranked(backend, quiz_id, start, stop):
+    """Entries in [start, stop) with competition ranks (ties share a rank)."""
+    entries = backend.range(quiz_id, start, stop)
+    result = []
+    previous_score, rank = None, None
+    for position, (user_id, score) in enumerate(entries, start=start + 1):
+        if score != previous_score:
+            rank = position if previous_score is not None else backend.count_above(quiz_id, score) + 1
+            previous_score = score
+        result.append({"rank": rank, "user_id": user_id, "score": score})
+    return result
+
+
+def top(quiz_id, n):
+    backend = _ensure_loaded(quiz_id)
+    return _ranked(backend, quiz_id, 0, n)
+
+
+def standing(quiz_id, user_id):
+    """
+    Rank and percentile of a user, None if they have not attempted the quiz.
+    The percentile is the share of participants scoring at or below the user.
+    """
+    backend = _ensure_loaded(quiz_id)
+    score = backend.score(quiz_id, user_id)
+    if score is None:
+        return None
+    total = backend.size(quiz_id)
+    above = backend.count_above(quiz_id, score)
+    return {
+        "rank": above + 1,
+        "score": score,
+        "total": total,
+        "percentile": round(100.0 * (total - above) / total, 2)
+    }
+
+
+def around(quiz_id, rank, radius):
+    """Entries within radius positions of the given rank."""
+    backend = _ensure_loaded(quiz_id)
+    start = max(rank - 1 - radius, 0)
+    return _ranked(backend, quiz_id, start, rank + radius)
@@ -0,0 +1,148 @@
+import heapq
+import itertools
+import smtplib
+import time
+from flask import current_app
+from app.extensions import mail
+
+
+def _is_transient(exc):
+    """
+    Decide whether a send failure is worth retrying: 4xx replies and dropped or
+    refused connections are, 5xx replies and malformed messages are not.
+    """
+    if isinstance(exc, smtplib.SMTPRecipientsRefused):
+        return all(400 <= code < 500 for code, _ in exc.recipients.values())
+    if isinstance(exc, smtplib.SMTPConnectError):
+        return True
+    if isinstance(exc, smtplib.SMTPResponseException):
+        return 400 <= exc.smtp_code < 500
+    if isinstance(exc, smtplib.SMTPServerDisconnected):
+        return True
+    if isinstance(exc, smtplib.SMTPException):
+        return False
+    return isinstance(exc, OSError)
+
+
+def _connection_lost(exc):
+    """True when the failure leaves the SMTP connection unusable."""
+    if isinstance(exc, smtplib.SMTPServerDisconnected):
+        return True
+    return isinstance(exc, OSError) and not isinstance(exc, smtplib.SMTPException)
+
+
+class _RateLimiter:
+    """Spaces sends evenly to at most `rate` messages per second (0 disables)."""
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate else 0
+        self.next_slot = time.monotonic()
+
+    def wait(self):
+        if not self.interval:
+            return
+        now = time.monotonic()
+        if self.next_slot > now:
+            time.sleep(self.next_slot - now)
+            now = self.next_slot
+        self.next_slot = now + self.interval
+
+
+class DeliveryReport:
+    def __init__(self):
+        self.sent = 0
+        self.retried = 0
+        self.failed = []  # (message, exception) pairs
+
+    def serialize(self):
+        return {
+            "sent": self.sent,
+            "retried": self.retried,
+            "failed": [
+                {"recipients": msg.recipients, "error": str(exc)} for msg, exc in self.failed
+            ]
+        }
+
+
+def deliver(messages, max_retries=None):
+    """
+    Send messages in batches, each batch over a single SMTP connection.
+    Sends are throttled to MAIL_RATE_LIMIT per second. Transient failures go to
+    a retry queue with exponential backoff (MAIL_RETRY_BACKOFF * 2**attempt
+    seconds) until MAIL_MAX_RETRIES is exhausted; permanent failures are
+    reported without retrying.
+    Args:
+        messages (iterable): flask_mail.Message objects, consumed lazily.
+        max_retries (int): Override MAIL_MAX_RETRIES, 0 disables retries.
+    Returns:
+        DeliveryReport: Counts of sent and retried messages plus the failures.
+    """
+    config = current_app.config
+    batch_size = config['MAIL_BATCH_SIZE']
+    backoff = config['MAIL_RETRY_BACKOFF']
+    if max_retries is None:
+        max_retries = config['MAIL_MAX_RETRIES']
+
+    limiter = _RateLimiter(config['MAIL_RATE_LIMIT'])
+    report = DeliveryReport()
+    pending = iter(messages)
+    retry_queue = []  # heap of (not_before, sequence, attempts, message)
+    sequence = itertools.count()
+
+    def requeue(message, attempts, delay=0):
+        heapq.heappush(retry_queue, (time.monotonic() + delay, next(sequence), attempts, message))
+
+    def fail(message, attempts, exc):
+        if attempts < max_retries and _is_transient(exc):
+            report.retried += 1
+            requeue(message, attempts + 1, backoff * 2 ** attempts)
+        else:
+            current_app.logger.warning(f"Mail to {message.recipients} failed: {exc}")
+            report.failed.append((message, exc))
+
+    while True:
+        # Due retries go first, then fresh messages
+        batch = []
+        now = time.monotonic()
+        while retry_queue and retry_queue[0][0] <= now and len(batch) < batch_size:
+            _, _, attempts, message = heapq.heappop(retry_queue)
+            batch.append((attempts, message))
+        if len(batch) < batch_size:
+            for message in pending:
+                batch.append((0, message))
+                if len(batch) >= batch_size:
+                    break
+
+        if not batch:
+            if not retry_queue:
+                break
+            time.sleep(max(retry_queue[0][0] - time.monotonic(), 0))
+            continue
+
+        position = 0
+        connected = False
+        try:
+            with mail.connect() as connection:
+                connected = True
+                while position < len(batch):
+                    attempts, message = batch[position]
+                    limiter.wait()
+                    try:
+                        connection.send(message)
+                        report.sent += 1
+                    except Exception as exc:
+                        fail(message, attempts, exc)
+                        if _connection_lost(exc):
+                            position += 1
+                            raise
+                    position += 1
+        except Exception as exc:
+            # Messages never tried on a dropped connection go straight to a fresh
+            # one, a failed connect backs off like any other transient failure
+            for attempts, message in batch[position:]:
+                if connected:
+                    requeue(message, attempts)
+                else:
+                    fail(message, attempts, exc)
+
+    return report
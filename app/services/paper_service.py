@@ -0,0 +1,127 @@
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from flask import current_app
+from app.extensions import db, cache
+from app.models import Quiz, Question, Option
+
+# Shared cache key of a quiz's paper at one questions_version
+_KEY = "quiz_paper:{quiz_id}:{version}"
+
+
+class PaperSnapshot:
+    """
+    A quiz's question paper at one questions_version, encoded once: questions
+    and options without answers, and the hash of the body as its ETag.
+    """
+    __slots__ = ('quiz_id', 'version', 'body', 'etag')
+
+    def __init__(self, quiz_id, version, body):
+        self.quiz_id = quiz_id
+        self.version = version
+        self.body = body
+        self.etag = hashlib.sha256(body).hexdigest()
+
+    @classmethod
+    def build(cls, quiz_id, version):
+        """Serialize the paper from two queries, one for the questions and one for their options."""
+        questions = db.session.query(
+            Question.id, Question.text, Question.marks, Question.negative_marks, Question.question_type
+        ).filter(
+            Question.quiz_id == quiz_id
+        ).order_by(Question.id).all()
+
+        options = OrderedDict((question.id, []) for question in questions)
+        rows = db.session.query(Option.question_id, Option.id, Option.text).join(
+            Question, Question.id == Option.question_id
+        ).filter(
+            Question.quiz_id == quiz_id
+        ).order_by(Option.question_id, Option.id)
+        for question_id, option_id, text in rows:
+            options[question_id].append({"id": option_id, "text": text})
+
+        paper = {
+            "quiz_id": quiz_id,
+            "questions_version": version,
+            "questions": [
+                {
+                    "id": question.id,
+                    "text": question.text,
+                    "marks": question.marks,
+                    "negative_marks": question.negative_marks,
+                    "question_type": question.question_type,
+                    "options": options[question.id]
+                }
+                for question in questions
+            ]
+        }
+        return cls(quiz_id, version, json.dumps(paper, separators=(',', ':')).encode('utf-8'))
+
+
+_papers = OrderedDict()
+_papers_lock = threading.Lock()
+# One builder per quiz in this process; the others wait for its snapshot
+_build_locks = {}
+
+
+def _remember(snapshot):
+    with _papers_lock:
+        _papers[snapshot.quiz_id] = snapshot
+        _papers.move_to_end(snapshot.quiz_id)
+        while len(_papers) > current_app.config['PAPER_CACHE_SIZE']:
+            _papers.popitem(last=False)
+
+
+def _local(quiz_id, version):
+    with _papers_lock:
+        snapshot = _papers.get(quiz_id)
+        if snapshot is not None and snapshot.version == version:
+            _papers.move_to_end(quiz_id)
+            return snapshot
+    return None
+
+
+def _shared(quiz_id, version):
+    body = cache.get(_KEY.format(quiz_id=quiz_id, version=version))
+    return PaperSnapshot(quiz_id, version, body) if body is not None else None
+
+
+def get_paper(quiz_id, version):
+    """
+    Return the paper snapshot of a quiz at questions_version, looked up in
+    this process's LRU (PAPER_CACHE_SIZE quizzes), then in the shared cache,
+    and built from the database only when neither has it.
+    """
+    snapshot = _local(quiz_id, version)
+    if snapshot is not None:
+        return snapshot
+
+    with _papers_lock:
+        build_lock = _build_locks.setdefault(quiz_id, threading.Lock())
+    with build_lock:
+        snapshot = _local(quiz_id, version) or _shared(quiz_id, version)
+        if snapshot is None:
+            snapshot = PaperSnapshot.build(quiz_id, version)
+            cache.set(_KEY.format(quiz_id=quiz_id, version=version), snapshot.body,
+                      timeout=current_app.config['PAPER_CACHE_TTL'])
+        _remember(snapshot)
+    return snapshot
+
+
+def forget(quiz_id, version):
+    """Drop a deleted quiz's paper from this process and from the shared cache."""
+    with _papers_lock:
+        _papers.pop(quiz_id, None)
+        _build_locks.pop(quiz_id, None)
+    cache.delete(_KEY.format(quiz_id=quiz_id, version=version))
+
+
+def warm(quiz):
+    """Build a quiz's current paper into the shared cache unless it is already there."""
+    if _shared(quiz.id, quiz.questions_version) is not None:
+        return False
+    snapshot = PaperSnapshot.build(quiz.id, quiz.questions_version)
+    cache.set(_KEY.format(quiz_id=quiz.id, version=quiz.questions_version), snapshot.body,
+              timeout=current_app.config['PAPER_CACHE_TTL'])
+    return True
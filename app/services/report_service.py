@@ -0,0 +1,177 @@
+import hashlib
+import json
+from io import BytesIO
+from xml.sax.saxutils import escape
+from flask import current_app
+from reportlab.graphics.charts.barcharts import VerticalBarChart
+from reportlab.graphics.charts.linecharts import HorizontalLineChart
+from reportlab.graphics.shapes import Drawing
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.styles import getSampleStyleSheet
+from reportlab.lib.units import mm
+from reportlab.platypus import Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
+from app.extensions import db, cache
+from app.models import Quiz, QuizAttempt
+from app.services import analytics_service
+
+# Cache key of a background report, scoped to the user who asked for it
+_KEY = "report:{user_id}:{report_id}"
+# Cache key of a rendered PDF, per user and version of the data it shows
+_PDF_KEY = "report_pdf:{user_id}:{version}"
+# Bump when the layout changes, so cached PDFs are rendered again
+_LAYOUT_VERSION = 1
+
+_CHART_WIDTH = 170 * mm
+_CHART_HEIGHT = 70 * mm
+
+
+def report_data(user_id):
+    """
+    Everything the report shows: the /quiz/user/summary_stats rollups plus the
+    user's attempts, oldest first.
+    """
+    attempts = db.session.query(
+        Quiz.title, QuizAttempt.score, Quiz.total_marks, QuizAttempt.attempt_date
+    ).join(
+        Quiz, Quiz.id == QuizAttempt.quiz_id
+    ).filter(
+        QuizAttempt.user_id == user_id
+    ).order_by(
+        QuizAttempt.attempt_date, QuizAttempt.id
+    ).all()
+
+    return {
+        **analytics_service.user_summary(user_id),
+        "attempts": [
+            {
+                "quiz_title": title,
+                "score": score,
+                "total_marks": total_marks,
+                "date": attempt_date.date().isoformat() if attempt_date else None,
+            }
+            for title, score, total_marks, attempt_date in attempts
+        ],
+    }
+
+
+def data_version(data):
+    """
+    :return: Hash of the report data and layout; equal hashes render equal PDFs
+    """
+    payload = json.dumps([_LAYOUT_VERSION, data], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def _chart_drawing(chart, labels):
+    chart.x, chart.y = 15 * mm, 15 * mm
+    chart.width, chart.height = _CHART_WIDTH - 20 * mm, _CHART_HEIGHT - 20 * mm
+    chart.categoryAxis.categoryNames = labels
+    chart.categoryAxis.labels.fontSize = 7
+    if len(labels) > 6:
+        chart.categoryAxis.labels.angle = 30
+        chart.categoryAxis.labels.boxAnchor = 'ne'
+    chart.valueAxis.labels.fontSize = 7
+    drawing = Drawing(_CHART_WIDTH, _CHART_HEIGHT)
+    drawing.add(chart)
+    return drawing
+
+
+def subject_chart(subject_scores):
+    """Bar chart of the average score per subject."""
+    chart = VerticalBarChart()
+    values = [round(row["avg_score"], 2) for row in subject_scores]
+    chart.data = [values]
+    chart.bars[0].fillColor = colors.HexColor('#4e79a7')
+    chart.valueAxis.valueMin = min(0, min(values))
+    return _chart_drawing(chart, [row["subject"] for row in subject_scores])
+
+
+def monthly_chart(monthly_attempts):
+    """Line chart of the attempts per month."""
+    chart = HorizontalLineChart()
+    chart.data = [[row["count"] for row in monthly_attempts]]
+    chart.lines[0].strokeColor = colors.HexColor('#f28e2b')
+    chart.lines[0].strokeWidth = 1.5
+    chart.valueAxis.valueMin = 0
+    return _chart_drawing(chart, [row["month"] for row in monthly_attempts])
+
+
+def render_quiz_report(data):
+    """
+    Build the quiz report PDF in memory.
+    :param data: Output of report_data
+    :return: PDF bytes
+    """
+    styles = getSampleStyleSheet()
+    story = [Paragraph("Your Quiz Report", styles['Title']), Spacer(1, 6 * mm)]
+
+    if data["subject_scores"]:
+        story += [Paragraph("Subject Score Chart", styles['Heading2']),
+                  subject_chart(data["subject_scores"]), Spacer(1, 6 * mm)]
+    if data["monthly_attempts"]:
+        story += [Paragraph("Monthly Attempts Chart", styles['Heading2']),
+                  monthly_chart(data["monthly_attempts"]), Spacer(1, 6 * mm)]
+
+    story.append(Paragraph("Quiz Attempts", styles['Heading2']))
+    if data["attempts"]:
+        rows = [["Quiz", "Date", "Score", "Total marks"]] + [
+            [Paragraph(escape(attempt["quiz_title"] or ''), styles['BodyText']),
+             attempt["date"] or '', attempt["score"], attempt["total_marks"]]
+            for attempt in data["attempts"]
+        ]
+        table = Table(rows, colWidths=[95 * mm, 25 * mm, 25 * mm, 25 * mm], repeatRows=1)
+        table.setStyle(TableStyle([
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('LINEBELOW', (0, 0), (-1, 0), 0.5, colors.grey),
+            ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+        ]))
+        story.append(table)
+    else:
+        story.append(Paragraph("No attempts yet.", styles['BodyText']))
+
+    buffer = BytesIO()
+    SimpleDocTemplate(buffer, pagesize=A4, title="Your Quiz Report").build(story)
+    return buffer.getvalue()
+
+
+def cached_pdf(user_id, version):
+    """
+    :return: PDF bytes rendered earlier for this data version, or None
+    """
+    return cache.get(_PDF_KEY.format(user_id=user_id, version=version))
+
+
+def build_report(user_id, data=None):
+    """
+    The user's report PDF, rendered only when no PDF of the same data version
+    is cached. Cached PDFs are kept for REPORT_CACHE_TTL seconds.
+    :return: (version, PDF bytes)
+    """
+    data = data if data is not None else report_data(user_id)
+    version = data_version(data)
+    pdf = cached_pdf(user_id, version)
+    if pdf is None:
+        pdf = render_quiz_report(data)
+        cache.set(_PDF_KEY.format(user_id=user_id, version=version), pdf,
+                  timeout=current_app.config['REPORT_CACHE_TTL'])
+    return version, pdf
+
+
+def save_report(user_id, report_id, status, version=None, error=None):
+    """
+    Record the state of a background report: 'pending', 'ready' with the data
+    version of its cached PDF, or 'failed' with an error message. Entries
+    expire after REPORT_TTL seconds.
+    """
+    cache.set(_KEY.format(user_id=user_id, report_id=report_id),
+              {"status": status, "version": version, "error": error},
+              timeout=current_app.config['REPORT_TTL'])
+
+
+def load_report(user_id, report_id):
+    """
+    :return: The entry written by save_report, or None if unknown, expired or
+        owned by another user
+    """
+    return cache.get(_KEY.format(user_id=user_id, report_id=report_id))
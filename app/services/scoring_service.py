@@ -0,0 +1,144 @@
+import threading
+from collections import OrderedDict
+from flask import current_app
+from app.extensions import db
+from app.models import Question, Option
+
+
+class _KeyEntry:
+    """Scoring data for a single question with options mapped to bit positions."""
+    __slots__ = ('is_msq', 'marks', 'negative_marks', 'correct_options',
+                 'first_correct', 'correct_mask', 'correct_count', 'option_bits')
+
+    def __init__(self, question_type, marks, negative_marks, correct_options, option_ids):
+        self.is_msq = question_type == 'MSQ'
+        self.marks = marks
+        self.negative_marks = negative_marks
+        self.correct_options = correct_options or []
+        self.first_correct = self.correct_options[0] if self.correct_options else None
+
+        # Correct ids are included so a stale correct_options entry still gets a bit
+        self.option_bits = {}
+        for option_id in list(option_ids) + list(self.correct_options):
+            if option_id not in self.option_bits:
+                self.option_bits[option_id] = 1 << len(self.option_bits)
+        self.correct_mask = 0
+        for option_id in self.correct_options:
+            self.correct_mask |= self.option_bits[option_id]
+        self.correct_count = bin(self.correct_mask).count('1')
+
+    def score(self, selected_options):
+        """Same rules as Question.calculate_score."""
+        if not selected_options:
+            return 0
+        if not self.is_msq:
+            return self.marks if selected_options == self.first_correct else -self.negative_marks
+
+        if not isinstance(selected_options, (list, tuple)):
+            selected_options = [selected_options]
+        selected_mask = 0
+        for option_id in selected_options:
+            bit = self.option_bits.get(option_id) if isinstance(option_id, int) else None
+            if bit is None:
+                return 0  # Unknown option, counts as an incorrect selection
+            selected_mask |= bit
+
+        if selected_mask & ~self.correct_mask:
+            return 0
+        return bin(selected_mask).count('1') * (self.marks / self.correct_count)
+
+
+class CompiledAnswerKey:
+    """
+    Answer key of one quiz at a given questions_version, built from a single query.
+    """
+    __slots__ = ('quiz_id', 'version', 'entries')
+
+    def __init__(self, quiz_id, version, entries):
+        self.quiz_id = quiz_id
+        self.version = version
+        self.entries = entries
+
+    @classmethod
+    def compile(cls, quiz_id, version):
+        rows = db.session.query(
+            Question.id,
+            Question.question_type,
+            Question.marks,
+            Question.negative_marks,
+            Question.correct_options,
+            Option.id
+        ).outerjoin(
+            Option, Option.question_id == Question.id
+        ).filter(
+            Question.quiz_id == quiz_id
+        ).order_by(
+            Question.id, Option.id
+        ).all()
+
+        grouped = OrderedDict()
+        for question_id, question_type, marks, negative_marks, correct_options, option_id in rows:
+            if question_id not in grouped:
+                grouped[question_id] = (question_type, marks, negative_marks, correct_options, [])
+            if option_id is not None:
+                grouped[question_id][4].append(option_id)
+
+        entries = {
+            question_id: _KeyEntry(*data) for question_id, data in grouped.items()
+        }
+        return cls(quiz_id, version, entries)
+
+    def score_sheet(self, answers):
+        """
+        Score a whole answer sheet in one pass.
+        Args:
+            answers (dict): Question ID (as submitted) -> selected option(s).
+        Returns:
+            tuple: (total score, {question ID: correct option IDs}) for the
+            questions of this quiz that were answered.
+        """
+        score = 0
+        correct_answers = {}
+        for question_id, selected_options in answers.items():
+            try:
+                entry = self.entries.get(int(question_id))
+            except (TypeError, ValueError):
+                entry = None
+            if entry is None:
+                continue
+            score += entry.score(selected_options)
+            correct_answers[question_id] = entry.correct_options
+        return score, correct_answers
+
+
+_answer_keys = OrderedDict()
+_answer_keys_lock = threading.Lock()
+
+
+def forget_answer_key(quiz_id):
+    """Drop a deleted quiz's compiled answer key from this process."""
+    with _answer_keys_lock:
+        _answer_keys.pop(quiz_id, None)
+
+
+def get_answer_key(quiz):
+    """
+    Return the compiled answer key for a quiz, rebuilding it when the cached
+    copy is older than quiz.questions_version. Keys are kept in a per-process
+    LRU bounded by ANSWER_KEY_CACHE_SIZE.
+    """
+    version = quiz.questions_version
+    with _answer_keys_lock:
+        key = _answer_keys.get(quiz.id)
+        if key is not None and key.version == version:
+            _answer_keys.move_to_end(quiz.id)
+            return key
+
+    key = CompiledAnswerKey.compile(quiz.id, version)
+
+    with _answer_keys_lock:
+        _answer_keys[quiz.id] = key
+        _answer_keys.move_to_end(quiz.id)
+        while len(_answer_keys) > current_app.config['ANSWER_KEY_CACHE_SIZE']:
+            _answer_keys.popitem(last=False)
+    return key
@@ -0,0 +1,189 @@
+import re
+from sqlalchemy import DDL, event, inspect, or_, text
+from app.extensions import db
+from app.models import Chapter, Subject, User, Quiz, Question
+
+# Indexed kinds: model, title column, body columns. Every kind has its own FTS5
+# table, search_<kind>, whose rowid is the id of the source row, so small kinds
+# are never ranked against the question catalog.
+SOURCES = {
+    "user": (User, "full_name", ("email",)),
+    "subject": (Subject, "name", ("code", "description")),
+    "chapter": (Chapter, "name", ("code", "description")),
+    "quiz": (Quiz, "title", ("description",)),
+    "question": (Question, "text", ()),
+}
+
+# Title matches weigh ten times more than body matches
+_RANK_WEIGHTS = "10.0, 1.0"
+
+_available = {}
+
+
+def _table(kind):
+    return f"search_{kind}"
+
+
+for _kind in SOURCES:
+    event.listen(db.metadata, 'after_create', DDL(
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {_table(_kind)} USING fts5("
+        f"title, body, tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+    ).execute_if(dialect='sqlite'))
+
+
+@event.listens_for(db.metadata, 'after_create')
+def _reset_availability(target, connection, **kw):
+    _available.clear()
+
+
+def _enabled(connection):
+    """
+    Whether the FTS5 tables can be used on this connection. They only exist on
+    SQLite; other backends fall back to LIKE matching.
+    """
+    if connection.dialect.name != 'sqlite':
+        return False
+    key = str(connection.engine.url)
+    if key not in _available:
+        _available[key] = connection.execute(text(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'search_question'"
+        )).first() is not None
+    return _available[key]
+
+
+def _document(kind, target):
+    _, title, body = SOURCES[kind]
+    return {
+        "rowid": target.id,
+        "title": getattr(target, title) or "",
+        "body": " ".join(getattr(target, name) or "" for name in body),
+    }
+
+
+def _unindex(connection, kind, ref_id):
+    connection.execute(text(f"DELETE FROM {_table(kind)} WHERE rowid = :rowid"), {"rowid": ref_id})
+
+
+def _index(connection, kind, target):
+    _unindex(connection, kind, target.id)
+    connection.execute(
+        text(f"INSERT INTO {_table(kind)} (rowid, title, body) VALUES (:rowid, :title, :body)"),
+        _document(kind, target)
+    )
+
+
+def _register(kind, model):
+    _, title, body = SOURCES[kind]
+    indexed = (title,) + body
+
+    @event.listens_for(model, 'after_insert')
+    def indexed_insert(mapper, connection, target):
+        if _enabled(connection):
+            _index(connection, kind, target)
+
+    @event.listens_for(model, 'after_update')
+    def indexed_update(mapper, connection, target):
+        state = inspect(target)
+        if _enabled(connection) and any(state.attrs[name].history.has_changes() for name in indexed):
+            _index(connection, kind, target)
+
+    @event.listens_for(model, 'after_delete')
+    def indexed_delete(mapper, connection, target):
+        if _enabled(connection):
+            _unindex(connection, kind, target.id)
+
+
+for _kind, (_model, _title, _body) in SOURCES.items():
+    _register(_kind, _model)
+
+
+def index_rows(kind, rows):
+    """
+    Index rows written without the ORM, which the mapper events above miss.
+    :param kind: Indexed kind
+    :param rows: Dicts holding the id and the indexed columns of each row
+    """
+    connection = db.session.connection()
+    if not rows or not _enabled(connection):
+        return
+    _, title, body = SOURCES[kind]
+    connection.execute(
+        text(f"INSERT INTO {_table(kind)} (rowid, title, body) VALUES (:rowid, :title, :body)"),
+        [{
+            "rowid": row["id"],
+            "title": row.get(title) or "",
+            "body": " ".join(row.get(name) or "" for name in body),
+        } for row in rows]
+    )
+
+
+def match_expression(query):
+    """
+    Turn free text into an FTS5 query: every word becomes a quoted prefix term,
+    so user input can never inject FTS syntax. Returns None if there are no words.
+    """
+    words = re.findall(r"\w+", query.lower())
+    if not words:
+        return None
+    return " ".join(f'"{word}"*' for word in words)
+
+
+def search_ids(kind, query, limit=10):
+    """
+    IDs of the rows of one kind matching the query, best match first.
+    """
+    expression = match_expression(query)
+    if expression is None:
+        return []
+
+    model, title, body = SOURCES[kind]
+    if not _enabled(db.session.connection()):
+        # Unranked fallback for backends without FTS5
+        columns = [getattr(model, name) for name in (title,) + body]
+        return [ref_id for (ref_id,) in db.session.query(model.id).filter(
+            or_(*(column.ilike(f"%{query.strip()}%") for column in columns))
+        ).order_by(model.id).limit(limit)]
+
+    table = _table(kind)
+    rows = db.session.execute(text(
+        f"SELECT rowid FROM {table} WHERE {table} MATCH :expression "
+        f"ORDER BY bm25({table}, {_RANK_WEIGHTS}) LIMIT :limit"
+    ), {"expression": expression, "limit": limit})
+    return [ref_id for (ref_id,) in rows]
+
+
+def search(kind, query, limit=10):
+    """
+    Model instances of one kind matching the query, best match first.
+    """
+    ids = search_ids(kind, query, limit)
+    if not ids:
+        return []
+    model = SOURCES[kind][0]
+    by_id = {row.id: row for row in model.query.filter(model.id.in_(ids))}
+    return [by_id[ref_id] for ref_id in ids if ref_id in by_id]
+
+
+def rebuild_index():
+    """
+    Repopulate the FTS5 tables from the source tables with one INSERT ... SELECT
+    per kind, then merge their index segments.
+    Returns:
+        dict: Kind -> number of indexed rows, or None when FTS5 is unavailable.
+    """
+    connection = db.session.connection()
+    if not _enabled(connection):
+        return None
+
+    counts = {}
+    for kind, (model, title, body) in SOURCES.items():
+        table = _table(kind)
+        body_sql = " || ' ' || ".join(f"coalesce({name}, '')" for name in body) or "''"
+        connection.execute(text(f"DELETE FROM {table}"))
+        counts[kind] = connection.execute(text(
+            f"INSERT INTO {table} (rowid, title, body) "
+            f"SELECT id, coalesce({title}, ''), {body_sql} FROM \"{model.__table__.name}\""
+        )).rowcount
+        connection.execute(text(f"INSERT INTO {table} ({table}) VALUES ('optimize')"))
+    db.session.commit()
+    return counts
@@ -0,0 +1,77 @@
+from datetime import datetime, timezone
+from sqlalchemy import event, func
+from app.extensions import db
+from app.models import Chapter, Subject, User, Quiz, Question, EntityCounter
+
+# Counter name -> model whose rows it counts
+COUNTED_MODELS = {
+    "quiz": Quiz,
+    "question": Question,
+    "chapter": Chapter,
+    "subject": Subject,
+    "user": User,
+}
+
+_counters = EntityCounter.__table__
+
+
+def _adjust_on(connection, name, delta):
+    connection.execute(
+        _counters.update().where(_counters.c.name == name).values(value=_counters.c.value + delta)
+    )
+
+
+def adjust(name, delta):
+    """
+    Adjust a counter inside the current session's transaction. Only needed for
+    Core-level bulk writes, which do not fire the mapper events below.
+    """
+    _adjust_on(db.session.connection(), name, delta)
+
+
+def _register(name, model):
+    @event.listens_for(model, 'after_insert')
+    def counted_insert(mapper, connection, target):
+        _adjust_on(connection, name, 1)
+
+    @event.listens_for(model, 'after_delete')
+    def counted_delete(mapper, connection, target):
+        _adjust_on(connection, name, -1)
+
+
+for _name, _model in COUNTED_MODELS.items():
+    _register(_name, _model)
+
+
+def reconcile():
+    """
+    Overwrite every counter with a real COUNT(*) to repair drift from bulk
+    statements that bypass the listeners.
+    Returns:
+        dict: Counter name -> reconciled value.
+    """
+    now = datetime.now(timezone.utc)
+    values = {}
+    for name, model in COUNTED_MODELS.items():
+        values[name] = db.session.query(func.count(model.id)).scalar()
+        counter = db.session.get(EntityCounter, name)
+        if counter is None:
+            counter = EntityCounter(name=name)
+            db.session.add(counter)
+        counter.value = values[name]
+        counter.reconciled_at = now
+    db.session.commit()
+    return values
+
+
+def snapshot():
+    """
+    Current counts read from the counter table in one query. Read-only: a
+    counter that was never seeded (the migration and reconcile() seed them)
+    is answered with a COUNT(*) until the hourly reconciliation creates it.
+    """
+    values = dict(db.session.query(EntityCounter.name, EntityCounter.value).all())
+    for name, model in COUNTED_MODELS.items():
+        if name not in values:
+            values[name] = db.session.query(func.count(model.id)).scalar()
+    return values
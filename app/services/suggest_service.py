@@ -0,0 +1,286 @@
+import logging
+import re
+import threading
+import time
+import unicodedata
+from bisect import bisect_left, insort
+from flask import current_app
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session, object_session
+from app.extensions import db
+from app.models import Chapter, Subject, User, Quiz
+
+logger = logging.getLogger(__name__)
+
+# Suggested kinds: model and label column. Users are only suggested to admins.
+SOURCES = {
+    "quiz": (Quiz, "title"),
+    "subject": (Subject, "name"),
+    "chapter": (Chapter, "name"),
+    "user": (User, "full_name"),
+}
+PRIVATE_KINDS = ("user",)
+
+# Prefix keys are cut to this many characters, which bounds memory per label
+_MAX_KEY_LENGTH = 32
+# Keys read per prefix probe before ranking
+_SCAN_LIMIT = 64
+
+
+def normalize(text):
+    """Lowercase, strip accents and collapse everything but letters and digits to single spaces."""
+    text = unicodedata.normalize('NFKD', text or '')
+    text = ''.join(char for char in text if not unicodedata.combining(char))
+    return ' '.join(re.findall(r'\w+', text.lower()))
+
+
+class SuggestIndex:
+    """
+    Prefix index over labels. Every word start of a label is stored as a key in
+    one sorted list, so all keys sharing a prefix are adjacent and are found
+    with a binary search, like walking a trie without the per-node objects.
+    """
+
+    def __init__(self):
+        self._keys = []  # sorted (key, word_position, kind, ref_id)
+        self._labels = {}  # (kind, ref_id) -> label
+        self._alphabet = set(' ')
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._labels)
+
+    def __contains__(self, entry):
+        return entry in self._labels
+
+    @staticmethod
+    def _label_keys(label):
+        words = normalize(label).split(' ')
+        for position in range(len(words)):
+            key = ' '.join(words[position:])[:_MAX_KEY_LENGTH]
+            if key:
+                yield key, position
+
+    def add(self, kind, ref_id, label):
+        with self._lock:
+            self._discard(kind, ref_id)
+            self._labels[(kind, ref_id)] = label
+            for key, position in self._label_keys(label):
+                self._alphabet.update(key)
+                insort(self._keys, (key, position, kind, ref_id))
+
+    def load(self, entries):
+        """Bulk add (kind, ref_id, label) entries to an empty index, sorting once."""
+        with self._lock:
+            for kind, ref_id, label in entries:
+                self._labels[(kind, ref_id)] = label
+                for key, position in self._label_keys(label):
+                    self._alphabet.update(key)
+                    self._keys.append((key, position, kind, ref_id))
+            self._keys.sort()
+
+    def remove(self, kind, ref_id):
+        with self._lock:
+            self._discard(kind, ref_id)
+
+    def _discard(self, kind, ref_id):
+        label = self._labels.pop((kind, ref_id), None)
+        if label is None:
+            return
+        for key, position in self._label_keys(label):
+            entry = (key, position, kind, ref_id)
+            i = bisect_left(self._keys, entry)
+            if i < len(self._keys) and self._keys[i] == entry:
+                del self._keys[i]
+
+    def _probe(self, prefix):
+        """Up to _SCAN_LIMIT keys starting with the prefix."""
+        keys = self._keys
+        i = bisect_left(keys, (prefix,))
+        # Most typo variants match nothing, so settle that before slicing
+        if i == len(keys) or not keys[i][0].startswith(prefix):
+            return []
+        return [entry for entry in keys[i:i + _SCAN_LIMIT] if entry[0].startswith(prefix)]
+
+    def _variants(self, prefix):
+        """Prefixes one edit (insert, delete, substitute, transpose) away from the given one."""
+        variants = set()
+        for i in range(len(prefix) + 1):
+            for char in self._alphabet:
+                variants.add(prefix[:i] + char + prefix[i:])
+            if i < len(prefix):
+                variants.add(prefix[:i] + prefix[i + 1:])
+                for char in self._alphabet:
+                    variants.add(prefix[:i] + char + prefix[i + 1:])
+            if i < len(prefix) - 1:
+                variants.add(prefix[:i] + prefix[i + 1] + prefix[i] + prefix[i + 2:])
+        variants.discard(prefix)
+        return variants
+
+    def suggest(self, query, limit=8, max_edits=1):
+        """
+        Labels with a word starting with the query, then labels one edit away
+        when the query is long enough for typos to be likely.
+        Returns:
+            list: (rank, kind, ref_id, label) tuples, best first.
+        """
+        prefix = normalize(query)[:_MAX_KEY_LENGTH]
+        if not prefix:
+            return []
+
+        with self._lock:
+            best = {}
+            probes = [(0, prefix)]
+            if max_edits and len(prefix) >= 4:
+                probes += [(1, variant) for variant in self._variants(prefix)]
+            for edits, probe in probes:
+                for key, position, kind, ref_id in self._probe(probe):
+                    label = self._labels[(kind, ref_id)]
+                    # Fewer edits first, then matches on the first word, then shorter labels
+                    rank = (edits, position > 0, len(label), label.lower())
+                    current = best.get((kind, ref_id))
+                    if current is None or rank < current[0]:
+                        best[(kind, ref_id)] = (rank, kind, ref_id, label)
+                if edits == 0 and len(best) >= limit:
+                    break
+        return sorted(best.values())[:limit]
+
+
+_indexes = {"public": None, "private": None}
+_state = {"built_at": 0.0, "refreshing": False}
+_build_lock = threading.Lock()
+
+
+def _index_for(kind):
+    return _indexes["private" if kind in PRIVATE_KINDS else "public"]
+
+
+def build():
+    """
+    Load every suggested label into fresh indexes and swap them in. Stops at
+    SUGGEST_MAX_ENTRIES labels, filling quizzes (newest first), subjects and
+    chapters before users.
+    """
+    budget = current_app.config['SUGGEST_MAX_ENTRIES']
+    entries = {"public": [], "private": []}
+    for kind, (model, column) in SOURCES.items():
+        if budget <= 0:
+            logger.warning("Suggestion index is capped at %s labels", current_app.config['SUGGEST_MAX_ENTRIES'])
+            break
+        rows = db.session.query(model.id, getattr(model, column)).order_by(model.id.desc()).limit(budget)
+        loaded = [(kind, ref_id, label) for ref_id, label in rows.yield_per(1000)]
+        entries["private" if kind in PRIVATE_KINDS else "public"] += loaded
+        budget -= len(loaded)
+
+    public, private = SuggestIndex(), SuggestIndex()
+    public.load(entries["public"])
+    private.load(entries["private"])
+
+    _indexes["public"], _indexes["private"] = public, private
+    _state["built_at"] = time.monotonic()
+    return len(public) + len(private)
+
+
+def _refresh_in_background(app):
+    def run():
+        try:
+            with app.app_context():
+                build()
+        except Exception:
+            logger.exception("Refreshing the suggestion index failed")
+        finally:
+            _state["refreshing"] = False
+
+    _state["refreshing"] = True
+    threading.Thread(target=run, name="suggest-refresh", daemon=True).start()
+
+
+def _ensure_built():
+    """
+    Build the indexes on first use. Once they are older than
+    SUGGEST_REFRESH_SECONDS they are rebuilt in the background, picking up
+    changes committed by other processes, while the old ones keep serving.
+    """
+    if _indexes["public"] is None:
+        with _build_lock:
+            if _indexes["public"] is None:
+                build()
+        return
+    age = time.monotonic() - _state["built_at"]
+    if age > current_app.config['SUGGEST_REFRESH_SECONDS'] and not _state["refreshing"]:
+        with _build_lock:
+            if not _state["refreshing"]:
+                _refresh_in_background(current_app._get_current_object())
+
+
+def suggest(query, include_private=False, limit=8):
+    """
+    Autocomplete suggestions for the query, tolerating one typo once it has
+    four or more characters.
+    Returns:
+        list: {"kind", "id", "label"} dicts, best first.
+    """
+    _ensure_built()
+    matches = _indexes["public"].suggest(query, limit)
+    if include_private:
+        matches = sorted(matches + _indexes["private"].suggest(query, limit))[:limit]
+    return [{"kind": kind, "id": ref_id, "label": label} for _, kind, ref_id, label in matches]
+
+
+# Changes are queued per session by the mapper events and applied to this
+# process's indexes once the transaction commits.
+def _queue(target, change):
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault('suggest_changes', []).append(change)
+
+
+def _register(kind, model, column):
+    @event.listens_for(model, 'after_insert')
+    def suggested_insert(mapper, connection, target):
+        _queue(target, (kind, target.id, getattr(target, column)))
+
+    @event.listens_for(model, 'after_update')
+    def suggested_update(mapper, connection, target):
+        if inspect(target).attrs[column].history.has_changes():
+            _queue(target, (kind, target.id, getattr(target, column)))
+
+    @event.listens_for(model, 'after_delete')
+    def suggested_delete(mapper, connection, target):
+        _queue(target, (kind, target.id, None))
+
+
+for _kind, (_model, _column) in SOURCES.items():
+    _register(_kind, _model, _column)
+
+
+def apply_changes(changes):
+    """
+    Apply (kind, ref_id, label) changes to the built indexes, a None label
+    removing the entry. New labels past SUGGEST_MAX_ENTRIES are dropped. Also
+    used for rows written without the ORM.
+    """
+    if _indexes["public"] is None:
+        return
+    size = len(_indexes["public"]) + len(_indexes["private"])
+    for kind, ref_id, label in changes:
+        index = _index_for(kind)
+        if label is None:
+            index.remove(kind, ref_id)
+        elif (kind, ref_id) in index or size < current_app.config['SUGGEST_MAX_ENTRIES']:
+            size += (kind, ref_id) not in index
+            index.add(kind, ref_id, label)
+
+
+@event.listens_for(Session, 'after_commit')
+def _apply_committed(session):
+    changes = session.info.pop('suggest_changes', None)
+    if changes:
+        apply_changes(changes)
+
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _drop_rolled_back(session, previous_transaction):
+    # A rolled back savepoint leaves the outer transaction's changes pending
+    if not previous_transaction.nested:
+        session.info.pop('suggest_changes', None)
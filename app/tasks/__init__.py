@@ -1,4 +1,9 @@
 # This provides the files as package
-from .reminders import send_daily_reminders
+from .reminders import send_daily_reminders, send_reminder_digests
 from .monthly_reports import send_monthly_reports
-from .csv_export import export_user_quiz_csv, export_all_users_quiz_csv
\ No newline at end of file
+from .csv_export import export_user_quiz_csv, export_all_users_quiz_csv
+from .maintenance import reconcile_entity_counters
+from .reports import render_user_report
+from .autosave import flush_autosaves
+from .papers import warm_quiz_papers
+from .imports import import_user_rows
@@ -0,0 +1,9 @@
+# backend/app/tasks/autosave.py
+from app.celery_app import celery
+
+
+@celery.task
+def flush_autosaves():
+    """Write the answers buffered by /quiz/autosave to the database in batches."""
+    from app.services.autosave_service import flush
+    return flush()
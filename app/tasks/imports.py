@@ -0,0 +1,33 @@
+# backend/app/tasks/imports.py
+from app.celery_app import celery
+
+
+@celery.task
+def import_user_rows(job_id):
+    """
+    Import an upload too large for the request, for /admin/users/import/<job_id>
+    to report on. The rows are staged in the cache by the request, only the job
+    ID goes through the broker.
+    """
+    from app.services.import_service import import_users, save_job, take_rows
+
+    rows = take_rows(job_id)
+    if rows is None:
+        save_job(job_id, "failed", error="The upload expired before a worker picked it up.")
+        return 0
+
+    progress = {"report": None}
+
+    def record(report):
+        progress["report"] = report
+        save_job(job_id, "running", report=report)
+
+    save_job(job_id, "running")
+    try:
+        report = import_users(rows, progress=record)
+    except Exception:
+        save_job(job_id, "failed", report=progress["report"],
+                 error="The import stopped early; the users in the report were created.")
+        raise
+    save_job(job_id, "done", report=report)
+    return report["created"]
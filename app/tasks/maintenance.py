@@ -0,0 +1,9 @@
+# backend/app/tasks/maintenance.py
+from app.celery_app import celery
+
+
+@celery.task
+def reconcile_entity_counters():
+    """Periodically correct the admin dashboard counters against real counts."""
+    from app.services.stats_service import reconcile
+    return reconcile()
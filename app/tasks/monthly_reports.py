@@ -1,58 +1,109 @@
 # backend/app/tasks/monthly_report.py
 from ..celery_app import celery
 from flask_mail import Message
+from sqlalchemy import func
 
-from app.models import User, QuizAttempt
+from app.models import User, Quiz, QuizAttempt
 from datetime import datetime, timezone
+from app.utils.db import read_only
 
 
-def calculate_rank(user_id, quiz_id):
-    # Get all attempts for the given quiz
-    attempts = QuizAttempt.query.filter(
-        QuizAttempt.quiz_id == quiz_id
-    ).order_by(QuizAttempt.score.desc()).all()
+def ranked_attempts_since(since):
+    """
+    Return this period's submitted attempts with each attempt's rank within its
+    quiz. Ranks come from a RANK() window over the submitted attempts of the
+    quizzes touched in the period, so every quiz is ranked once by the database.
+    Returns:
+        list: (user_id, quiz_title, score, rank) rows ordered by user and date.
+    """
+    from app.extensions import db
 
-    # Iterate through the sorted attempts to find the user's rank
-    for rank, attempt in enumerate(attempts, start=1):
-        if attempt.user_id == user_id:
-            return rank
+    period_quizzes = db.session.query(QuizAttempt.quiz_id).filter(
+        QuizAttempt.attempt_date >= since
+    ).distinct()
+
+    ranked = db.session.query(
+        QuizAttempt.user_id,
+        QuizAttempt.quiz_id,
+        QuizAttempt.score,
+        QuizAttempt.attempt_date,
+        func.rank().over(
+            partition_by=QuizAttempt.quiz_id,
+            order_by=QuizAttempt.score.desc()
+        ).label('rank')
+    ).filter(
+        QuizAttempt.quiz_id.in_(period_quizzes),
+        # Started but never submitted attempts hold score 0 and are not ranked, as on the leaderboard
+        QuizAttempt.submitted_at.isnot(None)
+    ).subquery()
+
+    return db.session.query(
+        ranked.c.user_id,
+        Quiz.title,
+        ranked.c.score,
+        ranked.c.rank
+    ).join(
+        Quiz, Quiz.id == ranked.c.quiz_id
+    ).filter(
+        ranked.c.attempt_date >= since
+    ).order_by(
+        ranked.c.user_id, ranked.c.attempt_date
+    ).all()
+
+
+def user_totals_since(since):
+    """
+    Per-user attempt count and average score for the period in one grouped query.
+    """
+    from app.extensions import db
+
+    rows = db.session.query(
+        QuizAttempt.user_id,
+        func.count(QuizAttempt.id),
+        func.avg(QuizAttempt.score)
+    ).filter(
+        QuizAttempt.attempt_date >= since
+    ).group_by(
+        QuizAttempt.user_id
+    ).all()
+    return {user_id: (total, avg_score or 0) for user_id, total, avg_score in rows}
 
-    return None  # Return None if the user has no attempts for the quiz
 
 @celery.task
 def send_monthly_reports():
-    from app import create_app
-    from app.extensions import mail, db
-    app = create_app()
-    with app.app_context():
-        first_day = datetime.now(timezone.utc).replace(day=1)
-        users = User.query.all()
-
-        for user in users:
-            attempts = QuizAttempt.query.filter(
-                QuizAttempt.user_id == user.id,
-                QuizAttempt.attempt_date >= first_day
-            ).all()
-
-            total = len(attempts)
-            avg_score = sum([a.score for a in attempts]) / total if total else 0
+    from app.extensions import db
+    from app.services.mail_service import deliver
+    first_day = datetime.now(timezone.utc).replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+    # Gather everything up front, then release the connection before mailing
+    with read_only():
+        totals = user_totals_since(first_day)
+        attempts_by_user = {}
+        for user_id, quiz_title, score, rank in ranked_attempts_since(first_day):
+            attempts_by_user.setdefault(user_id, []).append((quiz_title, score, rank))
+        users = db.session.query(User.id, User.full_name, User.email).order_by(User.id).all()
+    db.session.remove()
+
+    def build_messages():
+        for user_id, full_name, email in users:
+            total, avg_score = totals.get(user_id, (0, 0))
 
             # Generate HTML for the email
             html = f"""
-                <h2>Monthly Activity Report - {user.full_name}</h2>
+                <h2>Monthly Activity Report - {full_name}</h2>
                 <p>Total quizzes taken: {total}</p>
                 <p>Average Score: {avg_score:.2f}</p>
                 <ul>
             """
-            for attempt in attempts:
-                rank = calculate_rank(user.id, attempt.quiz_id)
-                html += f"<li>{attempt.quiz.title} - {attempt.score} (Rank: {rank})</li>"
+            for quiz_title, score, rank in attempts_by_user.get(user_id, []):
+                html += f"<li>{quiz_title} - {score} (Rank: {rank})</li>"
 
             html += "</ul>"
 
-            msg = Message(
-                subject=f"{user.full_name}'s Monthly Activity Report",
-                recipients=[user.email],
+            yield Message(
+                subject=f"{full_name}'s Monthly Activity Report",
+                recipients=[email],
                 html=html
             )
-            mail.send(msg)
+
+    return deliver(build_messages()).serialize()
@@ -0,0 +1,21 @@
+# backend/app/tasks/papers.py
+from datetime import datetime, timezone, timedelta
+from flask import current_app
+from app.celery_app import celery
+from app.models import Quiz
+from app.utils.db import read_only
+
+
+@celery.task
+def warm_quiz_papers():
+    """
+    Build the question papers of quizzes that open within PAPER_WARM_AHEAD
+    minutes, or are open now, so the first students to open them find a snapshot.
+    """
+    from app.services import paper_service
+    now = datetime.now(timezone.utc)
+    horizon = now + timedelta(minutes=current_app.config['PAPER_WARM_AHEAD'])
+
+    with read_only():
+        quizzes = Quiz.query.filter(Quiz.start_time <= horizon, Quiz.end_time >= now).all()
+        return sum(1 for quiz in quizzes if paper_service.warm(quiz))
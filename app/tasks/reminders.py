@@ -1,28 +1,78 @@
 # backend/app/tasks/reminders.py
 from app.celery_app import celery
+from celery import group
+from flask import current_app
 from flask_mail import Message
-from app.models import User, Quiz
+from app.models import User, Quiz, QuizAttempt
 from datetime import datetime, timezone, timedelta
+from app.utils.db import read_only
 
 @celery.task
 def send_daily_reminders():
-    from app import create_app
-    from app.extensions import mail, db
-    app = create_app()
-    with app.app_context():
-        now = datetime.now(timezone.utc)
-        new_quiz_cutoff = now - timedelta(days=1)
-
-        users = User.query.all()
-        for user in users:
-            # Find new quizzes added in last 1 day
-            new_quizzes = Quiz.query.filter(Quiz.created_at >= new_quiz_cutoff).all()
-
-            if new_quizzes:
-                quiz_titles = '\n'.join([q.title for q in new_quizzes])
-                msg = Message(
-                    subject="New Quizzes Added - Don't Miss Out!",
-                    recipients=[user.email],
-                    body=f"Hi {user.full_name},\n\nNew quizzes were added:\n\n{quiz_titles}\n\nCheck and attempt them!"
-                )
-                mail.send(msg)
+    from app.extensions import db
+    now = datetime.now(timezone.utc)
+    new_quiz_cutoff = now - timedelta(days=1)
+
+    with read_only():
+        # Find new quizzes added in last 1 day, once for everybody
+        new_quizzes = [
+            [quiz_id, title] for quiz_id, title in db.session.query(Quiz.id, Quiz.title).filter(
+                Quiz.created_at >= new_quiz_cutoff
+            ).order_by(Quiz.id).all()
+        ]
+        if not new_quizzes:
+            return 0
+
+        # Walk users by id in chunks and fan each chunk out to its own subtask
+        chunk_size = current_app.config['REMINDER_CHUNK_SIZE']
+        subtasks = []
+        last_id = 0
+        while True:
+            user_ids = [user_id for (user_id,) in db.session.query(User.id).filter(
+                User.id > last_id
+            ).order_by(User.id).limit(chunk_size)]
+            if not user_ids:
+                break
+            subtasks.append(send_reminder_digests.s(user_ids, new_quizzes))
+            last_id = user_ids[-1]
+    db.session.remove()
+
+    group(subtasks).apply_async()
+    return len(subtasks)
+
+
+@celery.task
+def send_reminder_digests(user_ids, new_quizzes):
+    """
+    Send one digest per user in the chunk listing the new quizzes they have not
+    attempted yet.
+    Args:
+        user_ids (list): IDs of the users in this chunk.
+        new_quizzes (list): [quiz_id, title] pairs computed by send_daily_reminders.
+    """
+    from app.extensions import db
+    from app.services.mail_service import deliver
+    quiz_ids = [quiz_id for quiz_id, _ in new_quizzes]
+    with read_only():
+        users = db.session.query(User.id, User.full_name, User.email).filter(
+            User.id.in_(user_ids)
+        ).order_by(User.id).all()
+        attempted = set(db.session.query(QuizAttempt.user_id, QuizAttempt.quiz_id).filter(
+            QuizAttempt.user_id.in_(user_ids),
+            QuizAttempt.quiz_id.in_(quiz_ids)
+        ).all())
+    db.session.remove()
+
+    def build_messages():
+        for user_id, full_name, email in users:
+            pending = [title for quiz_id, title in new_quizzes if (user_id, quiz_id) not in attempted]
+            if not pending:
+                continue
+            quiz_titles = '\n'.join(pending)
+            yield Message(
+                subject="New Quizzes Added - Don't Miss Out!",
+                recipients=[email],
+                body=f"Hi {full_name},\n\nNew quizzes were added:\n\n{quiz_titles}\n\nCheck and attempt them!"
+            )
+
+    return deliver(build_messages()).serialize()
@@ -0,0 +1,15 @@
+# backend/app/tasks/reports.py
+from app.celery_app import celery
+
+
+@celery.task
+def render_user_report(user_id, report_id):
+    """Render a user's quiz report PDF for /user/reports/<report_id> to hand out."""
+    from app.services.report_service import build_report, save_report
+    try:
+        version, pdf = build_report(user_id)
+    except Exception:
+        save_report(user_id, report_id, "failed", error="The report could not be rendered.")
+        raise
+    save_report(user_id, report_id, "ready", version=version)
+    return len(pdf)
@@ -2,8 +2,12 @@
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.executors.pool import ThreadPoolExecutor
 import threading
+from app.config import Config
 from .reminders import send_daily_reminders
 from .monthly_reports import send_monthly_reports
+from .maintenance import reconcile_entity_counters
+from .autosave import flush_autosaves
+from .papers import warm_quiz_papers
 
 scheduler_lock = threading.Lock()
 
@@ -12,4 +16,7 @@ def start_scheduler():
         scheduler = BackgroundScheduler(executors={'default': ThreadPoolExecutor(10)})
         scheduler.add_job(send_daily_reminders, 'cron', hour=19, minute=0)
         scheduler.add_job(send_monthly_reports, 'cron', day=30, hour=22, minute=0)
+        scheduler.add_job(reconcile_entity_counters, 'interval', hours=1)
+        scheduler.add_job(flush_autosaves, 'interval', seconds=Config.AUTOSAVE_FLUSH_INTERVAL, max_instances=1)
+        scheduler.add_job(warm_quiz_papers, 'interval', minutes=5)
         scheduler.start()
\ No newline at end of file
@@ -1,4 +1,78 @@
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from functools import lru_cache
+from flask import current_app, has_app_context
 from werkzeug.security import generate_password_hash, check_password_hash
+from app.utils.exceptions import ServiceBusyError
+
+logger = logging.getLogger(__name__)
+
+# Used outside an app context, matching the Config defaults
+_DEFAULTS = {
+    'PASSWORD_HASH_METHOD': 'scrypt:32768:8:1',
+    'PASSWORD_SALT_LENGTH': 16,
+    'HASH_POOL_WORKERS': 0,
+    'HASH_QUEUE_LIMIT': 0,
+    'HASH_TIMEOUT': 10,
+}
+
+_pool = {"executor": None, "pid": None, "slots": None}
+_pool_lock = threading.Lock()
+
+
+def _setting(name):
+    if has_app_context():
+        return current_app.config[name]
+    return _DEFAULTS[name]
+
+
+def _executor():
+    """
+    The process's hashing pool, or None when HASH_POOL_WORKERS is 0. Built on
+    first use and again in forked children, which cannot share their parent's.
+    """
+    workers = _setting('HASH_POOL_WORKERS')
+    if not workers:
+        return None
+    with _pool_lock:
+        if _pool["executor"] is None or _pool["pid"] != os.getpid():
+            # Spawned, not forked, so workers never inherit the web worker's threads and locks
+            _pool["executor"] = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context('spawn'))
+            _pool["pid"] = os.getpid()
+            _pool["slots"] = threading.BoundedSemaphore(_setting('HASH_QUEUE_LIMIT') or workers * 16)
+        return _pool["executor"]
+
+
+def _run(function, *args):
+    """
+    Run a hashing function in the pool and wait for it. At most HASH_QUEUE_LIMIT
+    calls of this process are queued or running; past that, or when a result
+    takes longer than HASH_TIMEOUT seconds, ServiceBusyError is raised so the
+    client retries instead of tying up the worker.
+    """
+    executor = _executor()
+    if executor is None:
+        return function(*args)
+
+    slots = _pool["slots"]
+    if not slots.acquire(blocking=False):
+        raise ServiceBusyError("Too many sign-ins at the moment, please retry.")
+    try:
+        return executor.submit(function, *args).result(timeout=_setting('HASH_TIMEOUT'))
+    except TimeoutError:
+        raise ServiceBusyError("Too many sign-ins at the moment, please retry.")
+    except BrokenProcessPool:
+        logger.exception("Password hashing pool died, starting a new one")
+        with _pool_lock:
+            _pool["executor"] = None
+        raise ServiceBusyError("Too many sign-ins at the moment, please retry.")
+    finally:
+        slots.release()
+
 
 def hash_password(password):
     """
@@ -6,7 +80,41 @@ def hash_password(password):
     :param password: Plaintext password
     :return: Hashed password
     """
-    return generate_password_hash(password)
+    return _run(generate_password_hash, password,
+                _setting('PASSWORD_HASH_METHOD'), _setting('PASSWORD_SALT_LENGTH'))
+
+def hash_passwords(passwords):
+    """
+    Hash many plaintext passwords, spread over the hashing pool. Each pool
+    process gets HASH_TIMEOUT seconds per password it has to hash, after which
+    ServiceBusyError is raised.
+    :param passwords: Plaintext passwords
+    :return: Hashed passwords, in the same order
+    """
+    method, salt_length = _setting('PASSWORD_HASH_METHOD'), _setting('PASSWORD_SALT_LENGTH')
+    executor = _executor()
+    if executor is None or len(passwords) < 2:
+        return [hash_password(password) for password in passwords]
+
+    # One queue slot for the whole batch; each pool process takes chunks of it
+    slots = _pool["slots"]
+    if not slots.acquire(blocking=False):
+        raise ServiceBusyError("Too many sign-ins at the moment, please retry.")
+    try:
+        workers = _setting('HASH_POOL_WORKERS')
+        chunksize = max(1, len(passwords) // (workers * 4))
+        timeout = _setting('HASH_TIMEOUT') * -(-len(passwords) // workers)
+        return list(executor.map(generate_password_hash, passwords, [method] * len(passwords),
+                                 [salt_length] * len(passwords), chunksize=chunksize, timeout=timeout))
+    except TimeoutError:
+        raise ServiceBusyError("Too many sign-ins at the moment, please retry.")
+    except BrokenProcessPool:
+        logger.exception("Password hashing pool died, starting a new one")
+        with _pool_lock:
+            _pool["executor"] = None
+        raise ServiceBusyError("Too many sign-ins at the moment, please retry.")
+    finally:
+        slots.release()
 
 def verify_password(hashed_password, password):
     """
@@ -15,5 +123,17 @@ def verify_password(hashed_password, password):
     :param hashed_password: Hashed password
     :return: True if match, else False
     """
-    return check_password_hash(hashed_password, password)
+    return _run(check_password_hash, hashed_password, password)
+
+def needs_rehash(hashed_password):
+    """
+    Whether a hash was made with other parameters than PASSWORD_HASH_METHOD.
+    :param hashed_password: Hashed password
+    :return: True if it should be replaced at the next successful login
+    """
+    return hashed_password.split('$', 1)[0] != _stored_method(_setting('PASSWORD_HASH_METHOD'))
 
+@lru_cache(maxsize=None)
+def _stored_method(method):
+    # werkzeug writes out the parameters it defaulted, as in 'scrypt:32768:8:1'
+    return generate_password_hash('', method, 1).split('$', 1)[0]
@@ -0,0 +1,191 @@
+import logging
+import random
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from flask import current_app, has_request_context, request
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import OperationalError
+from app.utils.exceptions import ServiceBusyError
+
+logger = logging.getLogger(__name__)
+
+# Set while a retry_on_locked view runs, so its transactions take the write lock up front
+_begin_immediate = ContextVar('sqlite_begin_immediate', default=False)
+# Set inside read_only(), so the reads of tasks and commands go to the read bind
+_read_only = ContextVar('read_only', default=False)
+
+# Bind key of the read-only engine
+READ_BIND = 'read'
+
+
+def sqlite_pragmas(config, read_only=False):
+    """
+    PRAGMA statements of the SQLite connection profile.
+    :param config: Mapping holding the SQLITE_* settings
+    :param read_only: Profile of the read bind; the journal mode is left to the
+        primary and writes are refused
+    :return: List of PRAGMA statements, run on every new connection
+    """
+    pragmas = [
+        f"PRAGMA synchronous={config['SQLITE_SYNCHRONOUS']}",
+        f"PRAGMA cache_size={int(config['SQLITE_CACHE_SIZE'])}",
+        f"PRAGMA mmap_size={int(config['SQLITE_MMAP_SIZE'])}",
+        f"PRAGMA busy_timeout={int(config['SQLITE_BUSY_TIMEOUT'])}",
+    ]
+    if read_only:
+        return pragmas + ["PRAGMA query_only=ON"]
+    return [f"PRAGMA journal_mode={config['SQLITE_JOURNAL_MODE']}"] + pragmas
+
+
+def apply_sqlite_profile(engine, config, read_only=False):
+    """
+    Apply the SQLite connection profile to an engine. Other backends are left alone.
+
+    Besides the pragmas, the driver's own transaction handling is switched off
+    and SQLAlchemy emits BEGIN itself. That makes SAVEPOINTs work, and lets
+    write routes open their transaction with BEGIN IMMEDIATE: the write lock is
+    then queued for in the busy handler up front, instead of failing with
+    'database is locked' when a read transaction tries to upgrade to a write.
+    :param engine: SQLAlchemy engine
+    :param config: Mapping holding the SQLITE_* settings
+    :param read_only: Engine of the read bind, whose connections refuse writes
+    """
+    if engine.dialect.name != 'sqlite':
+        return
+    pragmas = sqlite_pragmas(config, read_only)
+
+    @event.listens_for(engine, 'connect')
+    def set_pragmas(dbapi_connection, connection_record):
+        dbapi_connection.isolation_level = None
+        cursor = dbapi_connection.cursor()
+        for pragma in pragmas:
+            cursor.execute(pragma)
+        cursor.close()
+
+    @event.listens_for(engine, 'begin')
+    def begin(connection):
+        immediate = _begin_immediate.get() and not read_only
+        connection.exec_driver_sql("BEGIN IMMEDIATE" if immediate else "BEGIN")
+
+
+# Pool sizing options, which SQLite's single-connection pool for in-memory databases rejects
+_POOL_OPTIONS = ('pool_size', 'max_overflow', 'pool_timeout')
+
+
+def _in_memory_sqlite(url):
+    parsed = make_url(url)
+    return parsed.get_backend_name() == 'sqlite' and parsed.database in (None, '', ':memory:')
+
+
+def configure_pools(config):
+    """
+    Fit the engine pools to the database, before the extension is initialised.
+    In-memory SQLite databases live in a single connection: the primary engine
+    gets no pool sizing and there is no read bind, since a second pool would
+    see a different database. Otherwise the read bind is added to
+    SQLALCHEMY_BINDS; it connects to READ_DATABASE_URL, a replica, or else
+    opens its own pool on the primary database.
+    :param config: App config
+    """
+    if _in_memory_sqlite(config['SQLALCHEMY_DATABASE_URI']):
+        config['SQLALCHEMY_ENGINE_OPTIONS'] = {
+            name: value for name, value in config.get('SQLALCHEMY_ENGINE_OPTIONS', {}).items()
+            if name not in _POOL_OPTIONS
+        }
+    url = config.get('READ_DATABASE_URL') or config['SQLALCHEMY_DATABASE_URI']
+    if _in_memory_sqlite(url):
+        return
+    binds = dict(config.get('SQLALCHEMY_BINDS') or {})
+    binds.setdefault(READ_BIND, {
+        'url': url,
+        'pool_size': config['READ_DB_POOL_SIZE'],
+        'max_overflow': config['READ_DB_MAX_OVERFLOW'],
+    })
+    config['SQLALCHEMY_BINDS'] = binds
+
+
+@contextmanager
+def read_only():
+    """Send the reads in the block to the read bind, for tasks and commands."""
+    token = _read_only.set(True)
+    try:
+        yield
+    finally:
+        _read_only.reset(token)
+
+
+def _routing_reads():
+    return _read_only.get() or (has_request_context() and request.method in ('GET', 'HEAD'))
+
+
+def _is_read(clause):
+    if clause is None:
+        return False
+    if clause.is_select:
+        return True
+    return clause.is_text and clause.text.lstrip()[:6].upper() == 'SELECT'
+
+
+class RoutingSession(Session):
+    """
+    Session that runs the SELECTs of GET and HEAD requests, and of read_only()
+    blocks, on the read bind. Flushes, DML and bare connection() calls stay on
+    the primary, and once a session has written, its later reads follow to the
+    primary so it sees its own changes.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and not self._flushing and _routing_reads():
+            if clause is not None and clause.is_dml:
+                self.info['wrote'] = True
+            elif _is_read(clause) and not self.info.get('wrote'):
+                engine = self._db.engines.get(READ_BIND)
+                if engine is not None:
+                    return engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+@event.listens_for(RoutingSession, 'after_flush')
+def _mark_written(session, flush_context):
+    session.info['wrote'] = True
+
+
+def _is_locked(error):
+    message = str(error.orig).lower()
+    return 'database is locked' in message or 'database is busy' in message
+
+
+def retry_on_locked(f):
+    """
+    Decorator for short write views. The view runs with its transactions
+    started as BEGIN IMMEDIATE, and is re-run after a rollback when SQLite
+    still reports the database as locked. Retries and backoff come from
+    DB_LOCK_RETRIES and DB_LOCK_RETRY_DELAY; ServiceBusyError is raised once
+    they are used up. Place it below @handle_exception.
+    """
+    @wraps(f)
+    def wrapper(*args, **kwargs):
+        from app.extensions import db
+        retries = current_app.config['DB_LOCK_RETRIES']
+        delay = current_app.config['DB_LOCK_RETRY_DELAY']
+        token = _begin_immediate.set(True)
+        try:
+            for attempt in range(retries + 1):
+                try:
+                    return f(*args, **kwargs)
+                except OperationalError as error:
+                    db.session.rollback()
+                    if not _is_locked(error):
+                        raise
+                    if attempt == retries:
+                        logger.warning("%s gave up after %s retries: database is locked", f.__name__, retries)
+                        raise ServiceBusyError("The server is busy, please retry.")
+                    # Exponential backoff with jitter so retrying workers spread out
+                    time.sleep(delay * (2 ** attempt) * random.uniform(0.5, 1.5))
+        finally:
+            _begin_immediate.reset(token)
+    return wrapper
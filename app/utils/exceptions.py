@@ -5,6 +5,11 @@ class ValidationError(Exception):
     def __init__(self, message):
         self.message = message
 
+class ServiceBusyError(Exception):
+    """The request could not get a shared resource in time; the client should retry."""
+    def __init__(self, message):
+        self.message = message
+
 def handle_exception(f):
     @wraps(f)
     def wrapper(*args, **kwargs):
@@ -12,6 +17,8 @@ def handle_exception(f):
             return f(*args, **kwargs)
         except ValidationError as ve:
             return jsonify({"error": ve.message}), 400
+        except ServiceBusyError as be:
+            return jsonify({"error": be.message}), 503, {"Retry-After": "1"}
         except Exception as e:
             return jsonify({"error": "An internal error occurred."}), 500
     return wrapper
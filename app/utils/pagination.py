@@ -0,0 +1,81 @@
+import base64
+import binascii
+import json
+from datetime import date, datetime
+from sqlalchemy import and_, or_
+from app.utils.exceptions import ValidationError
+
+
+def encode_cursor(sort_key, sort_value, row_id):
+    """
+    Build an opaque cursor pointing just past the given row.
+    :param sort_key: Name of the sort key the cursor belongs to
+    :param sort_value: Value of the sort column for the last row of the page
+    :param row_id: Primary key of the last row of the page
+    :return: URL-safe cursor string
+    """
+    if isinstance(sort_value, (datetime, date)):
+        sort_value = sort_value.isoformat()
+    raw = json.dumps([sort_key, sort_value, row_id], separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor, sort_key, sort_column):
+    """
+    Decode a cursor produced by encode_cursor.
+    :param cursor: Cursor string, an empty string means the first page
+    :param sort_key: Sort key the caller is paginating by
+    :param sort_column: Column the sort value is compared against
+    :return: (sort_value, row_id) tuple, or None for the first page
+    """
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        key, value, row_id = json.loads(raw)
+        if key != sort_key or not isinstance(row_id, int):
+            raise ValueError(key)
+        if value is not None and issubclass(sort_column.type.python_type, datetime):
+            value = datetime.fromisoformat(value)
+    except (binascii.Error, ValueError, TypeError, NotImplementedError):
+        raise ValidationError("Invalid cursor.")
+    return value, row_id
+
+
+def keyset_paginate(query, sort_key, sort_column, id_column, cursor, size, with_count=False):
+    """
+    Fetch one page of a query ordered by (sort_column, id_column) without OFFSET.
+    The query is filtered to rows strictly after the cursor, so every page costs
+    the same index range scan regardless of its depth. The total count is only
+    computed when asked for.
+    :return: dict with items, next_cursor, has_next and optionally total
+    """
+    position = decode_cursor(cursor, sort_key, sort_column)
+    total = query.order_by(None).count() if with_count else None
+    if position is not None:
+        last_value, last_id = position
+        if sort_column is id_column:
+            query = query.filter(id_column > last_id)
+        else:
+            query = query.filter(or_(
+                sort_column > last_value,
+                and_(sort_column == last_value, id_column > last_id)
+            ))
+
+    if sort_column is id_column:
+        query = query.order_by(id_column)
+    else:
+        query = query.order_by(sort_column, id_column)
+
+    rows = query.limit(size + 1).all()
+    has_next = len(rows) > size
+    items = rows[:size]
+
+    next_cursor = None
+    if has_next:
+        last = items[-1]
+        next_cursor = encode_cursor(
+            sort_key, getattr(last, sort_column.key), getattr(last, id_column.key)
+        )
+
+    return {"items": items, "next_cursor": next_cursor, "has_next": has_next, "total": total}
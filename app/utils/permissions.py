@@ -0,0 +1,71 @@
+from functools import wraps
+from flask import g
+from flask_jwt_extended import get_jwt, get_jwt_identity
+from app.extensions import db
+from app.models import User
+from app.utils.exceptions import ValidationError
+
+
+def current_user_id():
+    """
+    :return: ID of the user the request's token was issued to
+    """
+    return int(get_jwt_identity())
+
+
+def current_user():
+    """
+    User the request's token was issued to, loaded at most once per request.
+    The cache is keyed by user ID, as g outlives a request when the app
+    context was pushed by the caller.
+    :return: User, or None if the account no longer exists
+    """
+    user_id = current_user_id()
+    cached = g.get('current_user')
+    if cached is None or cached[0] != user_id:
+        g.current_user = cached = (user_id, db.session.get(User, user_id))
+    return cached[1]
+
+
+def current_role():
+    """
+    Role from the token's 'role' claim. Tokens issued before the claim was
+    added fall back to the stored user.
+    :return: Role name, or None if the account no longer exists
+    """
+    role = get_jwt().get('role')
+    if role is None:
+        user = current_user()
+        role = user.role if user else None
+    return role
+
+
+def admin_required(message="Only admins can perform this action."):
+    """
+    Allow only tokens with the admin role. Place it below @jwt_required() and
+    @handle_exception.
+    :param message: Error returned to everybody else
+    """
+    def decorator(f):
+        @wraps(f)
+        def wrapper(*args, **kwargs):
+            if current_role() != 'admin':
+                raise ValidationError(message)
+            return f(*args, **kwargs)
+        # Copied up through the outer decorators' functools.wraps, for the query plan check
+        wrapper.admin_only = True
+        return wrapper
+    return decorator
+
+
+def user_required(f):
+    """
+    Allow any signed in account, admins included. Place it below
+    @jwt_required() and @handle_exception.
+    """
+    @wraps(f)
+    def wrapper(*args, **kwargs):
+        if current_role() is None:
+            raise ValidationError("User not found.")
+        return f(*args, **kwargs)
+    return wrapper
@@ -0,0 +1,158 @@
+import calendar
+import re
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import and_, or_
+
+_DAY = re.compile(r'^(\d{4})-(\d{1,2})-(\d{1,2})$')
+_MONTH = re.compile(r'^(\d{4})-(\d{1,2})$')
+_YEAR = re.compile(r'^\d{4}$')
+_NUMBER = r'-?\d+(?:\.\d+)?'
+_COMPARISON = re.compile(rf'^(?:score:?)?(>=|<=|>|<|=)({_NUMBER})$')
+_SCORE_RANGE = re.compile(rf'^(?:score:?)?({_NUMBER})\.\.({_NUMBER})$')
+
+_MONTH_NAMES = {}
+for _number in range(1, 13):
+    _MONTH_NAMES[calendar.month_name[_number].lower()] = _number
+    _MONTH_NAMES[calendar.month_abbr[_number].lower()] = _number
+
+
+class SearchQuery:
+    """
+    A search box query split into free text and typed filters.
+    text: Words that are not filters, for the full-text fields only
+    date_ranges: Half-open [start, end) UTC datetime ranges, any of which may match
+    score_bounds: (operator, value) comparisons that must all hold
+    """
+
+    def __init__(self, text, date_ranges, score_bounds):
+        self.text = text
+        self.date_ranges = date_ranges
+        self.score_bounds = score_bounds
+
+    @property
+    def has_filters(self):
+        return bool(self.date_ranges or self.score_bounds)
+
+
+def _month_range(year, month):
+    start = datetime(year, month, 1, tzinfo=timezone.utc)
+    end = datetime(year + month // 12, month % 12 + 1, 1, tzinfo=timezone.utc)
+    return start, end
+
+
+def _date_range(token):
+    """
+    :param token: 'YYYY-MM-DD' or 'YYYY-MM'
+    :return: (start, end) range covering the day or month, or None if not a valid date
+    """
+    try:
+        match = _DAY.match(token)
+        if match:
+            start = datetime(*map(int, match.groups()), tzinfo=timezone.utc)
+            return start, start + timedelta(days=1)
+        match = _MONTH.match(token)
+        if match:
+            return _month_range(*map(int, match.groups()))
+    except ValueError:
+        pass
+    return None
+
+
+def _range_end(token):
+    """
+    :param token: One end of a '..' range: a day, a month or a four-digit year
+    :return: (start, end) range it covers, or None
+    """
+    if _YEAR.match(token):
+        year = int(token)
+        return (datetime(year, 1, 1, tzinfo=timezone.utc), datetime(year + 1, 1, 1, tzinfo=timezone.utc)) \
+            if 1 <= year < 9999 else None
+    return _date_range(token)
+
+
+def parse_search_query(query):
+    """
+    Recognise dates ('2026-03-14'), months ('2026-03', 'march 2026'), date ranges
+    ('2026-03-01..2026-03-15', '2026..2027'), score comparisons ('>=80',
+    'score:<50', 'score >= 80') and score ranges ('60..80') in a search query.
+    Everything else is kept as free text.
+    :param query: Raw search box input
+    :return: SearchQuery
+    """
+    # Allow a space between an operator and its number, as in '>= 80'
+    tokens = re.sub(r'(>=|<=|>|<|=)\s+', r'\1', query.strip().lower()).split()
+    words, date_ranges, score_bounds = [], [], []
+
+    i = 0
+    while i < len(tokens):
+        token = tokens[i]
+        i += 1
+
+        # A bare 'score' only names the comparison or range that follows it
+        if token in ('score', 'score:') and i < len(tokens) and (
+                _COMPARISON.match(tokens[i]) or _SCORE_RANGE.match(tokens[i])):
+            continue
+
+        if token in _MONTH_NAMES and i < len(tokens) and _YEAR.match(tokens[i]):
+            date_ranges.append(_month_range(int(tokens[i]), _MONTH_NAMES[token]))
+            i += 1
+            continue
+
+        date_range = _date_range(token)
+        if date_range:
+            date_ranges.append(date_range)
+            continue
+
+        if '..' in token:
+            low, _, high = token.partition('..')
+            low_range, high_range = _range_end(low), _range_end(high)
+            if low_range and high_range:
+                # Either order, like score ranges; four-digit ends never fall through to a score range
+                date_ranges.append((min(low_range[0], high_range[0]), max(low_range[1], high_range[1])))
+                continue
+
+        match = _COMPARISON.match(token)
+        if match:
+            score_bounds.append((match.group(1), float(match.group(2))))
+            continue
+
+        match = _SCORE_RANGE.match(token)
+        if match:
+            low, high = sorted(float(value) for value in match.groups())
+            score_bounds += [('>=', low), ('<=', high)]
+            continue
+
+        words.append(token)
+
+    return SearchQuery(' '.join(words), date_ranges, score_bounds)
+
+
+def date_filter(column, date_ranges):
+    """
+    :return: Predicate matching the column against any of the ranges, or None
+    """
+    if not date_ranges:
+        return None
+    return or_(*(and_(column >= start, column < end) for start, end in date_ranges))
+
+
+def overlap_filter(start_column, end_column, date_ranges):
+    """
+    :return: Predicate matching rows whose [start, end] span overlaps any of the ranges, or None
+    """
+    if not date_ranges:
+        return None
+    return or_(*(and_(start_column < end, end_column >= start) for start, end in date_ranges))
+
+
+def score_filter(column, score_bounds):
+    """
+    :return: Predicate applying every comparison to the column, or None
+    """
+    if not score_bounds:
+        return None
+    operators = {
+        '>=': column.__ge__, '<=': column.__le__, '>': column.__gt__,
+        '<': column.__lt__, '=': column.__eq__,
+    }
+    return and_(*(operators[op](value) for op, value in score_bounds))
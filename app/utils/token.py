@@ -2,11 +2,12 @@ import jwt
 from datetime import datetime, timedelta
 from flask import current_app
 
-def generate_jwt(user_id, email):
+def generate_jwt(user_id, email, role):
     payload = {
         "sub": str(user_id),
         "user_id": user_id,
         "email": email,
+        "role": role,  # Lets routes authorize without loading the user
         "exp": datetime.utcnow() + timedelta(hours=24)  # Token expires in 24 hours
     }
     return jwt.encode(payload, current_app.config['JWT_SECRET_KEY'], algorithm='HS256')
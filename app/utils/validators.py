@@ -29,3 +29,27 @@ def is_strong_password(password):
         return False
     return True
 
+
+def parse_marks(value):
+    """
+    Read a question's marks as a non-negative whole number.
+    :param value: Marks from the request, e.g. 4, 4.0 or "4"
+    :return: Marks as an int, or None if not a non-negative whole number
+    """
+    if isinstance(value, bool):
+        return None
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return None
+    if not number.is_integer() or number < 0:
+        return None
+    return int(number)
+
+def normalize_email(email):
+    """
+    Canonical form of an email address, used wherever one is stored or looked up.
+    :param email: Email address as entered
+    :return: Address without surrounding whitespace, in lowercase
+    """
+    return email.strip().lower() if isinstance(email, str) else email
@@ -0,0 +1,34 @@
+"""add search filter indexes
+
+Revision ID: 1c8f3e6a9d27
+Revises: 9b2e5c7d1a40
+Create Date: 2026-10-18 13:58:09.614520
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '1c8f3e6a9d27'
+down_revision = '9b2e5c7d1a40'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('quiz', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_quiz_start_time'), ['start_time'], unique=False)
+        batch_op.create_index(batch_op.f('ix_quiz_end_time'), ['end_time'], unique=False)
+
+    with op.batch_alter_table('quiz_attempt', schema=None) as batch_op:
+        batch_op.create_index('ix_quiz_attempt_user_id_attempt_date', ['user_id', 'attempt_date'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('quiz_attempt', schema=None) as batch_op:
+        batch_op.drop_index('ix_quiz_attempt_user_id_attempt_date')
+
+    with op.batch_alter_table('quiz', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_quiz_end_time'))
+        batch_op.drop_index(batch_op.f('ix_quiz_start_time'))
@@ -0,0 +1,35 @@
+"""add quiz aggregate columns
+
+Revision ID: 3f1c2a7b9d10
+Revises: 
+Create Date: 2026-10-18 09:12:41.118203
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f1c2a7b9d10'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('quiz', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('total_marks', sa.Integer(), server_default='0', nullable=False))
+        batch_op.add_column(sa.Column('question_count', sa.Integer(), server_default='0', nullable=False))
+
+    # Backfill from the existing questions
+    op.execute(
+        "UPDATE quiz SET "
+        "total_marks = (SELECT COALESCE(SUM(question.marks), 0) FROM question WHERE question.quiz_id = quiz.id), "
+        "question_count = (SELECT COUNT(question.id) FROM question WHERE question.quiz_id = quiz.id)"
+    )
+
+
+def downgrade():
+    with op.batch_alter_table('quiz', schema=None) as batch_op:
+        batch_op.drop_column('question_count')
+        batch_op.drop_column('total_marks')
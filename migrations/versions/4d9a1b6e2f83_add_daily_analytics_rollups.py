@@ -0,0 +1,42 @@
+"""add daily analytics rollups
+
+Revision ID: 4d9a1b6e2f83
+Revises: e7b3f0a4c915
+Create Date: 2026-10-18 12:48:17.402961
+
+Backfill existing attempts afterwards with `flask rebuild_analytics`.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4d9a1b6e2f83'
+down_revision = 'e7b3f0a4c915'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('quiz_daily_stat',
+    sa.Column('quiz_id', sa.Integer(), nullable=False),
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('attempt_count', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['quiz_id'], ['quiz.id'], ),
+    sa.PrimaryKeyConstraint('quiz_id', 'day')
+    )
+    op.create_table('subject_daily_stat',
+    sa.Column('subject_id', sa.Integer(), nullable=False),
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('attempt_count', sa.Integer(), nullable=False),
+    sa.Column('score_sum', sa.Float(), nullable=False),
+    sa.Column('percent_sum', sa.Float(), nullable=False),
+    sa.ForeignKeyConstraint(['subject_id'], ['subject.id'], ),
+    sa.PrimaryKeyConstraint('subject_id', 'day')
+    )
+
+
+def downgrade():
+    op.drop_table('subject_daily_stat')
+    op.drop_table('quiz_daily_stat')
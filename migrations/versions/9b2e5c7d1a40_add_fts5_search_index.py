@@ -0,0 +1,48 @@
+"""add fts5 search index
+
+Revision ID: 9b2e5c7d1a40
+Revises: 4d9a1b6e2f83
+Create Date: 2026-10-18 13:22:41.085312
+
+SQLite only. Other backends keep using LIKE matching in search_service.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9b2e5c7d1a40'
+down_revision = '4d9a1b6e2f83'
+branch_labels = None
+depends_on = None
+
+# kind, source table, title column, body expression (see search_service.SOURCES)
+SOURCES = [
+    ('user', 'user', 'full_name', "coalesce(email, '')"),
+    ('subject', 'subject', 'name', "coalesce(code, '') || ' ' || coalesce(description, '')"),
+    ('chapter', 'chapter', 'name', "coalesce(code, '') || ' ' || coalesce(description, '')"),
+    ('quiz', 'quiz', 'title', "coalesce(description, '')"),
+    ('question', 'question', 'text', "''"),
+]
+
+
+def upgrade():
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    for kind, table, title, body in SOURCES:
+        op.execute(
+            f"CREATE VIRTUAL TABLE search_{kind} USING fts5("
+            f"title, body, tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+        )
+        op.execute(
+            f"INSERT INTO search_{kind} (rowid, title, body) "
+            f"SELECT id, coalesce({title}, ''), {body} FROM \"{table}\""
+        )
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    for kind, _, _, _ in SOURCES:
+        op.execute(f"DROP TABLE search_{kind}")
@@ -0,0 +1,33 @@
+"""add quiz attempt submitted_at
+
+Revision ID: a9d1e4b7c602
+Revises: f2a8c6d3b715
+Create Date: 2026-10-18 19:20:31.662410
+
+Attempts with a non-zero score must have been submitted and are backfilled
+with their attempt_date. Submitted attempts that scored 0 cannot be told
+apart from unsubmitted ones and stay off the leaderboards until they are
+submitted again.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a9d1e4b7c602'
+down_revision = 'f2a8c6d3b715'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('quiz_attempt', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('submitted_at', sa.DateTime(timezone=True), nullable=True))
+
+    op.execute("UPDATE quiz_attempt SET submitted_at = attempt_date WHERE score != 0")
+
+
+def downgrade():
+    with op.batch_alter_table('quiz_attempt', schema=None) as batch_op:
+        batch_op.drop_column('submitted_at')
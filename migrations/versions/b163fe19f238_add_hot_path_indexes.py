@@ -0,0 +1,73 @@
+"""add hot path indexes
+
+Revision ID: b163fe19f238
+Revises: 1c8f3e6a9d27
+Create Date: 2026-10-18 14:31:52.179007
+
+quiz_attempt.user_id is served by ix_quiz_attempt_user_id_attempt_date and
+quiz.end_time by ix_quiz_end_time from the previous revision.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b163fe19f238'
+down_revision = '1c8f3e6a9d27'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('chapter', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_chapter_subject_id'), ['subject_id'], unique=False)
+
+    with op.batch_alter_table('option', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_option_question_id'), ['question_id'], unique=False)
+
+    with op.batch_alter_table('question', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_question_quiz_id'), ['quiz_id'], unique=False)
+
+    with op.batch_alter_table('quiz', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_quiz_created_at'), ['created_at'], unique=False)
+        batch_op.create_index(batch_op.f('ix_quiz_subject_id'), ['subject_id'], unique=False)
+
+    with op.batch_alter_table('quiz_attempt', schema=None) as batch_op:
+        batch_op.create_index('ix_quiz_attempt_quiz_id_score', ['quiz_id', 'score'], unique=False)
+
+    with op.batch_alter_table('quiz_chapters', schema=None) as batch_op:
+        batch_op.create_index('ix_quiz_chapters_chapter_id', ['chapter_id'], unique=False)
+
+    with op.batch_alter_table('quiz_daily_stat', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_quiz_daily_stat_day'), ['day'], unique=False)
+
+    with op.batch_alter_table('subject_daily_stat', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_subject_daily_stat_day'), ['day'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('subject_daily_stat', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_subject_daily_stat_day'))
+
+    with op.batch_alter_table('quiz_daily_stat', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_quiz_daily_stat_day'))
+
+    with op.batch_alter_table('quiz_chapters', schema=None) as batch_op:
+        batch_op.drop_index('ix_quiz_chapters_chapter_id')
+
+    with op.batch_alter_table('quiz_attempt', schema=None) as batch_op:
+        batch_op.drop_index('ix_quiz_attempt_quiz_id_score')
+
+    with op.batch_alter_table('quiz', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_quiz_subject_id'))
+        batch_op.drop_index(batch_op.f('ix_quiz_created_at'))
+
+    with op.batch_alter_table('question', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_question_quiz_id'))
+
+    with op.batch_alter_table('option', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_option_question_id'))
+
+    with op.batch_alter_table('chapter', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_chapter_subject_id'))
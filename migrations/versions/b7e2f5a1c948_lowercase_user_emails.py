@@ -0,0 +1,33 @@
+"""lowercase user emails
+
+Revision ID: b7e2f5a1c948
+Revises: a9d1e4b7c602
+Create Date: 2026-10-18 19:48:09.237514
+
+Emails are now stored and looked up in lowercase. Addresses that only
+differ by case from another account are left as they are; login still
+finds them by their exact spelling.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7e2f5a1c948'
+down_revision = 'a9d1e4b7c602'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute(
+        'UPDATE "user" SET email = lower(trim(email)) '
+        'WHERE email != lower(trim(email)) AND NOT EXISTS ('
+        'SELECT 1 FROM "user" AS other WHERE other.id != "user".id '
+        'AND lower(trim(other.email)) = lower(trim("user".email)))'
+    )
+
+
+def downgrade():
+    pass
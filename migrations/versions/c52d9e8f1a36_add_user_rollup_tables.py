@@ -0,0 +1,42 @@
+"""add user rollup tables
+
+Revision ID: c52d9e8f1a36
+Revises: 8a4e6c0d2b57
+Create Date: 2026-10-18 11:40:52.730194
+
+Backfill existing attempts afterwards with `flask rebuild_analytics`.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c52d9e8f1a36'
+down_revision = '8a4e6c0d2b57'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('user_subject_stat',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('subject_id', sa.Integer(), nullable=False),
+    sa.Column('attempt_count', sa.Integer(), nullable=False),
+    sa.Column('score_sum', sa.Float(), nullable=False),
+    sa.ForeignKeyConstraint(['subject_id'], ['subject.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('user_id', 'subject_id')
+    )
+    op.create_table('user_month_stat',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('month', sa.String(length=7), nullable=False),
+    sa.Column('attempt_count', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('user_id', 'month')
+    )
+
+
+def downgrade():
+    op.drop_table('user_month_stat')
+    op.drop_table('user_subject_stat')
@@ -0,0 +1,31 @@
+"""add attempt answer table
+
+Revision ID: d4f7a2c8e931
+Revises: b163fe19f238
+Create Date: 2026-10-18 18:05:12.418833
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd4f7a2c8e931'
+down_revision = 'b163fe19f238'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('attempt_answer',
+    sa.Column('attempt_id', sa.Integer(), nullable=False),
+    sa.Column('question_id', sa.Integer(), nullable=False),
+    sa.Column('selected', sa.JSON(), nullable=True),
+    sa.Column('saved_at', sa.DateTime(timezone=True), nullable=False),
+    sa.ForeignKeyConstraint(['attempt_id'], ['quiz_attempt.id'], ),
+    sa.PrimaryKeyConstraint('attempt_id', 'question_id')
+    )
+
+
+def downgrade():
+    op.drop_table('attempt_answer')
@@ -0,0 +1,37 @@
+"""add entity counter table
+
+Revision ID: e7b3f0a4c915
+Revises: c52d9e8f1a36
+Create Date: 2026-10-18 12:26:05.911387
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e7b3f0a4c915'
+down_revision = 'c52d9e8f1a36'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    entity_counter = op.create_table('entity_counter',
+    sa.Column('name', sa.String(length=30), nullable=False),
+    sa.Column('value', sa.Integer(), nullable=False),
+    sa.Column('reconciled_at', sa.DateTime(timezone=True), nullable=True),
+    sa.PrimaryKeyConstraint('name')
+    )
+
+    # Seed the counters with the current row counts
+    connection = op.get_bind()
+    rows = []
+    for name in ('quiz', 'question', 'chapter', 'subject', 'user'):
+        count = connection.execute(sa.select(sa.func.count()).select_from(sa.table(name))).scalar()
+        rows.append({'name': name, 'value': count})
+    op.bulk_insert(entity_counter, rows)
+
+
+def downgrade():
+    op.drop_table('entity_counter')
@@ -0,0 +1,34 @@
+"""autoincrement quiz ids
+
+Revision ID: f2a8c6d3b715
+Revises: d4f7a2c8e931
+Create Date: 2026-10-18 19:02:44.105261
+
+Without AUTOINCREMENT SQLite hands the id of the newest deleted row to the
+next insert, so answer keys, papers, leaderboards and autosave buffers cached
+by id could be served for a different quiz, question, option or attempt.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f2a8c6d3b715'
+down_revision = 'd4f7a2c8e931'
+branch_labels = None
+depends_on = None
+
+TABLES = ('quiz', 'question', 'option', 'quiz_attempt')
+
+
+def upgrade():
+    for table in TABLES:
+        with op.batch_alter_table(table, recreate='always', table_kwargs={'sqlite_autoincrement': True}) as batch_op:
+            pass
+
+
+def downgrade():
+    for table in reversed(TABLES):
+        with op.batch_alter_table(table, recreate='always', table_kwargs={'sqlite_autoincrement': False}) as batch_op:
+            pass
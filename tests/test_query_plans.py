@@ -0,0 +1,7 @@
+from app.query_plans import check_query_plans
+
+
+def test_routes_need_no_unexpected_scans():
+    """Every route's queries use an index, apart from the scans listed in ALLOWED_SCANS."""
+    findings = check_query_plans()
+    assert findings == [], "\n".join(f"{route}: {detail}" for route, table, detail, statement in findings)